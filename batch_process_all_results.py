@@ -0,0 +1,474 @@
+import os
+import json
+import time
+import queue
+import inspect
+import multiprocessing
+from pathlib import Path
+from simple_inference import SimpleInference
+from concurrent_rounds import available_cores
+from result_manifest import ResultManifest
+import cost_model
+
+# 算法注册表：名称 -> (调度结果文件, 计时输出文件, 是否可能输出 [-1])
+# [-1] 表示调度器判定无法调度（目前只有 resizing.c），对应的计时文件同样写 [-1]
+ALGORITHMS = {}
+
+
+def register_algorithm(name, result_file, time_file, minus_one=False):
+    ALGORITHMS[name] = {'result': result_file, 'time': time_file, 'minus_one': minus_one}
+
+
+register_algorithm('main', 'main_result.json', 'main_time.json')
+register_algorithm('fifo', 'fifo_result.json', 'fifo_time.json')
+register_algorithm('fifo_batch', 'fifo_batch_result.json', 'fifo_batch_time.json')
+register_algorithm('cf_batch', 'cf_batch_result.json', 'cf_batch_time.json')
+register_algorithm('resizing', 'resizing_result.json', 'resizing_time.json', minus_one=True)
+
+
+def find_result_dirs(base_folder):
+    base_path = Path(base_folder)
+    if not base_path.exists():
+        print(f"[X] 文件夹不存在: {base_folder}")
+        return []
+    return [d for d in sorted(base_path.iterdir()) if d.is_dir() and d.name.startswith('result_')]
+
+
+def extract_cropped_folder(result_dir):
+    """result_153 -> images_cropped/cropped_153，不存在时退回 cropped_1"""
+    name = Path(result_dir).name
+    if name.startswith('result_'):
+        cropped_folder = f"images_cropped/cropped_{name.replace('result_', '')}"
+        if os.path.exists(cropped_folder):
+            return cropped_folder
+        print(f"[!] 警告: 图片文件夹不存在 {cropped_folder}，使用默认文件夹")
+    return "images_cropped/cropped_1"
+
+
+def is_minus_one(content):
+    return isinstance(content, list) and len(content) == 1 and content[0] == -1
+
+
+def load_plans(result_dir, algorithms, skip_existing=False):
+    """
+    读取一个 result_N 目录中各算法的调度结果
+
+    Returns:
+        {算法名: (调度结果路径, 计时输出路径, 内容)}，内容为 [-1] 时表示调度失败
+    """
+    plans = {}
+    for name in algorithms:
+        spec = ALGORITHMS[name]
+        input_path = Path(result_dir) / spec['result']
+        output_path = Path(result_dir) / spec['time']
+        if not input_path.exists():
+            continue
+        if skip_existing and output_path.exists():
+            print(f"  跳过 (已存在): {output_path}")
+            continue
+        try:
+            with open(input_path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[X] 读取失败 {input_path}: {e}")
+            continue
+        if is_minus_one(content) and not spec['minus_one']:
+            print(f"[!] {input_path} 为 [-1]，但算法 {name} 未注册 [-1] 约定，按空结果处理")
+        plans[name] = (str(input_path), str(output_path), content)
+    return plans
+
+
+def referenced_images(plans):
+    """各算法调度结果中引用到的图片并集：{size: [image_id, ...]}"""
+    by_size = {}
+    for _, _, content in plans.values():
+        if not isinstance(content, list) or is_minus_one(content):
+            continue
+        for batch in content:
+            if not isinstance(batch, dict) or not batch.get('size'):
+                continue
+            ids = by_size.setdefault(batch['size'], [])
+            for item in batch.get('images', []):
+                image_id = item.get('id') if isinstance(item, dict) else item
+                if image_id is not None and image_id not in ids:
+                    ids.append(image_id)
+    return by_size
+
+
+def preload_working_set(inference, by_size):
+    """把本目录所有算法用到的图片按尺寸各解码一次放进张量缓存，之后的预热和未计时推理都直接命中"""
+    if inference.tensor_cache is None:
+        return 0
+    loaded = 0
+    for size, image_ids in sorted(by_size.items()):
+        if size not in inference.models:
+            continue
+        _, valid_ids, _ = inference.load_images_batch(image_ids, size)
+        loaded += len(valid_ids)
+    return loaded
+
+
+def save_json(results, output_path):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def new_counts():
+    return {'processed': 0, 'minus_one': 0, 'errors': 0, 'outputs': []}
+
+
+def timing_config(inference_kwargs, num_workers):
+    """
+    影响计时结果的全部配置：SimpleInference 的默认参数加上驱动传入的参数；实测计时时还包括进程数和每个进程的线程数
+    缓存预算和按需加载只影响内存，不计入；不计时（measure_timing=False）时结果与进程数、线程数无关，也不计入
+    """
+    import torch
+    defaults = {name: param.default for name, param in inspect.signature(SimpleInference.__init__).parameters.items()
+                if param.default is not inspect.Parameter.empty}
+    config = dict(defaults, **inference_kwargs)
+    for key in ('model_paths', 'image_folder', 'cache_bytes', 'lazy_models'):
+        config.pop(key, None)
+    if not config.get('measure_timing', True):
+        return config
+    workers = max(1, min(num_workers, len(available_cores())))
+    config['num_workers'] = workers
+    config['threads_per_worker'] = len(split_cores(available_cores(), workers)[-1]) if workers > 1 \
+        else torch.get_num_threads()
+    return config
+
+
+def plan_incremental(manifest, result_dirs, algorithms, model_paths, config):
+    """
+    按清单比较每个调度结果的输入指纹，返回需要重新计算的 ([(result_dir, [算法名])], {计时文件路径: 指纹})
+    """
+    models = manifest.models_hash(model_paths)
+    config = manifest.config_hash(config)
+    jobs, fingerprints = [], {}
+    for result_dir in result_dirs:
+        image_folder = extract_cropped_folder(result_dir)
+        stale = []
+        for name in algorithms:
+            spec = ALGORITHMS[name]
+            input_path = Path(result_dir) / spec['result']
+            output_path = Path(result_dir) / spec['time']
+            if not input_path.exists():
+                continue
+            fingerprint = manifest.fingerprint(input_path, image_folder, models, config)
+            reasons = manifest.changes(output_path, fingerprint)
+            if reasons:
+                stale.append(name)
+                fingerprints[str(output_path)] = (fingerprint, reasons)
+        if stale:
+            jobs.append((result_dir, stale))
+    return jobs, fingerprints
+
+
+def process_result_dir(inference, result_dir, algorithms, skip_existing=False):
+    """
+    处理一个 result_N 目录：加载一次共享的图片工作集，依次生成各算法的 *_time.json
+
+    Returns:
+        {'processed': n, 'minus_one': n, 'errors': n, 'outputs': [成功写出的计时文件路径]}
+    """
+    counts = new_counts()
+    plans = load_plans(result_dir, algorithms, skip_existing)
+    if not plans:
+        return counts
+
+    inference.image_folder = extract_cropped_folder(result_dir)
+    if inference.tensor_cache is not None:
+        inference.tensor_cache.clear()
+    start = time.time()
+    loaded = preload_working_set(inference, referenced_images(plans))
+    print(f"使用图片文件夹: {inference.image_folder}，预加载 {loaded} 张 ({time.time() - start:.2f}秒)")
+
+    for name, (input_path, output_path, content) in plans.items():
+        try:
+            if is_minus_one(content) and ALGORITHMS[name]['minus_one']:
+                save_json([-1], output_path)
+                print(f"  [OK] {name}: [-1] -> {output_path}")
+                counts['minus_one'] += 1
+                counts['outputs'].append(output_path)
+                continue
+            results = inference.process_json_file(input_path)
+            save_json(results, output_path)
+            print(f"  [OK] {name}: {output_path}")
+            counts['processed'] += 1
+            counts['outputs'].append(output_path)
+        except Exception as e:
+            print(f"  [X] {name} 处理失败: {input_path} ({e})")
+            counts['errors'] += 1
+            import traceback
+            traceback.print_exc()
+    return counts
+
+
+def split_cores(cores, num_workers):
+    """把核心按连续区间尽量均分给各 worker，前面的 worker 多分余数"""
+    per, extra = divmod(len(cores), num_workers)
+    slices, start = [], 0
+    for i in range(num_workers):
+        end = start + per + (1 if i < extra else 0)
+        slices.append(cores[start:end])
+        start = end
+    return slices
+
+
+def _shard_worker(worker_index, cores, inference_kwargs, skip_existing, tasks, events):
+    """worker 进程：绑定自己的核心，持有独立的 SimpleInference，从任务队列取 result_N 目录直到取到 None"""
+    import torch
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    try:
+        inference = SimpleInference(**inference_kwargs)
+    except Exception as e:
+        events.put(('failed', worker_index, None, repr(e)))
+        return
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            result_dir, algorithms = task
+            events.put(('started', worker_index, result_dir, None))
+            try:
+                counts = process_result_dir(inference, result_dir, algorithms, skip_existing)
+            except Exception as e:
+                counts = dict(new_counts(), errors=1)
+                print(f"[X] worker {worker_index} 处理目录失败: {result_dir} ({e})")
+            events.put(('done', worker_index, result_dir, counts))
+    finally:
+        inference.close()
+        events.put(('exit', worker_index, None, None))
+
+
+def process_dirs_parallel(jobs, inference_kwargs, skip_existing, num_workers):
+    """
+    把 result_N 目录（jobs 为 [(result_dir, [算法名])]）分给 num_workers 个进程并行处理
+
+    核心按 worker 均分，每个 worker 的 torch 线程数等于分到的核心数，总线程数与核心数一致。
+    各 worker 只用部分核心且相互争用内存带宽，实测耗时与串行不可比，只用于不计时（预测库）模式，
+    此时输出文件与串行模式相同。
+    目录通过共享队列动态分发，处理快的 worker 多领；worker 异常退出时其未完成的目录计为失败。
+    """
+    cores = available_cores()
+    num_workers = max(1, min(num_workers, len(cores), len(jobs)))
+    core_slices = split_cores(cores, num_workers)
+    print(f"并行模式: {num_workers} 个 worker，每个 {len(core_slices[-1])}~{len(core_slices[0])} 个线程")
+
+    context = multiprocessing.get_context('spawn')
+    tasks, events = context.Queue(), context.Queue()
+    for result_dir, algorithms in jobs:
+        tasks.put((str(result_dir), list(algorithms)))
+    for _ in range(num_workers):
+        tasks.put(None)
+    workers = [context.Process(target=_shard_worker,
+                               args=(i, core_slices[i], inference_kwargs, skip_existing, tasks, events),
+                               daemon=True)
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    totals = new_counts()
+    in_progress = {}  # worker -> 正在处理的目录
+    finished, done = set(), 0
+    while len(finished) < num_workers:
+        try:
+            kind, worker_index, result_dir, payload = events.get(timeout=1.0)
+        except queue.Empty:
+            # 没有事件时检查是否有 worker 崩溃（没来得及发 exit）
+            for i, worker in enumerate(workers):
+                if i not in finished and not worker.is_alive():
+                    finished.add(i)
+                    lost = in_progress.pop(i, None)
+                    print(f"[X] worker {i} 异常退出 (exitcode={worker.exitcode})")
+                    if lost is not None:
+                        totals['errors'] += 1
+                        done += 1
+                        print(f"[X] 目录未完成: {lost}")
+            continue
+        if kind == 'started':
+            in_progress[worker_index] = result_dir
+        elif kind == 'done':
+            in_progress.pop(worker_index, None)
+            for key, value in payload.items():
+                totals[key] += value
+            done += 1
+            print(f"[{done}/{len(jobs)}] worker {worker_index} 完成: {result_dir}")
+        elif kind == 'failed':
+            print(f"[X] worker {worker_index} 初始化失败: {payload}")
+        elif kind == 'exit':
+            finished.add(worker_index)
+
+    for worker in workers:
+        worker.join()
+    # 所有 worker 都退出后仍留在队列里的目录（worker 初始化失败或崩溃）计为失败
+    unprocessed = len(jobs) - done
+    if unprocessed > 0:
+        print(f"[X] 有 {unprocessed} 个目录未被处理")
+        totals['errors'] += unprocessed
+    return totals
+
+
+def batch_process_folder(base_folder, model_paths, algorithms=None, num_classes=7, skip_existing=False,
+                         cache_bytes=0, prediction_store=None, measure_timing=True, lazy_models=False,
+                         num_workers=1, incremental=False, dry_run=False):
+    """
+    批量处理指定文件夹下所有 result_N 目录中各算法的调度结果
+
+    Args:
+        base_folder: 要处理的文件夹路径（如 result_with_fifo_edf/result_list_ddl20）
+        model_paths: 模型路径字典 {size: path}
+        algorithms: 要处理的算法名列表，None 表示注册表中的全部
+        num_classes: 分类数量
+        skip_existing: 是否跳过已存在的计时文件
+        cache_bytes: 张量缓存的字节预算，用于在同一目录的各算法之间共享解码结果
+        prediction_store: 预测结果库路径，None 表示不使用
+        measure_timing: 是否真实计时（False 时从预测库取结果）
+        lazy_models: 是否按需加载模型
+        num_workers: 并行处理的进程数，1 表示在当前进程中串行处理；
+                     只在不计时（measure_timing=False 且给出 prediction_store）时生效，计时模式总是串行
+        incremental: 按结果树根目录下的清单（result_manifest.py）只重新计算输入有变化的条目，
+                     此时忽略 skip_existing
+        dry_run: 只列出会被重新计算的条目及原因，不加载模型也不写文件（隐含 incremental）
+    """
+    algorithms = list(algorithms or ALGORITHMS)
+    print(f"\n{'='*80}")
+    print(f"开始批量处理文件夹: {base_folder} (算法: {', '.join(algorithms)})")
+    print(f"{'='*80}\n")
+
+    result_dirs = find_result_dirs(base_folder)
+    if not result_dirs:
+        print(f"[!] 未找到任何 result_N 目录")
+        return
+
+    if num_workers > 1 and (measure_timing or prediction_store is None):
+        print("[!] 并行模式下各 worker 只分到部分核心且相互争用内存带宽，实测耗时会随 worker 数变化；"
+              "只在 measure_timing=False 且使用预测库时并行，本次改为串行")
+        num_workers = 1
+
+    inference_kwargs = {
+        'model_paths': model_paths, 'image_folder': "images_cropped/cropped_1", 'num_classes': num_classes,
+        'cache_bytes': cache_bytes, 'prediction_store': prediction_store,
+        'measure_timing': measure_timing, 'lazy_models': lazy_models
+    }
+    jobs = [(result_dir, algorithms) for result_dir in result_dirs]
+    manifest, fingerprints = None, {}
+    if incremental or dry_run:
+        manifest = ResultManifest(base_folder)
+        config = timing_config(inference_kwargs, num_workers)
+        jobs, fingerprints = plan_incremental(manifest, result_dirs, algorithms, model_paths, config)
+        skip_existing = False
+        print(f"清单 {manifest.path}: {len(fingerprints)} 个条目需要重新计算，涉及 {len(jobs)} 个目录")
+        if dry_run:
+            for output_path, (_, reasons) in fingerprints.items():
+                print(f"  {output_path}  ({', '.join(reasons)})")
+            return dict(new_counts(), pending=list(fingerprints))
+        if not jobs:
+            manifest.save()
+            print("[OK] 所有条目都是最新的")
+            return new_counts()
+
+    if num_workers > 1:
+        totals = process_dirs_parallel(jobs, inference_kwargs, skip_existing, num_workers)
+    else:
+        print("正在加载模型...")
+        inference = SimpleInference(**inference_kwargs)
+        print()
+
+        totals = new_counts()
+        for idx, (result_dir, dir_algorithms) in enumerate(jobs, 1):
+            print(f"\n{'='*80}")
+            print(f"[{idx}/{len(jobs)}] 处理目录: {result_dir}")
+            print(f"{'='*80}")
+            counts = process_result_dir(inference, result_dir, dir_algorithms, skip_existing)
+            for key, value in counts.items():
+                totals[key] += value
+        inference.close()
+
+    if manifest is not None:
+        for output_path in totals['outputs']:
+            if output_path in fingerprints:
+                manifest.record(output_path, fingerprints[output_path][0])
+        manifest.save()
+
+    print(f"\n{'='*80}")
+    print(f"批量处理完成")
+    print(f"{'='*80}")
+    print(f"目录数:     {len(jobs)}")
+    print(f"已处理:     {totals['processed']}")
+    print(f"[-1]文件:   {totals['minus_one']}")
+    print(f"失败:       {totals['errors']}")
+    print(f"{'='*80}\n")
+    return totals
+
+
+def main():
+    folders_to_process = [
+        'result_with_fifo_edf/result_list_ddl20',
+    ]
+
+    # 要处理的算法（见 ALGORITHMS），None 表示全部
+    algorithms = None
+
+    # 是否跳过已存在的 *_time.json 文件（True=跳过，False=覆盖）
+    skip_existing = False
+
+    # 分类数量
+    num_classes = 7
+
+    # 张量缓存预算：同一 result_N 目录的各算法共享解码后的图片
+    cache_bytes = 1024 * 1024 * 1024
+    # 预测结果持久化库，None 表示不使用
+    prediction_store = None
+    # 是否真实计时；False 时直接从预测库取结果，只对未命中的图片运行模型
+    measure_timing = True
+    # 是否按需加载模型（第一次用到某个尺寸时才加载，权重内存映射）
+    lazy_models = False
+    # 增量模式：按清单只重新计算调度结果、图片、模型或计时配置有变化的条目
+    incremental = False
+    # 只列出增量模式下会重新计算的条目，不实际运行
+    dry_run = False
+    # 并行处理的进程数，1 表示串行；各进程均分 CPU 核心，torch 线程总数与核心数一致
+    # 只在不计时模式（measure_timing=False 且有预测库）下生效，计时模式总是串行
+    num_workers = 1
+    # 处理完成后用本次的实测批次耗时更新代价模型（cost_model.py），C 调度器下次启动时读取
+    update_cost_model = False
+
+    # 模型路径配置
+    model_paths = {
+        64: 'back/model/model_64.pth',
+        128: 'back/model/model_128.pth',
+        256: 'back/model/model_256.pth',
+        512: 'back/model/model_512.pth'
+    }
+
+    missing = [path for path in model_paths.values() if not os.path.exists(path)]
+    if missing:
+        print(f"[X] 模型文件不存在: {missing}")
+        print("程序退出")
+        return
+
+    for folder in folders_to_process:
+        batch_process_folder(
+            folder,
+            model_paths,
+            algorithms=algorithms,
+            num_classes=num_classes,
+            skip_existing=skip_existing,
+            cache_bytes=cache_bytes,
+            prediction_store=prediction_store,
+            measure_timing=measure_timing,
+            lazy_models=lazy_models,
+            num_workers=num_workers,
+            incremental=incremental,
+            dry_run=dry_run
+        )
+
+    if update_cost_model:
+        cost_model.update_cost_model(folders_to_process)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 from simple_inference import SimpleInference, process_single_result
+from inference_client import RemoteInference
+import cost_model
 
 
 def find_all_fifo_batch_result_files(base_folder):
@@ -54,7 +56,9 @@ def extract_cropped_folder_from_result_path(result_path):
     return "images_cropped/cropped_1"
 
 
-def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=False):
+def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=False,
+                         prediction_store=None, measure_timing=True, lazy_models=False,
+                         inference_server=None):
     """
     批量处理指定文件夹中的所有 fifo_batch_result.json 文件
     
@@ -63,6 +67,10 @@ def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=
         model_paths: 模型路径字典 {size: path}
         num_classes: 分类数量
         skip_existing: 是否跳过已存在的文件
+        prediction_store: 预测结果库路径，None 表示不使用
+        measure_timing: 是否真实计时（False 时从预测库取结果）
+        lazy_models: 是否按需加载模型（只加载任务里用到的尺寸）
+        inference_server: 推理服务地址，给出时改用常驻服务（模型已加载并预热），None 表示在本进程加载
     """
     print(f"\n{'='*80}")
     print(f"开始批量处理文件夹: {base_folder}")
@@ -82,7 +90,12 @@ def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=
     # 如果图片文件夹不同，需要为每个任务单独处理
     print("正在加载模型...")
     # 这里暂时使用一个占位的 image_folder，实际会在处理时动态调整
-    inference = SimpleInference(model_paths, "images_cropped/cropped_1", num_classes=num_classes)
+    if inference_server is not None:
+        inference = RemoteInference(inference_server, "images_cropped/cropped_1")
+    else:
+        inference = SimpleInference(model_paths, "images_cropped/cropped_1", num_classes=num_classes,
+                                    prediction_store=prediction_store, measure_timing=measure_timing,
+                                    lazy_models=lazy_models)
     print()
     
     # 统计信息
@@ -162,6 +175,17 @@ def main():
     
     # 分类数量
     num_classes = 7
+
+    # 预测结果持久化库（所有 batch_process_* 脚本可共用同一个文件），None 表示不使用
+    prediction_store = None
+    # 是否真实计时；False 时直接从预测库取结果，只对未命中的图片运行模型
+    measure_timing = True
+    # 是否按需加载模型（第一次用到某个尺寸时才加载，权重内存映射）
+    lazy_models = False
+    # 常驻推理服务地址（inference_server.py），例如 inference_client.SOCKET_PATH；None 表示在本进程加载模型
+    inference_server = None
+    # 处理完成后用本次的实测批次耗时更新代价模型（cost_model.py），C 调度器下次启动时读取
+    update_cost_model = False
     
     # 模型路径配置
     model_paths = {
@@ -201,9 +225,16 @@ def main():
             folder, 
             model_paths, 
             num_classes=num_classes,
-            skip_existing=skip_existing
+            skip_existing=skip_existing,
+            prediction_store=prediction_store,
+            measure_timing=measure_timing,
+            lazy_models=lazy_models,
+            inference_server=inference_server
         )
 
+    if update_cost_model:
+        cost_model.update_cost_model(folders_to_process)
+
 
 if __name__ == '__main__':
     main()
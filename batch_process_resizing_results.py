@@ -2,6 +2,8 @@ import os
 import json
 from pathlib import Path
 from simple_inference import SimpleInference, process_single_result
+from inference_client import RemoteInference
+import cost_model
 
 
 def find_all_resizing_result_files(base_folder):
@@ -66,7 +68,9 @@ def save_minus_one_result(output_path):
         print(f"[X] 保存 [-1] 失败: {e}")
 
 
-def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=False):
+def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=False,
+                         prediction_store=None, measure_timing=True, lazy_models=False,
+                         inference_server=None):
     # 查找所有 resizing_result.json 文件
     file_pairs = find_all_resizing_result_files(base_folder)
     
@@ -79,7 +83,12 @@ def batch_process_folder(base_folder, model_paths, num_classes=7, skip_existing=
     # 由于所有任务使用相同的模型，只需加载一次
     print("正在加载模型...")
     # 这里暂时使用一个占位的 image_folder，实际会在处理时动态调整
-    inference = SimpleInference(model_paths, "images_cropped/cropped_1", num_classes=num_classes)
+    if inference_server is not None:
+        inference = RemoteInference(inference_server, "images_cropped/cropped_1")
+    else:
+        inference = SimpleInference(model_paths, "images_cropped/cropped_1", num_classes=num_classes,
+                                    prediction_store=prediction_store, measure_timing=measure_timing,
+                                    lazy_models=lazy_models)
     print()
     
     # 统计信息
@@ -165,6 +174,17 @@ def main():
     
     # 分类数量
     num_classes = 7
+
+    # 预测结果持久化库（所有 batch_process_* 脚本可共用同一个文件），None 表示不使用
+    prediction_store = None
+    # 是否真实计时；False 时直接从预测库取结果，只对未命中的图片运行模型
+    measure_timing = True
+    # 是否按需加载模型（第一次用到某个尺寸时才加载，权重内存映射）
+    lazy_models = False
+    # 常驻推理服务地址（inference_server.py），例如 inference_client.SOCKET_PATH；None 表示在本进程加载模型
+    inference_server = None
+    # 处理完成后用本次的实测批次耗时更新代价模型（cost_model.py），C 调度器下次启动时读取
+    update_cost_model = False
     
     # 模型路径配置
     model_paths = {
@@ -202,9 +222,16 @@ def main():
             folder, 
             model_paths, 
             num_classes=num_classes,
-            skip_existing=skip_existing
+            skip_existing=skip_existing,
+            prediction_store=prediction_store,
+            measure_timing=measure_timing,
+            lazy_models=lazy_models,
+            inference_server=inference_server
         )
 
+    if update_cost_model:
+        cost_model.update_cost_model(folders_to_process)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,104 @@
+import json
+import time
+
+import torch
+
+from model_torch import count_stage_macs
+from simple_inference import SimpleInference
+from labeled_images import collect_labeled_images, iter_labeled_batches
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+CALIBRATION_ROOT = "better_images"  # 带标签的校准图片目录
+TARGET_ACCURACY = 0.85  # 每个提前出口上退出样本需要达到的准确率
+BATCH_SIZE = 64
+OUTPUT_PATH = "exit_thresholds.json"  # 输出文件，可直接传给 SimpleInference(exit_thresholds=...)
+
+
+def collect_exit_outputs(model, samples, size, device, batch_size=BATCH_SIZE):
+    """一次前向（forward_train）得到四个出口的置信度与是否预测正确，形状均为 [N, 4]"""
+    confidences = []
+    correct = []
+    with torch.inference_mode():
+        for images, labels in iter_labeled_batches(samples, size, batch_size, device):
+            outputs = model.forward_train(images)
+            probs = torch.stack([torch.softmax(out, dim=1) for out in outputs], dim=1)
+            conf, pred = torch.max(probs, dim=2)
+            confidences.append(conf.cpu())
+            correct.append((pred == labels.unsqueeze(1)).cpu())
+    return torch.cat(confidences), torch.cat(correct)
+
+
+def calibrate_thresholds(confidences, correct, target_accuracy):
+    """
+    逐个出口选阈值：在尚未退出的样本里按置信度从高到低排序，取累计准确率仍不低于
+    target_accuracy 的最长前缀，前缀中最低的置信度就是该出口的阈值；达不到时该出口不启用(None)。
+    """
+    n = confidences.shape[0]
+    remaining = torch.ones(n, dtype=torch.bool)
+    exit_stage = torch.full((n,), 4, dtype=torch.long)
+    thresholds = []
+    for stage in range(3):
+        idx = torch.nonzero(remaining).flatten()
+        threshold = None
+        if idx.numel() > 0:
+            conf = confidences[idx, stage]
+            order = torch.argsort(conf, descending=True)
+            hits = correct[idx, stage][order].float()
+            cum_acc = torch.cumsum(hits, dim=0) / torch.arange(1, idx.numel() + 1)
+            ok = torch.nonzero(cum_acc >= target_accuracy).flatten()
+            if ok.numel() > 0:
+                threshold = float(conf[order[ok[-1]]])
+                exiting = idx[conf >= threshold]
+                exit_stage[exiting] = stage + 1
+                remaining[exiting] = False
+        thresholds.append(threshold)
+
+    final_correct = correct[torch.arange(n), exit_stage - 1]
+    return thresholds, exit_stage, final_correct
+
+
+def main():
+    inference = SimpleInference(MODEL_PATHS, CALIBRATION_ROOT)
+    samples = collect_labeled_images(CALIBRATION_ROOT, inference.class_mapping)
+    if not samples:
+        print(f"[X] 未在 {CALIBRATION_ROOT} 中找到带标签的图片")
+        return
+    print(f"[OK] 校准图片: {len(samples)} 张，目标准确率: {TARGET_ACCURACY}")
+
+    report = {
+        'calibration_root': CALIBRATION_ROOT,
+        'target_accuracy': TARGET_ACCURACY,
+        'num_images': len(samples),
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'sizes': {}
+    }
+    for size, model in sorted(inference.models.items()):
+        confidences, correct = collect_exit_outputs(model, samples, size, inference.device)
+        thresholds, exit_stage, final_correct = calibrate_thresholds(confidences, correct, TARGET_ACCURACY)
+        stage_macs = count_stage_macs(model, size)
+        mean_macs = sum(stage_macs[s - 1] for s in exit_stage.tolist()) / len(samples)
+        entry = {
+            'thresholds': thresholds,
+            'accuracy': round(final_correct.float().mean().item(), 4),
+            'full_model_accuracy': round(correct[:, 3].float().mean().item(), 4),
+            'mean_exit_stage': round(exit_stage.float().mean().item(), 3),
+            'exit_histogram': [int((exit_stage == s).sum()) for s in range(1, 5)],
+            'relative_compute': round(mean_macs / stage_macs[3], 4)
+        }
+        report['sizes'][str(size)] = entry
+        print(f"  {size}px: 阈值={thresholds}, 准确率={entry['accuracy']} (完整网络 {entry['full_model_accuracy']}), "
+              f"平均退出阶段={entry['mean_exit_stage']}, 相对计算量={entry['relative_compute']}")
+
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] 阈值已保存到: {OUTPUT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
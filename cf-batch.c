@@ -9,6 +9,7 @@
 #include <string.h>
 #include <float.h>
 #include <ctype.h>
+#include "cost_model.h"
 
 typedef struct {
     int size;          // 1..4 internal size index
@@ -17,9 +18,19 @@ typedef struct {
     int crucial;       // 1 = crucial, 0 = non-crucial
 } Task;
 
-// 时间模型（与 main.c 保持一致）
-static const double trans_time_size[4] = {0.75, 1.0, 1.7, 5.3};
-static const double proc_time_size_1d[4] = {2.25, 3.5, 3.5, 1.8};
+// 时间模型（与 main.c 保持一致），启动时可被 cost_model.txt 覆盖
+static double trans_time_size[4] = {0.75, 1.0, 1.7, 5.3};
+static double proc_time_size_1d[4] = {2.25, 3.5, 3.5, 1.8};
+
+// 用 cost_model.txt 中完整网络（阶段4）的实测参数覆盖上面的编译期常量
+static void apply_cost_model(void) {
+    double k[4][4], b[4][4];
+    if (load_cost_model(k, b) == 0) return;
+    for (int i = 0; i < 4; i++) {
+        if (k[i][3] >= 0) trans_time_size[i] = k[i][3];
+        if (b[i][3] >= 0) proc_time_size_1d[i] = b[i][3];
+    }
+}
 
 static int get_actual_size(int internal_size) {
     switch(internal_size) {
@@ -146,6 +157,7 @@ static int cmp_taskptr_deadline(const void *a, const void *b) {
 }
 
 int main(int argc, char *argv[]) {
+    apply_cost_model();
     const char *task_file = "tasks.csv";
     if (argc > 1) task_file = argv[1];
 
@@ -0,0 +1,265 @@
+import os
+import time
+import multiprocessing
+
+PRIOR_CORE_MS_PER_MPIXEL = 600.0  # 没有实测值时的先验：每百万像素约需 600 核·毫秒（只用于第一轮分核）
+WORK_EMA_ALPHA = 0.5  # 实测工作量的指数滑动平均系数
+START_MARGIN_S = 0.02  # 协调进程发出开始时间后，留给各 worker 收到命令的余量
+
+
+def available_cores():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def split_rounds(prepared):
+    """
+    把批次序列切成调度轮次
+
+    main.c 每一轮对每个尺寸最多输出一个批次（GPU_process），所以连续且尺寸互不相同的批次属于同一轮，
+    尺寸重复出现即进入下一轮。
+    """
+    rounds = []
+    current, seen = [], set()
+    for item in prepared:
+        if item['size'] in seen:
+            rounds.append(current)
+            current, seen = [], set()
+        current.append(item)
+        seen.add(item['size'])
+    if current:
+        rounds.append(current)
+    return rounds
+
+
+class CorePartitioner:
+    """
+    为一轮中的各尺寸批次分配互不相交的核
+
+    按各批次的估计工作量（核·毫秒）成比例分核，每个批次至少一个核。每轮结束后用实测的
+    耗时×核数更新 (尺寸, 阶段) 的单图工作量；不断重复后各批次的完成时间趋于一致，即 makespan 最小。
+    """
+
+    def __init__(self, cores=None):
+        self.cores = list(cores) if cores else available_cores()
+        self.work = {}  # (size, stage) -> 每张图片的核·毫秒
+
+    def estimate(self, size, stage, batch_len):
+        per_image = self.work.get((size, stage))
+        if per_image is None:
+            per_image = PRIOR_CORE_MS_PER_MPIXEL * size * size / 1e6
+        return per_image * batch_len
+
+    def partition(self, items):
+        """返回与 items 对应的核列表；核数少于批次数时返回 None（无法并行）"""
+        total = len(self.cores)
+        if not items or len(items) > total:
+            return None
+        weights = [self.estimate(item['size'], item['stage'], len(item['valid_ids'])) for item in items]
+        spare = total - len(items)
+        weight_sum = sum(weights) or 1.0
+        shares = [spare * w / weight_sum for w in weights]
+        counts = [1 + int(share) for share in shares]
+        # 最大余数法分配剩下的核
+        leftovers = sorted(range(len(items)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+        for i in leftovers[:total - sum(counts)]:
+            counts[i] += 1
+        assigned, start = [], 0
+        for count in counts:
+            assigned.append(self.cores[start:start + count])
+            start += count
+        return assigned
+
+    def update(self, size, stage, batch_len, num_cores, time_ms):
+        if batch_len <= 0 or time_ms <= 0:
+            return
+        observed = time_ms * num_cores / batch_len
+        previous = self.work.get((size, stage))
+        self.work[(size, stage)] = observed if previous is None else (
+            WORK_EMA_ALPHA * observed + (1 - WORK_EMA_ALPHA) * previous)
+
+
+class WorkerLost(RuntimeError):
+    """worker 进程意外退出（管道已断开）"""
+
+
+def _pin(cores):
+    import torch
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+
+def _worker_main(conn, cores, inference_kwargs):
+    # 每个 worker 只绑定到分给它的核上，intra-op 线程数等于核数
+    from simple_inference import SimpleInference
+    _pin(cores)
+    inference = SimpleInference(lazy_models=True, **inference_kwargs)
+    timed_use_cache = inference.timed_cache == 'warm'
+    while True:
+        command, args = conn.recv()
+        if command == 'close':
+            break
+        try:
+            if command == 'pin':
+                _pin(args)
+                reply = None
+            elif command == 'warmup':
+                image_folder, valid_ids, size, stage, runs = args
+                inference.image_folder = image_folder
+                inference._warmup(valid_ids, size, stage, runs=runs)
+                reply = None
+            elif command == 'run':
+                start_at, valid_ids, size, stage = args
+                while time.monotonic() < start_at:
+                    pass
+                start = time.monotonic()
+                pred_ids, pred_names, extras = inference._load_and_predict(valid_ids, size, stage,
+                                                                           use_cache=timed_use_cache)
+                inference._sync()
+                reply = (start, time.monotonic(), pred_ids, pred_names, extras)
+            else:
+                raise ValueError(f"未知命令: {command}")
+            conn.send(('ok', reply))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    inference.close()
+
+
+class RoundExecutor:
+    """
+    让一轮中不同尺寸的批次在互不相交的核上同时执行
+
+    每个尺寸一个常驻 worker 进程（只加载自己用到的模型），每轮按 CorePartitioner 的结果重新绑核。
+    正式计时时协调进程给出同一个开始时刻，各 worker 同时开始，round makespan = 最晚结束时刻 - 开始时刻。
+    任何一个 worker 意外退出后执行器标记为失效（dead），所有 worker 被关闭，之后的轮次都返回 None（由调用方串行执行）。
+    """
+
+    def __init__(self, inference_kwargs, cores=None, warmup_runs=7, stabilize_runs=3):
+        self.inference_kwargs = inference_kwargs
+        self.partitioner = CorePartitioner(cores)
+        self.warmup_runs = warmup_runs
+        self.stabilize_runs = stabilize_runs
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = {}  # size -> (process, conn)
+        self._warmed = set()
+        self.dead = False
+
+    def _worker(self, size, cores):
+        worker = self._workers.get(size)
+        if worker is None:
+            parent_conn, child_conn = self._context.Pipe()
+            process = self._context.Process(target=_worker_main, args=(child_conn, cores, self.inference_kwargs),
+                                            daemon=True)
+            process.start()
+            # 关闭父进程里的子端，worker 退出后 recv 才会收到 EOFError 而不是一直阻塞
+            child_conn.close()
+            worker = (process, parent_conn)
+            self._workers[size] = worker
+        else:
+            self._call(worker, 'pin', cores)
+        return worker
+
+    @staticmethod
+    def _send(worker, command, args=None):
+        try:
+            worker[1].send((command, args))
+        except OSError as e:  # BrokenPipeError / ConnectionResetError
+            raise WorkerLost(f"worker 进程 {worker[0].pid} 已退出: {e}") from e
+
+    @staticmethod
+    def _recv(worker):
+        try:
+            return worker[1].recv()
+        except (EOFError, OSError) as e:
+            raise WorkerLost(f"worker 进程 {worker[0].pid} 已退出 (exitcode={worker[0].exitcode})") from e
+
+    @staticmethod
+    def _call(worker, command, args=None):
+        RoundExecutor._send(worker, command, args)
+        return RoundExecutor._reply(worker)
+
+    @staticmethod
+    def _reply(worker):
+        status, value = RoundExecutor._recv(worker)
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    @staticmethod
+    def _gather(workers):
+        # 先收齐所有回复再报错，避免管道里残留未读的回复
+        replies = [RoundExecutor._recv(worker) for worker in workers]
+        for status, value in replies:
+            if status != 'ok':
+                raise RuntimeError(value)
+        return [value for _, value in replies]
+
+    def run_round(self, items, image_folder):
+        """
+        执行一轮，返回 ({batch_index: outcome}, 轮次信息)；核数不足以并行或执行器已失效时返回 None
+        outcome 与 SimpleInference._run_batch 的返回格式相同
+        """
+        if self.dead:
+            return None
+        try:
+            return self._run_round(items, image_folder)
+        except WorkerLost as e:
+            # 其它 worker 可能还在等命令或回复，全部关闭；这一轮及之后的轮次由调用方串行执行
+            print(f"[X] {e}，并行执行器失效，之后的轮次改为串行执行")
+            self.dead = True
+            self.close()
+            return None
+
+    def _run_round(self, items, image_folder):
+        assignment = self.partitioner.partition(items)
+        if assignment is None:
+            return None
+        workers = [self._worker(item['size'], cores) for item, cores in zip(items, assignment)]
+
+        for item, worker in zip(items, workers):
+            runs = self.warmup_runs if item['size'] not in self._warmed else 1
+            self._send(worker, 'warmup', (image_folder, item['valid_ids'], item['size'], item['stage'], runs))
+        self._gather(workers)
+        self._warmed.update(item['size'] for item in items)
+
+        last = None
+        for _ in range(self.stabilize_runs):
+            start_at = time.monotonic() + START_MARGIN_S
+            for item, worker in zip(items, workers):
+                self._send(worker, 'run', (start_at, item['valid_ids'], item['size'], item['stage']))
+            replies = self._gather(workers)
+            makespan_ms = (max(reply[1] for reply in replies) - start_at) * 1000
+            # 与串行计时口径一致：取最后一次
+            last = (makespan_ms, replies)
+
+        makespan_ms, replies = last
+        outcomes = {}
+        for item, cores, (start, end, pred_ids, pred_names, extras) in zip(items, assignment, replies):
+            time_ms = (end - start) * 1000
+            self.partitioner.update(item['size'], item['stage'], len(item['valid_ids']), len(cores), time_ms)
+            outcomes[item['batch_index']] = {
+                'time_ms': time_ms,
+                'pred_ids': pred_ids,
+                'pred_names': pred_names,
+                'extras': extras,
+                'info': {'cores': len(cores), 'core_ids': list(cores)}
+            }
+        round_info = {
+            'round_makespan_ms': round(makespan_ms, 2),
+            'round_serial_ms': round(sum(outcome['time_ms'] for outcome in outcomes.values()), 2)
+        }
+        return outcomes, round_info
+
+    def close(self):
+        for process, conn in self._workers.values():
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._workers = {}
@@ -0,0 +1,53 @@
+// 读取 cost_model.py 生成的代价表，所有调度器共用
+#ifndef COST_MODEL_H
+#define COST_MODEL_H
+
+#include <stdio.h>
+#include <stdlib.h>
+
+#define COST_MODEL_DEFAULT_PATH "cost_model.txt"
+
+// 文件路径取环境变量 COST_MODEL_FILE，缺省为当前目录下的 cost_model.txt
+// 每行格式：<尺寸px> <阶段1-4> <k> <b> [观测数]，# 开头为注释
+// 读到的项写入 k[尺寸下标][阶段-1]、b[尺寸下标][阶段-1]，未出现的项为 -1
+// 返回读到的条目数；文件不存在时返回 0，调用方保留编译期常量
+static int load_cost_model(double k[4][4], double b[4][4])
+{
+    for (int i = 0; i < 4; i++) {
+        for (int j = 0; j < 4; j++) {
+            k[i][j] = -1.0;
+            b[i][j] = -1.0;
+        }
+    }
+    const char *path = getenv("COST_MODEL_FILE");
+    if (!path || !*path) {
+        path = COST_MODEL_DEFAULT_PATH;
+    }
+    FILE *fp = fopen(path, "r");
+    if (!fp) {
+        return 0;
+    }
+    char line[256];
+    int count = 0;
+    while (fgets(line, sizeof(line), fp)) {
+        int size, stage;
+        double kv, bv;
+        if (line[0] == '#' || sscanf(line, "%d %d %lf %lf", &size, &stage, &kv, &bv) != 4) {
+            continue;
+        }
+        int idx = size == 64 ? 0 : size == 128 ? 1 : size == 256 ? 2 : size == 512 ? 3 : -1;
+        if (idx < 0 || stage < 1 || stage > 4 || kv < 0 || bv < 0) {
+            continue;
+        }
+        k[idx][stage - 1] = kv;
+        b[idx][stage - 1] = bv;
+        count++;
+    }
+    fclose(fp);
+    if (count > 0) {
+        fprintf(stderr, "[cost_model] 已从 %s 读取 %d 项代价参数\n", path, count);
+    }
+    return count;
+}
+
+#endif
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+from pathlib import Path
+
+# 配置
+SIZES = [64, 128, 256, 512]
+STAGES = [1, 2, 3, 4]
+STATE_PATH = "cost_model.json"  # 模型状态（滑动平均的统计量和已读取过的结果文件）
+OUTPUT_PATH = "cost_model.txt"  # 给 C 调度器读取的代价表（见 cost_model.h）
+RESULT_ROOT = "result_with_fifo_edf"
+RESULT_PATTERN = "*_time.json"  # batch_process_* 脚本输出的计时结果
+ALPHA = 0.1  # 每个新观测的权重，越大越快跟上最新的实测
+# C 调度器的时间单位对应的毫秒数。编译期常量与实测批次耗时同一量级
+# （10 张 64px: 0.75*10+2.25=9.75，实测约 6.4ms），按毫秒处理。
+# 任务文件中的 deadline 与代价表同一单位（C 端直接比较累计时间和 deadline），所有换算都用这一个常量
+TIME_UNIT_MS = 1.0
+
+# C 代码中编译期的常量（调度器时间单位），没有实测数据时作为先验
+DEFAULT_TRANS_TIME = [0.75, 1.0, 1.7, 5.3]
+DEFAULT_PROC_TIME = [
+    [0.03, 0.05, 0.06, 2.25],
+    [0.04, 0.06, 0.08, 3.5],
+    [0.05, 0.07, 0.10, 3.5],
+    [0.06, 0.09, 0.12, 1.8]
+]
+_MOMENTS = ('sw', 'sx', 'sy', 'sxx', 'sxy')
+
+
+def deadline_to_ms(deadline):
+    """C 调度器输出的 {"deadline": x}（调度器时间单位）换算为毫秒"""
+    return float(deadline) * TIME_UNIT_MS
+
+
+class CostModel:
+    """
+    按 (尺寸, 阶段) 维护批次耗时 y = k*x + b 的指数加权最小二乘估计
+
+    每个观测 (批次长度 x, 耗时 y) 进来时，旧的统计量先乘 (1 - alpha) 衰减，新观测以 alpha 的权重加入，
+    再由加权矩求 k、b。只见过一种批次长度时方差为 0，k 保持原值、只更新 b。
+    """
+
+    def __init__(self, state_path=STATE_PATH, alpha=ALPHA):
+        self.state_path = state_path
+        self.alpha = alpha
+        self.entries = {}  # (size, stage) -> {'k', 'b', 'n', 矩...}，k/b 单位为毫秒
+        self.seen = {}  # 结果文件路径 -> mtime_ns，避免重复计入
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def load(self):
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for key, entry in data.get('entries', {}).items():
+            size, stage = key.split(':')
+            self.entries[(int(size), int(stage))] = entry
+        self.seen = data.get('seen', {})
+
+    def save(self):
+        data = {
+            'version': 1,
+            'alpha': self.alpha,
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'entries': {f"{size}:{stage}": entry for (size, stage), entry in sorted(self.entries.items())},
+            'seen': self.seen
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def prior(size, stage):
+        i = SIZES.index(size)
+        return DEFAULT_TRANS_TIME[i] * TIME_UNIT_MS, DEFAULT_PROC_TIME[i][stage - 1] * TIME_UNIT_MS
+
+    def estimate(self, size, stage):
+        """返回 (k_ms, b_ms)"""
+        entry = self.entries.get((size, stage))
+        if entry is None:
+            return self.prior(size, stage)
+        return entry['k'], entry['b']
+
+    def observe(self, size, stage, batch_len, time_ms):
+        if size not in SIZES or stage not in STAGES or batch_len <= 0 or time_ms <= 0:
+            return False
+        entry = self.entries.get((size, stage))
+        if entry is None:
+            k, b = self.prior(size, stage)
+            entry = dict({moment: 0.0 for moment in _MOMENTS}, k=k, b=b, n=0)
+            self.entries[(size, stage)] = entry
+        x, y = float(batch_len), float(time_ms)
+        for moment in _MOMENTS:
+            entry[moment] *= 1.0 - self.alpha
+        entry['sw'] += self.alpha
+        entry['sx'] += self.alpha * x
+        entry['sy'] += self.alpha * y
+        entry['sxx'] += self.alpha * x * x
+        entry['sxy'] += self.alpha * x * y
+        entry['n'] += 1
+
+        mean_x = entry['sx'] / entry['sw']
+        mean_y = entry['sy'] / entry['sw']
+        var_x = entry['sxx'] / entry['sw'] - mean_x * mean_x
+        if var_x > 1e-9:
+            k = (entry['sxy'] / entry['sw'] - mean_x * mean_y) / var_x
+            if k >= 0:
+                entry['k'] = k
+        entry['b'] = max(0.0, mean_y - entry['k'] * mean_x)
+        return True
+
+    def observe_results(self, results):
+        """从 process_json_file 的输出中取出可用的批次实测，返回计入的批次数"""
+        count = 0
+        for item in results:
+            info = item.get('batch_info') if isinstance(item, dict) else None
+            if not info:
+                continue
+            # 未计时、复用/预测的耗时、动态退出/级联（实际计算量不固定）、分核并行（核数不同）的批次不计入
+            if info.get('timed') is False or info.get('latency_source') in ('memo', 'profile'):
+                continue
+            if info.get('dynamic_exit') or info.get('cascade') or 'cores' in info:
+                continue
+            batch_len = info.get('executed_images', info.get('image_count', 0))
+            if self.observe(info.get('size'), info.get('exit_stage', 4), batch_len,
+                            info.get('batch_processing_time_ms', 0.0)):
+                count += 1
+        return count
+
+    def update_from_files(self, paths):
+        """读取计时结果文件，已读取过且未修改的文件跳过；返回 (新读取的文件数, 计入的批次数)"""
+        files, batches = 0, 0
+        for path in paths:
+            path = str(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if self.seen.get(path) == mtime:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[!] 跳过无法读取的结果文件 {path}: {e}")
+                continue
+            if isinstance(results, list):
+                batches += self.observe_results(results)
+            self.seen[path] = mtime
+            files += 1
+        return files, batches
+
+    def update_from_folders(self, folders, pattern=RESULT_PATTERN):
+        paths = []
+        for folder in folders:
+            if os.path.isdir(folder):
+                paths.extend(sorted(Path(folder).rglob(pattern)))
+        return self.update_from_files(paths)
+
+    def write_table(self, path=OUTPUT_PATH, time_unit_ms=TIME_UNIT_MS):
+        lines = [
+            "# 由 cost_model.py 生成，C 调度器启动时读取（见 cost_model.h）",
+            f"# 更新时间: {time.strftime('%Y-%m-%d %H:%M:%S')}, 时间单位: 1 = {time_unit_ms:g}ms",
+            "# 尺寸 阶段 k(每张图片的增量时间) b(批次固定开销) 观测批次数"
+        ]
+        for size in SIZES:
+            for stage in STAGES:
+                k, b = self.estimate(size, stage)
+                n = self.entries.get((size, stage), {}).get('n', 0)
+                lines.append(f"{size} {stage} {k / time_unit_ms:.6f} {b / time_unit_ms:.6f} {n}")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+def update_cost_model(folders, state_path=STATE_PATH, output_path=OUTPUT_PATH):
+    """用 folders 下的计时结果更新代价模型并重新生成 C 调度器读取的代价表"""
+    model = CostModel(state_path)
+    files, batches = model.update_from_folders(folders)
+    model.save()
+    model.write_table(output_path)
+    print(f"[OK] 代价模型已更新: 新读取 {files} 个结果文件, 计入 {batches} 个批次 -> {output_path}")
+    return model
+
+
+def main():
+    model = update_cost_model([RESULT_ROOT])
+    for size in SIZES:
+        k, b = model.estimate(size, 4)
+        print(f"  {size}px 完整网络: k={k:.3f}ms, b={b:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from preprocess import load_image_tensor
+
+
+def _init_worker():
+    # 每个解码进程只用一个线程，避免与主进程的推理线程池抢核
+    import torch
+    torch.set_num_threads(1)
+
+
+def _decode(image_path, size):
+    return load_image_tensor(image_path, size)
+
+
+class DecodePool:
+    """
+    多进程图片解码/预处理池（类似 DataLoader 的 worker）
+
+    imap 按输入顺序返回张量，同时在途任务不超过 num_workers * prefetch_depth，
+    避免一次性把整批 512px 图片都堆在队列里。
+    """
+
+    def __init__(self, num_workers=None, prefetch_depth=2):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.prefetch_depth = max(1, prefetch_depth)
+        # 用 spawn 启动，避免 fork 已经初始化过 torch 线程池的父进程
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+
+    def imap(self, image_paths, size):
+        max_in_flight = self.num_workers * self.prefetch_depth
+        pending = deque()
+        for image_path in image_paths:
+            pending.append(self._executor.submit(_decode, image_path, size))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -3,6 +3,8 @@ import subprocess
 import shutil
 import json
 import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # 配置
 TASK_FILES_DIR = "tasks/task_files_ddl25"  # CSV任务文件目录
@@ -10,373 +12,302 @@ RESULT_DIR = "test/test2"  # 结果保存目录
 FIFO_BATCH_EXE = "./fifo_batch"  # fifo_batch.c 编译后的可执行文件
 CF_BATCH_EXE = "./cf_batch"  # cf-batch.c 编译后的可执行文件
 FIFO_EXE = "./fifo" # fifo.c 编译后的可执行文件
+MAIN_EXE = "./main"  # main.c 编译后的可执行文件（只在 sweep.py 中使用）
+RESIZING_EXE = "./resizing"  # resizing.c 编译后的可执行文件（只在 sweep.py 中使用）
 NUM_EXPERIMENTS = 200  # 实验数量
+MAX_WORKERS = min(8, os.cpu_count() or 1)  # 同时运行的实验数，1 表示依次运行
+SCRATCH_ROOT = None  # 每个实验的临时工作目录放在这里，None 表示系统临时目录
+COST_MODEL_FILE = "cost_model.txt"  # 调度程序读取的代价表（cost_model.h 的默认路径），环境变量 COST_MODEL_FILE 优先
 
 # 输出文件名（程序运行后生成的文件）
 FIFO_BATCH_OUTPUT = "output_fifo_batch.json"
 CF_BATCH_OUTPUT = "output_cf_batch.json"
 FIFO_OUTPUT = "output_fifo.json"
+MAIN_OUTPUT = "output.json"
+RESIZING_OUTPUT = "output_resizing.json"
+
+# 各调度程序：源文件、可执行文件、程序写出的结果/丢失任务文件名，以及保存到结果文件夹时使用的文件名
+# resizing.c 不写丢失任务文件，调度失败时结果为 [-1]
+SCHEDULER_SPECS = {
+    'fifo_batch': {'label': 'FIFO 批处理调度算法', 'source': "fifo_batch.c", 'exe': FIFO_BATCH_EXE,
+                   'output': FIFO_BATCH_OUTPUT, 'missed': "missed_tasks_batch.json",
+                   'result_name': "fifo_batch_result.json", 'missed_name': "fifo_batch_missed_tasks.json"},
+    'cf_batch': {'label': 'CF-BATCH 调度算法', 'source': "cf-batch.c", 'exe': CF_BATCH_EXE,
+                 'output': CF_BATCH_OUTPUT, 'missed': "missed_tasks_cf_batch.json",
+                 'result_name': "cf_batch_result.json", 'missed_name': "cf_batch_missed_tasks.json"},
+    'fifo': {'label': 'FIFO 调度算法', 'source': "fifo.c", 'exe': FIFO_EXE,
+             'output': FIFO_OUTPUT, 'missed': "missed_tasks.json",
+             'result_name': "fifo_result.json", 'missed_name': "fifo_missed_tasks.json"},
+    'main': {'label': 'EDF 动态批处理调度算法', 'source': "main.c", 'exe': MAIN_EXE,
+             'output': MAIN_OUTPUT, 'missed': "missed_tasks.json",
+             'result_name': "main_result.json", 'missed_name': "main_missed_tasks.json"},
+    'resizing': {'label': '缩放调度算法', 'source': "resizing.c", 'exe': RESIZING_EXE,
+                 'output': RESIZING_OUTPUT, 'missed': None,
+                 'result_name': "resizing_result.json", 'missed_name': None},
+}
+SCHEDULERS = [SCHEDULER_SPECS[name] for name in ('fifo_batch', 'cf_batch', 'fifo')]
+
+
+def cost_model_path():
+    """调度程序读取的代价表路径，与 cost_model.h 一致：环境变量 COST_MODEL_FILE，缺省为 cost_model.txt"""
+    return os.environ.get('COST_MODEL_FILE') or COST_MODEL_FILE
+
+
+def compile_scheduler(scheduler):
+    source, exe = scheduler['source'], scheduler['exe']
+    print(f"编译 {source}...")
+    result = subprocess.run(["gcc", source, "-o", exe], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"[X] 编译 {source} 失败: {result.stderr}")
+        return False
+    print(f"[OK] 成功编译 {exe}")
+    return True
+
 
-def ensure_executables():
+def ensure_executables(schedulers=None):
     print("\n正在重新编译程序（确保使用最新代码）...")
-    
+
     try:
-        # 编译 fifo_batch.c
-        print(f"编译 fifo_batch.c...")
-        result = subprocess.run(["gcc", "fifo_batch.c", "-o", FIFO_BATCH_EXE],
-                              capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[X] 编译 fifo_batch.c 失败: {result.stderr}")
-            return False
-        print(f"[OK] 成功编译 {FIFO_BATCH_EXE}")
-        
-        # 编译 cf-batch.c
-        print(f"编译 cf-batch.c...")
-        result = subprocess.run(["gcc", "cf-batch.c", "-o", CF_BATCH_EXE],
-                              capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[X] 编译 cf-batch.c 失败: {result.stderr}")
-            return False
-        print(f"[OK] 成功编译 {CF_BATCH_EXE}")
-        
-        # 编译 fifo.c
-        print(f"编译 fifo.c...")
-        result = subprocess.run(["gcc", "fifo.c", "-o", FIFO_EXE],
-                              capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[X] 编译 fifo.c 失败: {result.stderr}")
-            return False
-        print(f"[OK] 成功编译 {FIFO_EXE}")
-        
+        for scheduler in schedulers or SCHEDULERS:
+            if not compile_scheduler(scheduler):
+                return False
     except FileNotFoundError:
         print("[X] 错误: 未找到 gcc 编译器，请确保已安装 gcc")
         return False
-    
+
     print("[OK] 编译完成！\n")
     return True
 
-def run_experiment(experiment_id):
-    """运行单个实验"""
-    print(f"\n{'='*60}")
-    print(f"实验 {experiment_id} / {NUM_EXPERIMENTS}")
-    print(f"{'='*60}")
-    
-    # 准备路径
-    task_file = os.path.join(TASK_FILES_DIR, f"tasks_{experiment_id}.csv")
-    result_folder = os.path.join(RESULT_DIR, f"result_{experiment_id}")
-    
-    print(f"任务文件: {task_file}")
-    print(f"结果保存到: {result_folder}")
-    
-    # 检查任务文件是否存在
-    if not os.path.exists(task_file):
-        print(f"[X] 任务文件不存在: {task_file}")
-        return False
-    
-    # 创建结果文件夹
-    os.makedirs(result_folder, exist_ok=True)
-    
-    # 清理上一次实验遗留的输出文件（防止混淆）
-    print("\n[0] 清理旧的输出文件...")
-    output_files_to_clean = [FIFO_BATCH_OUTPUT, CF_BATCH_OUTPUT, FIFO_OUTPUT, 
-                             "missed_tasks_batch.json", "missed_tasks_cf_batch.json", "missed_tasks.json"]
-    for output_file in output_files_to_clean:
-        if os.path.exists(output_file):
-            try:
-                os.remove(output_file)
-                print(f"    - 已删除旧文件: {output_file}")
-            except Exception as e:
-                print(f"    - 警告: 无法删除 {output_file}: {e}")
-    
-    # 运行 fifo_batch.exe
-    print(f"\n[1] 运行 {FIFO_BATCH_EXE} (FIFO 批处理调度算法)...")
+
+def run_scheduler(step, scheduler, task_file, result_folder, scratch_dir, log=print):
+    """
+    在 scratch_dir 中运行一个调度程序，再把它写出的文件移到结果文件夹
+
+    调度程序把输出写到当前目录下的固定文件名，每次运行使用独立的工作目录，多个实验才能同时运行。
+    """
+    exe = scheduler['exe']
+    log(f"\n[{step}] 运行 {exe} ({scheduler['label']})...")
+    # 工作目录不是项目根目录，可执行文件、任务文件和代价表都用绝对路径
+    env = dict(os.environ)
+    env['COST_MODEL_FILE'] = os.path.abspath(cost_model_path())
     start_time = time.time()
     try:
-        result = subprocess.run([FIFO_BATCH_EXE, task_file],
-                              capture_output=True, text=True, timeout=60)
+        result = subprocess.run([os.path.abspath(exe), os.path.abspath(task_file)],
+                                capture_output=True, text=True, timeout=60, cwd=scratch_dir, env=env)
         elapsed = time.time() - start_time
 
         if result.returncode != 0:
-            print(f"[X] {FIFO_BATCH_EXE} 运行失败")
-            print(f"错误输出: {result.stderr}")
+            log(f"[X] {exe} 运行失败")
+            log(f"错误输出: {result.stderr}")
             return False
 
-        print(f"[OK] {FIFO_BATCH_EXE} 运行成功 (耗时: {elapsed:.2f}秒)")
+        log(f"[OK] {exe} 运行成功 (耗时: {elapsed:.2f}秒)")
         if result.stdout:
-            print(f"输出: {result.stdout.strip()}")
+            log(f"输出: {result.stdout.strip()}")
 
-        # 复制结果文件
-        if os.path.exists(FIFO_BATCH_OUTPUT):
-            fifo_batch_result_path = os.path.join(result_folder, "fifo_batch_result.json")
-            shutil.copy(FIFO_BATCH_OUTPUT, fifo_batch_result_path)
-            print(f"[OK] 结果已保存: {fifo_batch_result_path}")
+        # 移动结果文件
+        output_file = os.path.join(scratch_dir, scheduler['output'])
+        if os.path.exists(output_file):
+            result_path = os.path.join(result_folder, scheduler['result_name'])
+            shutil.move(output_file, result_path)
+            log(f"[OK] 结果已保存: {result_path}")
 
             # 检查是否有任务丢失
-            missed_file = "missed_tasks_batch.json"
-            if os.path.exists(missed_file):
-                missed_result_path = os.path.join(result_folder, "fifo_batch_missed_tasks.json")
-                shutil.copy(missed_file, missed_result_path)
-                print(f"[!] 警告: 检测到任务丢失，详情已保存: {missed_result_path}")
-                
+            missed_file = scheduler['missed'] and os.path.join(scratch_dir, scheduler['missed'])
+            if missed_file and os.path.exists(missed_file):
+                missed_result_path = os.path.join(result_folder, scheduler['missed_name'])
+                shutil.move(missed_file, missed_result_path)
+                log(f"[!] 警告: 检测到任务丢失，详情已保存: {missed_result_path}")
+
                 # 读取并显示丢失任务统计
                 try:
-                    with open(missed_file, 'r') as f:
+                    with open(missed_result_path, 'r') as f:
                         missed_data = json.load(f)
-                        print(f"    - 总任务: {missed_data.get('total_tasks', 'N/A')}")
-                        print(f"    - 完成任务: {missed_data.get('completed_tasks', 'N/A')}")
-                        print(f"    - 丢失任务: {missed_data.get('missed_tasks', 'N/A')}")
-                        print(f"    - 丢失关键任务: {missed_data.get('missed_crucial', 'N/A')}")
+                        log(f"    - 总任务: {missed_data.get('total_tasks', 'N/A')}")
+                        log(f"    - 完成任务: {missed_data.get('completed_tasks', 'N/A')}")
+                        log(f"    - 丢失任务: {missed_data.get('missed_tasks', 'N/A')}")
+                        log(f"    - 丢失关键任务: {missed_data.get('missed_crucial', 'N/A')}")
                 except Exception as e:
-                    print(f"    - 读取丢失任务详情失败: {e}")
+                    log(f"    - 读取丢失任务详情失败: {e}")
         else:
-            print(f"[!] 警告: 未找到输出文件 {FIFO_BATCH_OUTPUT}")
+            log(f"[!] 警告: 未找到输出文件 {scheduler['output']}")
 
     except subprocess.TimeoutExpired:
-        print(f"[X] {FIFO_BATCH_EXE} 运行超时 (>60秒)")
+        log(f"[X] {exe} 运行超时 (>60秒)")
         return False
     except Exception as e:
-        print(f"[X] 运行 {FIFO_BATCH_EXE} 时出错: {e}")
+        log(f"[X] 运行 {exe} 时出错: {e}")
         return False
+    return True
 
-    # 运行 cf-batch.exe
-    print(f"\n[2] 运行 {CF_BATCH_EXE} (CF-BATCH 调度算法)...")
-    start_time = time.time()
-    try:
-        result = subprocess.run([CF_BATCH_EXE, task_file],
-                              capture_output=True, text=True, timeout=60)
-        elapsed = time.time() - start_time
-
-        if result.returncode != 0:
-            print(f"[X] {CF_BATCH_EXE} 运行失败")
-            print(f"错误输出: {result.stderr}")
-            return False
 
-        print(f"[OK] {CF_BATCH_EXE} 运行成功 (耗时: {elapsed:.2f}秒)")
-        if result.stdout:
-            print(f"输出: {result.stdout.strip()}")
+def run_experiment(experiment_id, log=print):
+    """运行单个实验"""
+    log(f"\n{'='*60}")
+    log(f"实验 {experiment_id} / {NUM_EXPERIMENTS}")
+    log(f"{'='*60}")
 
-        # 复制结果文件
-        if os.path.exists(CF_BATCH_OUTPUT):
-            cf_batch_result_path = os.path.join(result_folder, "cf_batch_result.json")
-            shutil.copy(CF_BATCH_OUTPUT, cf_batch_result_path)
-            print(f"[OK] 结果已保存: {cf_batch_result_path}")
+    # 准备路径
+    task_file = os.path.join(TASK_FILES_DIR, f"tasks_{experiment_id}.csv")
+    result_folder = os.path.join(RESULT_DIR, f"result_{experiment_id}")
 
-            # 检查是否有任务丢失
-            missed_file = "missed_tasks_cf_batch.json"
-            if os.path.exists(missed_file):
-                missed_result_path = os.path.join(result_folder, "cf_batch_missed_tasks.json")
-                shutil.copy(missed_file, missed_result_path)
-                print(f"[!] 警告: 检测到任务丢失，详情已保存: {missed_result_path}")
-                
-                # 读取并显示丢失任务统计
-                try:
-                    with open(missed_file, 'r') as f:
-                        missed_data = json.load(f)
-                        print(f"    - 总任务: {missed_data.get('total_tasks', 'N/A')}")
-                        print(f"    - 完成任务: {missed_data.get('completed_tasks', 'N/A')}")
-                        print(f"    - 丢失任务: {missed_data.get('missed_tasks', 'N/A')}")
-                        print(f"    - 丢失关键任务: {missed_data.get('missed_crucial', 'N/A')}")
-                except Exception as e:
-                    print(f"    - 读取丢失任务详情失败: {e}")
-        else:
-            print(f"[!] 警告: 未找到输出文件 {CF_BATCH_OUTPUT}")
+    log(f"任务文件: {task_file}")
+    log(f"结果保存到: {result_folder}")
 
-    except subprocess.TimeoutExpired:
-        print(f"[X] {CF_BATCH_EXE} 运行超时 (>60秒)")
-        return False
-    except Exception as e:
-        print(f"[X] 运行 {CF_BATCH_EXE} 时出错: {e}")
+    # 检查任务文件是否存在
+    if not os.path.exists(task_file):
+        log(f"[X] 任务文件不存在: {task_file}")
         return False
 
-    # 运行 fifo.exe
-    print(f"\n[3] 运行 {FIFO_EXE} (FIFO 调度算法)...")
-    start_time = time.time()
+    # 创建结果文件夹
+    os.makedirs(result_folder, exist_ok=True)
+
+    # 每个实验使用独立的临时工作目录，不会读到其它实验或上一次运行遗留的输出文件
+    scratch_dir = tempfile.mkdtemp(prefix=f"experiment_{experiment_id}_", dir=SCRATCH_ROOT)
     try:
-        result = subprocess.run([FIFO_EXE, task_file],
-                              capture_output=True, text=True, timeout=60)
-        elapsed = time.time() - start_time
+        for step, scheduler in enumerate(SCHEDULERS, 1):
+            if not run_scheduler(step, scheduler, task_file, result_folder, scratch_dir, log):
+                return False
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
 
-        if result.returncode != 0:
-            print(f"[X] {FIFO_EXE} 运行失败")
-            print(f"错误输出: {result.stderr}")
-            return False
+    log(f"\n[OK] 实验 {experiment_id} 完成!")
+    return True
 
-        print(f"[OK] {FIFO_EXE} 运行成功 (耗时: {elapsed:.2f}秒)")
-        if result.stdout:
-            print(f"输出: {result.stdout.strip()}")
 
-        # 复制结果文件
-        if os.path.exists(FIFO_OUTPUT):
-            fifo_result_path = os.path.join(result_folder, "fifo_result.json")
-            shutil.copy(FIFO_OUTPUT, fifo_result_path)
-            print(f"[OK] 结果已保存: {fifo_result_path}")
+def _run_experiment_buffered(experiment_id):
+    """进程池中运行：输出先缓存起来，由主进程整段打印，避免多个实验的输出交错"""
+    lines = []
+    ok = run_experiment(experiment_id, log=lambda message="": lines.append(str(message)))
+    return experiment_id, ok, "\n".join(lines)
 
-            # 检查是否有任务丢失
-            missed_file = "missed_tasks.json"
-            if os.path.exists(missed_file):
-                missed_result_path = os.path.join(result_folder, "fifo_missed_tasks.json")
-                shutil.copy(missed_file, missed_result_path)
-                print(f"[!] 警告: 检测到任务丢失，详情已保存: {missed_result_path}")
-                
-                # 读取并显示丢失任务统计
-                try:
-                    with open(missed_file, 'r') as f:
-                        missed_data = json.load(f)
-                        print(f"    - 总任务: {missed_data.get('total_tasks', 'N/A')}")
-                        print(f"    - 完成任务: {missed_data.get('completed_tasks', 'N/A')}")
-                        print(f"    - 丢失任务: {missed_data.get('missed_tasks', 'N/A')}")
-                        print(f"    - 丢失关键任务: {missed_data.get('missed_crucial', 'N/A')}")
-                except Exception as e:
-                    print(f"    - 读取丢失任务详情失败: {e}")
-        else:
-            print(f"[!] 警告: 未找到输出文件 {FIFO_OUTPUT}")
 
-    except subprocess.TimeoutExpired:
-        print(f"[X] {FIFO_EXE} 运行超时 (>60秒)")
-        return False
+def run_all_experiments(experiment_ids, max_workers=MAX_WORKERS):
+    """运行所有实验，返回 (成功数, 失败数)；max_workers 为 1 时在当前进程中依次运行"""
+    success_count = 0
+    fail_count = 0
+    if max_workers <= 1:
+        for i in experiment_ids:
+            if run_experiment(i):
+                success_count += 1
+            else:
+                fail_count += 1
+        return success_count, fail_count
+
+    print(f"\n并行运行 {len(experiment_ids)} 个实验 (最多 {max_workers} 个进程)")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_run_experiment_buffered, i) for i in experiment_ids]
+        for future in as_completed(futures):
+            try:
+                _, ok, output = future.result()
+            except Exception as e:
+                print(f"[X] 实验进程出错: {e}")
+                ok, output = False, ""
+            print(output)
+            if ok:
+                success_count += 1
+            else:
+                fail_count += 1
+    return success_count, fail_count
+
+
+def _summary_name(scheduler):
+    """汇总报告里的字段前缀，取自结果文件名：fifo_batch_result.json -> fifo_batch"""
+    return scheduler['result_name'][:-len("_result.json")]
+
+
+def _summarize_scheduler(result_folder, scheduler):
+    """一个调度程序在一个实验中的结果：文件是否存在、任务数、丢失任务数和状态"""
+    name = _summary_name(scheduler)
+    result_path = os.path.join(result_folder, scheduler['result_name'])
+    missed_path = os.path.join(result_folder, scheduler['missed_name']) if scheduler['missed_name'] else None
+    entry = {
+        f"{name}_result_exists": os.path.exists(result_path),
+        f"{name}_missed_exists": missed_path is not None and os.path.exists(missed_path)
+    }
+    if not entry[f"{name}_result_exists"]:
+        return entry
+    try:
+        with open(result_path, 'r') as f:
+            data = json.load(f)
+        if data == [-1]:
+            # resizing.c 判定无法调度
+            entry[f"{name}_task_count"] = 0
+            entry[f"{name}_status"] = "无法调度"
+            return entry
+        # 统计任务总数（排除deadline条目）
+        entry[f"{name}_task_count"] = sum(len(batch["images"]) for batch in data
+                                          if isinstance(batch, dict) and "images" in batch)
+
+        # 检查是否有丢失任务文件
+        if entry[f"{name}_missed_exists"]:
+            with open(missed_path, 'r') as mf:
+                missed_data = json.load(mf)
+            entry[f"{name}_missed_count"] = missed_data.get("missed_tasks", 0)
+            entry[f"{name}_missed_crucial"] = missed_data.get("missed_crucial", 0)
+            entry[f"{name}_status"] = f"部分失败 (丢失{missed_data.get('missed_tasks', 0)}个任务)"
+        else:
+            entry[f"{name}_status"] = "OK"
     except Exception as e:
-        print(f"[X] 运行 {FIFO_EXE} 时出错: {e}")
-        return False
+        print(f"[!] 读取 {result_path} 或统计时出错: {e}")
+    return entry
 
-    print(f"\n[OK] 实验 {experiment_id} 完成!")
-    return True
 
+def generate_summary(result_dir=None, num_experiments=None, schedulers=None):
+    """
+    生成实验汇总报告（默认使用 RESULT_DIR、NUM_EXPERIMENTS）
 
-def generate_summary():
-    """生成实验汇总报告"""
+    Args:
+        schedulers: 要汇总的调度程序（SCHEDULER_SPECS 中的条目），None 表示 SCHEDULERS
+    """
+    result_dir = result_dir or RESULT_DIR
+    num_experiments = num_experiments or NUM_EXPERIMENTS
+    schedulers = schedulers or SCHEDULERS
     print(f"\n{'='*60}")
     print("生成实验汇总报告...")
     print(f"{'='*60}\n")
     
     summary = {
-        "total_experiments": NUM_EXPERIMENTS,
+        "total_experiments": num_experiments,
         "experiments": []
     }
     
-    for i in range(1, NUM_EXPERIMENTS + 1):
-        result_folder = os.path.join(RESULT_DIR, f"result_{i}")
-        fifo_batch_result = os.path.join(result_folder, "fifo_batch_result.json")
-        fifo_batch_missed = os.path.join(result_folder, "fifo_batch_missed_tasks.json")
-        cf_batch_result = os.path.join(result_folder, "cf_batch_result.json")
-        cf_batch_missed = os.path.join(result_folder, "cf_batch_missed_tasks.json")
-        fifo_result = os.path.join(result_folder, "fifo_result.json")
-        fifo_missed = os.path.join(result_folder, "fifo_missed_tasks.json")
-        
+    for i in range(1, num_experiments + 1):
+        result_folder = os.path.join(result_dir, f"result_{i}")
         exp_summary = {
             "experiment_id": i,
-            "task_file": f"tasks_{i}.csv",
-            "fifo_batch_result_exists": os.path.exists(fifo_batch_result),
-            "fifo_batch_missed_exists": os.path.exists(fifo_batch_missed),
-            "cf_batch_result_exists": os.path.exists(cf_batch_result),
-            "cf_batch_missed_exists": os.path.exists(cf_batch_missed),
-            "fifo_result_exists": os.path.exists(fifo_result),
-            "fifo_missed_exists": os.path.exists(fifo_missed)
+            "task_file": f"tasks_{i}.csv"
         }
-        
-        # 尝试读取并统计任务数量和是否丢失
-        try:
-            if os.path.exists(fifo_batch_result):
-                with open(fifo_batch_result, 'r') as f:
-                    data = json.load(f)
-                    # 统计任务总数（排除deadline条目）
-                    task_count = 0
-                    for batch in data:
-                        if "images" in batch:
-                            task_count += len(batch["images"])
-                    exp_summary["fifo_batch_task_count"] = task_count
-
-                # 检查是否有丢失任务文件
-                if os.path.exists(fifo_batch_missed):
-                    with open(fifo_batch_missed, 'r') as mf:
-                        missed_data = json.load(mf)
-                        exp_summary["fifo_batch_missed_count"] = missed_data.get("missed_tasks", 0)
-                        exp_summary["fifo_batch_missed_crucial"] = missed_data.get("missed_crucial", 0)
-                        exp_summary["fifo_batch_status"] = f"部分失败 (丢失{missed_data.get('missed_tasks', 0)}个任务)"
-                else:
-                    exp_summary["fifo_batch_status"] = "OK"
-
-            if os.path.exists(cf_batch_result):
-                with open(cf_batch_result, 'r') as f:
-                    data = json.load(f)
-                    # 统计任务总数（排除deadline条目）
-                    task_count = 0
-                    for batch in data:
-                        if "images" in batch:
-                            task_count += len(batch["images"])
-                    exp_summary["cf_batch_task_count"] = task_count
-
-                # 检查是否有丢失任务文件
-                if os.path.exists(cf_batch_missed):
-                    with open(cf_batch_missed, 'r') as mf:
-                        missed_data = json.load(mf)
-                        exp_summary["cf_batch_missed_count"] = missed_data.get("missed_tasks", 0)
-                        exp_summary["cf_batch_missed_crucial"] = missed_data.get("missed_crucial", 0)
-                        exp_summary["cf_batch_status"] = f"部分失败 (丢失{missed_data.get('missed_tasks', 0)}个任务)"
-                else:
-                    exp_summary["cf_batch_status"] = "OK"
-
-            if os.path.exists(fifo_result):
-                with open(fifo_result, 'r') as f:
-                    data = json.load(f)
-                    # fifo.c 输出格式现在与批处理版本一致（批次格式）
-                    task_count = 0
-                    for batch in data:
-                        if "images" in batch:
-                            task_count += len(batch["images"])
-                    exp_summary["fifo_task_count"] = task_count
-
-                # 检查是否有丢失任务文件
-                if os.path.exists(fifo_missed):
-                    with open(fifo_missed, 'r') as mf:
-                        missed_data = json.load(mf)
-                        exp_summary["fifo_missed_count"] = missed_data.get("missed_tasks", 0)
-                        exp_summary["fifo_missed_crucial"] = missed_data.get("missed_crucial", 0)
-                        exp_summary["fifo_status"] = f"部分失败 (丢失{missed_data.get('missed_tasks', 0)}个任务)"
-                else:
-                    exp_summary["fifo_status"] = "OK"
-
-        except Exception as e:
-            print(f"[!] 读取结果或统计时出错: {e}")
-
+        for scheduler in schedulers:
+            exp_summary.update(_summarize_scheduler(result_folder, scheduler))
         summary["experiments"].append(exp_summary)
     
     # 保存汇总报告
-    summary_file = os.path.join(RESULT_DIR, "experiment_summary.json")
+    summary_file = os.path.join(result_dir, "experiment_summary.json")
     with open(summary_file, 'w', encoding='utf-8') as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
     
     print(f"[OK] 汇总报告已保存: {summary_file}\n")
     
     # 打印汇总表格
+    names = [_summary_name(scheduler) for scheduler in schedulers]
+    width = 27 + 36 * len(names)
     print("实验结果汇总:")
-    print("-" * 160)
-    print(f"{'实验ID':<8} {'任务文件':<18} {'FIFO_BATCH结果':<35} {'CF_BATCH结果':<35} {'FIFO结果':<35}")
-    print("-" * 160)
+    print("-" * width)
+    print(f"{'实验ID':<8} {'任务文件':<18} " + " ".join(f"{name.upper() + '结果':<35}" for name in names))
+    print("-" * width)
     
     for exp in summary["experiments"]:
-        exp_id = exp["experiment_id"]
-        task_file = exp["task_file"]
-        fifo_batch_status = exp.get("fifo_batch_status", "NOT FOUND")
-        cf_batch_status = exp.get("cf_batch_status", "NOT FOUND")
-        fifo_status = exp.get("fifo_status", "NOT FOUND")
-        
-        # 如果有丢失任务信息，添加到状态显示中
-        if exp.get("fifo_batch_missed_exists", False):
-            missed_count = exp.get("fifo_batch_missed_count", 0)
-            missed_crucial = exp.get("fifo_batch_missed_crucial", 0)
-            fifo_batch_status += f" [丢失:{missed_count}({missed_crucial}关键)]"
-        
-        if exp.get("cf_batch_missed_exists", False):
-            missed_count = exp.get("cf_batch_missed_count", 0)
-            missed_crucial = exp.get("cf_batch_missed_crucial", 0)
-            cf_batch_status += f" [丢失:{missed_count}({missed_crucial}关键)]"
-        
-        if exp.get("fifo_missed_exists", False):
-            missed_count = exp.get("fifo_missed_count", 0)
-            missed_crucial = exp.get("fifo_missed_crucial", 0)
-            fifo_status += f" [丢失:{missed_count}({missed_crucial}关键)]"
-        
-        print(f"{exp_id:<8} {task_file:<18} {fifo_batch_status:<35} {cf_batch_status:<35} {fifo_status:<35}")
+        statuses = []
+        for name in names:
+            status = exp.get(f"{name}_status", "NOT FOUND")
+            # 如果有丢失任务信息，添加到状态显示中
+            if exp.get(f"{name}_missed_exists", False):
+                missed_count = exp.get(f"{name}_missed_count", 0)
+                missed_crucial = exp.get(f"{name}_missed_crucial", 0)
+                status += f" [丢失:{missed_count}({missed_crucial}关键)]"
+            statuses.append(status)
+        print(f"{exp['experiment_id']:<8} {exp['task_file']:<18} " + " ".join(f"{status:<35}" for status in statuses))
     
 
 
@@ -389,13 +320,7 @@ def main():
     # 创建结果目录
     os.makedirs(RESULT_DIR, exist_ok=True)
     # 运行所有实验
-    success_count = 0
-    fail_count = 0
-    for i in range(1, NUM_EXPERIMENTS + 1):
-        if run_experiment(i):
-            success_count += 1
-        else:
-            fail_count += 1
+    success_count, fail_count = run_all_experiments(range(1, NUM_EXPERIMENTS + 1))
     
     # 生成汇总报告
     generate_summary()
@@ -1,6 +1,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include "cost_model.h"
 
 // FIFO 批处理调度器：按输入顺序构建批次，当连续任务尺寸相同则并入同一批次
 // 输入：CSV 文件（size,deadline,id,crucial,category），size 为 1-4（对应 64/128/256/512）
@@ -16,6 +17,16 @@ typedef struct {
 // 时间模型（与其他实现保持一致）
 float trans_time_size[4] = {0.75f, 1.0f, 1.7f, 5.3f};
 float proc_time_size_1d[4] = {2.25f, 3.5f, 3.5f, 1.8f};
+
+// 用 cost_model.txt 中完整网络（阶段4）的实测参数覆盖上面的编译期常量
+static void apply_cost_model(void) {
+    double k[4][4], b[4][4];
+    if (load_cost_model(k, b) == 0) return;
+    for (int i = 0; i < 4; i++) {
+        if (k[i][3] >= 0) trans_time_size[i] = (float)k[i][3];
+        if (b[i][3] >= 0) proc_time_size_1d[i] = (float)b[i][3];
+    }
+}
 int size_values[4] = {64, 128, 256, 512};
 
 Task* read_tasks_from_file(const char *filename, int *out_count) {
@@ -88,6 +99,7 @@ Task* read_tasks_from_file(const char *filename, int *out_count) {
 }
 
 int main(int argc, char *argv[]) {
+    apply_cost_model();
     const char *task_file = "tasks.csv";
     if (argc > 1) task_file = argv[1];
 
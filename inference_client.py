@@ -0,0 +1,79 @@
+import os
+import json
+import socket
+import threading
+
+SOCKET_PATH = "/tmp/early_exit_inference.sock"  # 推理服务的默认地址（inference_server.py 也用这两个值）
+TCP_ADDRESS = ("127.0.0.1", 7788)
+
+
+class RemoteInference:
+    """
+    inference_server.py 的客户端，可以替代 SimpleInference 传给 process_single_result
+
+    address 为 Unix 域套接字路径，或 (host, port) 表示 TCP。路径都转换为绝对路径后发送，
+    服务端与客户端需在同一台机器上。
+    """
+
+    def __init__(self, address=SOCKET_PATH, image_folder=None, timeout=None):
+        self.address = address
+        self.image_folder = image_folder
+        self._lock = threading.Lock()
+        self._next_id = 0
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(address)
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._reader = self._sock.makefile('r', encoding='utf-8')
+
+    def _call(self, op, **fields):
+        with self._lock:
+            self._next_id += 1
+            message = dict(fields, op=op, id=self._next_id)
+            self._sock.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+            line = self._reader.readline()
+        if not line:
+            raise ConnectionError(f"推理服务已断开: {self.address}")
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error'))
+        return reply['result']
+
+    def _folder(self, folder):
+        folder = folder or self.image_folder
+        return os.path.abspath(folder) if folder else None
+
+    def predict(self, image_ids, size, stage=None, folder=None, deadline_ms=None, crucial=0):
+        """
+        提交一组图片，服务端会与其它兼容请求合并成批；返回 {predictions, missing, batch_size, ...}
+        deadline_ms 为从提交起算的截止期：带截止期的请求按关键优先、截止期最早优先执行，
+        结果中带 slack_ms / deadline_met，预计赶不上时可能被降到更早的出口或被拒绝（rejected=True）
+        """
+        return self._call('predict', image_ids=list(image_ids), size=size, stage=stage, folder=self._folder(folder),
+                          deadline_ms=deadline_ms, crucial=1 if crucial else 0)
+
+    def process_json_file(self, json_file_path):
+        return self._call('process_plan', path=os.path.abspath(json_file_path), folder=self._folder(None))
+
+    def save_results(self, results, output_file_path):
+        try:
+            with open(output_file_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"\n[OK] 预测结果已保存到: {output_file_path}")
+        except Exception as e:
+            print(f"[X] 保存结果到JSON文件失败: {e}")
+
+    def stats(self):
+        return self._call('stats')
+
+    def ping(self):
+        return self._call('ping') == 'pong'
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self._sock.close()
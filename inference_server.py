@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import bisect
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+
+from simple_inference import SimpleInference, normalize_stage
+from latency_model import DEFAULT_PROFILE
+from timing_stats import median
+from inference_client import SOCKET_PATH, TCP_ADDRESS
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+LATENCY_PROFILE = DEFAULT_PROFILE  # profile_latency.py 生成的延迟模型，准入控制在没有实测值时使用
+SERVE_ON_UNIX_SOCKET = True  # False 时监听 TCP_ADDRESS
+DEFAULT_FOLDER = "images_cropped/cropped_1"
+MAX_BATCH = 64  # 合并后单批最多图片数
+MAX_WAIT_MS = {64: 2.0, 128: 4.0, 256: 8.0, 512: 16.0}  # 各尺寸最早的请求最多等待多久就必须出批
+WARMUP_RUNS = 3  # 启动时每个尺寸的预热次数
+# 预计赶不上截止期的请求：'reject' 先降出口、仍不行则拒绝非关键请求；'downgrade' 只降出口不拒绝；'admit' 不做准入控制
+ADMISSION_POLICY = 'reject'
+
+
+class _Request:
+    def __init__(self, folder, image_ids, size, stage, deadline_ms=None, crucial=0):
+        self.folder = folder
+        self.image_ids = image_ids
+        self.size = size
+        self.stage = normalize_stage(stage)
+        self.requested_stage = self.stage
+        self.crucial = 1 if crucial else 0
+        self.arrival = time.monotonic()
+        # deadline_ms 为相对提交时刻的截止期，None 表示没有截止期
+        self.deadline = None if deadline_ms is None else self.arrival + deadline_ms / 1000.0
+        self.future = Future()
+
+    def priority(self):
+        # 与 main.c 的 compareByDeadline 一致：关键任务优先，同类按截止期升序（没有截止期的排最后）
+        return (-self.crucial, self.deadline if self.deadline is not None else float('inf'), self.arrival)
+
+
+class DynamicBatcher:
+    """
+    按 (尺寸, 出口) 合并请求的动态批处理器
+
+    所有推理都在一个后台线程里执行，模型共用一个 torch 线程池。某个队列里的图片数达到 max_batch，
+    或其中最早的请求等待超过该尺寸的 max_wait_ms 时出批；同一队列的请求可以来自不同的图片文件夹。
+    run_exclusive 提交的任务（例如整份调度结果的计时执行）在两批之间独占执行。
+
+    请求可以带截止期和 crucial 标记：队列内和队列间都按“关键优先、截止期最早优先”出批，
+    再等下去就赶不上截止期的队列立即出批。提交时按延迟模型预测完成时刻，预计超期的请求先尝试
+    降到更早的出口，仍赶不上时非关键请求被拒绝（admission_policy='reject'），关键请求总是接纳。
+    """
+
+    def __init__(self, inference, max_batch=MAX_BATCH, max_wait_ms=None, admission_policy=ADMISSION_POLICY):
+        if admission_policy not in ('reject', 'downgrade', 'admit'):
+            raise ValueError(f"admission_policy 只能是 'reject'、'downgrade' 或 'admit'，收到: {admission_policy}")
+        self.inference = inference
+        self.max_batch = max_batch
+        self.max_wait_ms = dict(MAX_WAIT_MS if max_wait_ms is None else max_wait_ms)
+        self.admission_policy = admission_policy
+        self._cond = threading.Condition()
+        self._queues = {}  # (size, stage) -> 按 priority() 排序的请求列表
+        self._jobs = deque()
+        self._busy_until = 0.0  # 正在执行的批次预计结束时刻
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self.images = 0
+        self.counters = {'admitted': 0, 'rejected': 0, 'downgraded': 0, 'met': 0, 'missed': 0,
+                         'crucial_met': 0, 'crucial_missed': 0}
+        self.slack_ms = []
+        self._thread = threading.Thread(target=self._loop, name='dynamic-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, folder, image_ids, size, stage=None, deadline_ms=None, crucial=0):
+        if size not in self.inference.models:
+            raise ValueError(f"模型 {size}px 未加载")
+        request = _Request(folder, list(image_ids), size, stage, deadline_ms, crucial)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("服务已关闭")
+            if not self._admit(request):
+                self.counters['rejected'] += 1
+                request.future.set_result(self._rejection(request))
+                return request.future
+            self.counters['admitted'] += 1
+            queue = self._queues.setdefault((request.size, request.stage), [])
+            queue.insert(bisect.bisect_right([queued.priority() for queued in queue], request.priority()), request)
+            self._cond.notify()
+        return request.future
+
+    def run_exclusive(self, fn, *args):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("服务已关闭")
+            self._jobs.append((future, fn, args))
+            self._cond.notify()
+        return future
+
+    def _wait_limit(self, size):
+        return self.max_wait_ms.get(size, max(self.max_wait_ms.values(), default=0.0)) / 1000.0
+
+    # 预测耗时：实测值 -> 延迟模型文件的 k*x+b -> 同尺寸其它实测形状推出的上界，都没有时返回 None
+    # 只是试探，不计入延迟缓存的命中统计
+    def _predict_ms(self, size, batch_len, stage):
+        latency_cache = self.inference.latency_cache
+        predicted = latency_cache.predict(size, batch_len, stage, count=False)
+        if predicted is None:
+            predicted = latency_cache.bound_from_measured(size, batch_len, stage)
+        return predicted
+
+    # 在锁内调用：优先级不低于 request 的已排队工作预计还要多久（秒）；没有任何延迟数据的部分按 0 计
+    def _backlog_s(self, request):
+        backlog = max(0.0, self._busy_until - time.monotonic())
+        for (size, stage), queue in self._queues.items():
+            ahead = [queued for queued in queue if queued.priority() <= request.priority()]
+            if ahead:
+                backlog += (self._predict_ms(size, sum(len(q.image_ids) for q in ahead), stage) or 0.0) / 1000.0
+        return backlog
+
+    def _fits(self, request, stage):
+        predicted = self._predict_ms(request.size, len(request.image_ids), stage)
+        if predicted is None:
+            # 该尺寸既没有延迟模型也没有任何实测（启动预热会为每个尺寸实测一次），无法保证赶上，按放不下处理
+            return False
+        return time.monotonic() + self._backlog_s(request) + predicted / 1000.0 <= request.deadline
+
+    # 在锁内调用：返回是否接纳；需要时把 request.stage 降到更早的出口
+    def _admit(self, request):
+        if request.deadline is None or self.admission_policy == 'admit':
+            return True
+        if self._fits(request, request.stage):
+            return True
+        for stage in range((request.stage or 4) - 1, 0, -1):
+            if self._fits(request, stage):
+                request.stage = stage
+                self.counters['downgraded'] += 1
+                return True
+        return bool(request.crucial) or self.admission_policy == 'downgrade'
+
+    @staticmethod
+    def _rejection(request):
+        return {'size': request.size, 'stage': request.requested_stage or 4, 'predictions': [], 'missing': [],
+                'rejected': True, 'reason': '按延迟模型预测无法在截止期前完成'}
+
+    # 在锁内调用：这一队列现在必须出批吗
+    def _due(self, key, queue, now):
+        pending = sum(len(request.image_ids) for request in queue)
+        if pending >= self.max_batch or queue[0].arrival + self._wait_limit(key[0]) <= now:
+            return True
+        deadlines = [request.deadline for request in queue if request.deadline is not None]
+        if not deadlines:
+            return False
+        predicted = (self._predict_ms(key[0], pending, key[1]) or 0.0) / 1000.0
+        return min(deadlines) - predicted - now <= self._wait_limit(key[0])
+
+    # 在锁内调用：返回 ('job', ...) / ('batch', key, 请求列表) / ('wait', 秒数)
+    def _next_work(self):
+        if self._jobs:
+            return ('job', self._jobs.popleft())
+        now = time.monotonic()
+        due = [(queue[0].priority(), key) for key, queue in self._queues.items() if queue and self._due(key, queue, now)]
+        if due:
+            key = min(due)[1]
+            return ('batch', key, self._take(self._queues[key]))
+        timeouts = [queue[0].arrival + self._wait_limit(key[0]) - now for key, queue in self._queues.items() if queue]
+        return ('wait', max(0.0, min(timeouts)) if timeouts else None)
+
+    def _take(self, queue):
+        count, taken = 0, 0
+        while taken < len(queue) and (not taken or count + len(queue[taken].image_ids) <= self.max_batch):
+            count += len(queue[taken].image_ids)
+            taken += 1
+        requests = queue[:taken]
+        del queue[:taken]
+        predicted = self._predict_ms(requests[0].size, count, requests[0].stage)
+        self._busy_until = time.monotonic() + (predicted or 0.0) / 1000.0
+        return requests
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    work = self._next_work()
+                    if work[0] != 'wait':
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait(work[1])
+            if work[0] == 'job':
+                future, fn, args = work[1]
+                self._run_job(future, fn, args)
+            else:
+                self._execute(work[1], work[2])
+
+    @staticmethod
+    def _run_job(future, fn, args):
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _execute(self, key, requests):
+        size, stage = key
+        inference = self.inference
+        start = time.monotonic()
+        try:
+            tensors, loaded = [], []
+            for request in requests:
+                inference.image_folder = request.folder
+                tensor, valid_ids, missing_ids = inference.load_images_batch(request.image_ids, size)
+                if tensor is not None:
+                    tensors.append(tensor)
+                loaded.append((valid_ids, missing_ids))
+            pred_ids, pred_names, extras = [], [], None
+            if tensors:
+                with torch.inference_mode():
+                    pred_ids, pred_names, extras = inference._predict(torch.cat(tensors), size, stage)
+                inference._sync()
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        finished = time.monotonic()
+        inference_ms = (finished - start) * 1000
+        batch_size = sum(len(valid_ids) for valid_ids, _ in loaded)
+        # 实测延迟写回延迟模型，之后的准入判断用得上
+        if batch_size:
+            inference.latency_cache.put(size, batch_size, stage, inference_ms)
+        with self._cond:
+            self.batches += 1
+            self.requests += len(requests)
+            self.images += batch_size
+
+        offset = 0
+        for request, (valid_ids, missing_ids) in zip(requests, loaded):
+            predictions = []
+            for i, image_id in enumerate(valid_ids, start=offset):
+                prediction = {'image_id': image_id, 'predicted_class': pred_names[i], 'predicted_class_id': pred_ids[i]}
+                if extras is not None:
+                    prediction.update(extras[i])
+                predictions.append(prediction)
+            offset += len(valid_ids)
+            result = {
+                'size': size,
+                'stage': stage or 4,
+                'predictions': predictions,
+                'missing': missing_ids,
+                'batch_size': batch_size,
+                'merged_requests': len(requests),
+                'queue_ms': round((start - request.arrival) * 1000, 3),
+                'inference_ms': round(inference_ms, 3)
+            }
+            if request.stage != request.requested_stage:
+                result['downgraded_from_stage'] = request.requested_stage or 4
+            if request.deadline is not None:
+                result.update(self._record_deadline(request, finished))
+            request.future.set_result(result)
+
+    def _record_deadline(self, request, finished):
+        slack_ms = (request.deadline - finished) * 1000
+        met = slack_ms >= 0
+        with self._cond:
+            self.slack_ms.append(slack_ms)
+            self.counters['met' if met else 'missed'] += 1
+            if request.crucial:
+                self.counters['crucial_met' if met else 'crucial_missed'] += 1
+        return {'slack_ms': round(slack_ms, 3), 'deadline_met': met, 'crucial': request.crucial}
+
+    def stats(self):
+        with self._cond:
+            queued = {f"{size}_s{stage or 4}": len(queue) for (size, stage), queue in self._queues.items() if queue}
+            slack = sorted(self.slack_ms)
+            return {'batches': self.batches, 'requests': self.requests, 'images': self.images,
+                    'mean_batch_size': round(self.images / self.batches, 2) if self.batches else 0.0,
+                    'queued': queued,
+                    'deadlines': dict(self.counters,
+                                      min_slack_ms=round(slack[0], 3) if slack else None,
+                                      median_slack_ms=round(median(slack), 3) if slack else None)}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
+def _process_plan(inference, plan_path, folder):
+    inference.image_folder = folder
+    return inference.process_json_file(plan_path)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # 协议：每行一个 JSON 请求，每行一个 JSON 回复 {"ok": true, "result": ...} 或 {"ok": false, "error": ...}
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            message = None
+            try:
+                message = json.loads(line)
+                reply = {'ok': True, 'result': self.server.dispatch(message)}
+            except Exception as e:
+                reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            if isinstance(message, dict) and 'id' in message:
+                reply['id'] = message['id']
+            self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+
+class _ServerMixin:
+    def setup_service(self, batcher):
+        self.batcher = batcher
+        self.started_at = time.time()
+
+    def dispatch(self, message):
+        op = message.get('op')
+        if op == 'predict':
+            future = self.batcher.submit(message.get('folder') or DEFAULT_FOLDER, message['image_ids'],
+                                         int(message['size']), message.get('stage'),
+                                         deadline_ms=message.get('deadline_ms'), crucial=message.get('crucial', 0))
+            return future.result()
+        if op == 'process_plan':
+            future = self.batcher.run_exclusive(_process_plan, self.batcher.inference, message['path'],
+                                                message.get('folder') or DEFAULT_FOLDER)
+            return future.result()
+        if op == 'stats':
+            stats = self.batcher.stats()
+            stats['uptime_s'] = round(time.time() - self.started_at, 1)
+            stats['models'] = sorted(self.batcher.inference.models)
+            return stats
+        if op == 'ping':
+            return 'pong'
+        raise ValueError(f"未知操作: {op}")
+
+
+class UnixInferenceServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class TcpInferenceServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def warmup(inference, folder=DEFAULT_FOLDER, runs=WARMUP_RUNS):
+    if not os.path.isdir(folder):
+        return
+    ids = sorted(f[:-4] for f in os.listdir(folder) if f.endswith('.jpg'))[:8]
+    if not ids:
+        return
+    inference.image_folder = folder
+    for size in inference.models:
+        # 预热后实测一次完整网络，保证准入控制对每个尺寸都至少有一个可用的延迟上界
+        time_ms, _, _, _ = inference._measure(ids, size, 4, warmup_runs=runs, stabilize_runs=1)
+        inference.latency_cache.put(size, len(ids), 4, time_ms)
+        print(f"[OK] {size}px 预热完成 ({len(ids)} 张 {time_ms:.2f}ms)")
+
+
+def serve(inference, socket_path=SOCKET_PATH, tcp_address=TCP_ADDRESS, max_batch=MAX_BATCH, max_wait_ms=None,
+          admission_policy=ADMISSION_POLICY):
+    """socket_path 为 None 时监听 TCP"""
+    batcher = DynamicBatcher(inference, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                             admission_policy=admission_policy)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixInferenceServer(socket_path, _Handler)
+        where = socket_path
+    else:
+        server = TcpInferenceServer(tcp_address, _Handler)
+        where = f"{tcp_address[0]}:{tcp_address[1]}"
+    server.setup_service(batcher)
+    print(f"[OK] 推理服务已启动: {where} (max_batch={max_batch}, 准入策略={admission_policy})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在关闭推理服务...")
+    finally:
+        server.server_close()
+        batcher.close()
+        inference.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    inference = SimpleInference(MODEL_PATHS, DEFAULT_FOLDER, latency_profile=LATENCY_PROFILE)
+    warmup(inference)
+    serve(inference, socket_path=SOCKET_PATH if SERVE_ON_UNIX_SOCKET else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import torch
+
+from preprocess import load_image_tensor
+
+VALID_SIZES = (64, 128, 256, 512)
+
+
+def _parse_size(text):
+    try:
+        size = int(text)
+    except ValueError:
+        return None
+    return size if size in VALID_SIZES else None
+
+
+def collect_labeled_images(root, class_mapping):
+    """
+    收集带标签的图片，返回 [(图片路径, 类别ID, 原始尺寸或None)]
+
+    支持两种目录结构：
+      - images_cropped/cropped_N/64_3_car.jpg：文件名为 size_id_category
+      - better_images/128_2class/car/xxx.jpg：父目录为类别名，上一级以尺寸开头
+    """
+    name_to_id = {name: class_id for class_id, name in class_mapping.items()}
+    samples = []
+    for path in sorted(Path(root).rglob('*.jpg')):
+        parent = path.parent.name
+        if parent in name_to_id:
+            class_id = name_to_id[parent]
+            original_size = _parse_size(path.parent.parent.name.split('_')[0])
+        else:
+            parts = path.stem.split('_', 2)
+            if len(parts) < 3 or parts[2] not in name_to_id:
+                continue
+            class_id = name_to_id[parts[2]]
+            original_size = _parse_size(parts[0])
+        samples.append((str(path), class_id, original_size))
+    return samples
+
+
+def iter_labeled_batches(samples, size, batch_size=64, device='cpu'):
+    """按 batch_size 依次产出 (输入张量, 标签张量)"""
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        images = torch.stack([load_image_tensor(path, size) for path, _, _ in chunk]).to(device)
+        labels = torch.tensor([class_id for _, class_id, _ in chunk], dtype=torch.long, device=device)
+        yield images, labels
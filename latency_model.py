@@ -0,0 +1,97 @@
+import os
+import json
+import threading
+
+import torch
+
+DEFAULT_PROFILE = "latency_profile.json"  # profile_latency.py 的输出，enforce_deadline 未指定延迟模型时使用
+
+
+def thread_config():
+    return (torch.get_num_threads(), torch.get_num_interop_threads())
+
+
+class LatencyCache:
+    """
+    批次延迟的记忆化模型
+
+    键为 (尺寸, 批次长度, 阶段, 线程配置)。同一进程内同形状的批次只实测一次；
+    给出 profile_path（profile_latency.py 生成的 latency_profile.json）时，未实测过的形状
+    可以直接按 k*x+b 预测。
+    """
+
+    def __init__(self, profile_path=None):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.profile = {}
+        self.profile_path = profile_path
+        self.hits = 0
+        self.misses = 0
+        if profile_path:
+            self.load_profile(profile_path)
+
+    def load_profile(self, profile_path):
+        if not os.path.exists(profile_path):
+            print(f"[!] 延迟模型文件不存在: {profile_path}")
+            return
+        with open(profile_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for size, stages in data.get('models', {}).items():
+            for stage, fit in stages.items():
+                self.profile[(int(size), int(stage))] = (fit['k_ms'], fit['b_ms'])
+
+    @staticmethod
+    def make_key(size, batch_len, stage):
+        # stage: 1-4，None 视为完整网络，动态提前退出用 'dynamic'
+        return (size, batch_len, 4 if stage is None else stage, thread_config())
+
+    def get(self, size, batch_len, stage, count=True):
+        """count=False 时只查看、不计入命中/未命中（用于规划阶段的试探查询）"""
+        with self._lock:
+            value = self._entries.get(self.make_key(size, batch_len, stage))
+            if not count:
+                return value
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, size, batch_len, stage, time_ms):
+        with self._lock:
+            self._entries[self.make_key(size, batch_len, stage)] = time_ms
+
+    def predict_from_profile(self, size, batch_len, stage):
+        # 动态提前退出、分辨率级联都按该尺寸的完整网络估计
+        fit = self.profile.get((size, 4 if stage in (None, 'dynamic', 'cascade') else stage))
+        if fit is None:
+            return None
+        k, b = fit
+        return k * batch_len + b
+
+    def bound_from_measured(self, size, batch_len, stage):
+        """
+        由同尺寸已实测的其它形状推出的耗时上界，没有可用实测时返回 None
+
+        批次越大耗时越长，且 k*x+b 中 b>=0 时 t(n) <= t(m)*n/m（n>m），因此实测 t(m) 的上界为 t(m)*max(1, n/m)；
+        提前退出比完整网络便宜，阶段 1-3 没有实测时也可以用完整网络的实测值作上界。取所有上界中最小的一个。
+        """
+        stage = 4 if stage is None else stage
+        usable = (stage, 4) if isinstance(stage, int) else (stage,)
+        threads = thread_config()
+        with self._lock:
+            bounds = [time_ms * max(1.0, batch_len / measured_len)
+                      for (s, measured_len, measured_stage, t), time_ms in self._entries.items()
+                      if s == size and measured_stage in usable and t == threads]
+        return min(bounds) if bounds else None
+
+    def predict(self, size, batch_len, stage, count=True):
+        """先用实测值，没有时退回到 profile 的线性模型；两者都没有返回 None"""
+        measured = self.get(size, batch_len, stage, count=count)
+        if measured is not None:
+            return measured
+        return self.predict_from_profile(size, batch_len, stage)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'profile_entries': len(self.profile)}
@@ -4,6 +4,7 @@
 #include <string.h>
 #include <float.h>
 #include <ctype.h>
+#include "cost_model.h"
 
 // 定义任务结构体
 typedef struct {
@@ -43,6 +44,11 @@ typedef struct {
 //第二维是压缩后大小（0是64，1是128，2是256，3是512）
 //第三维是执行阶段（0是阶段1，1是阶段2，2是阶段3，3是阶段4）
 // 全局变量定义
+// 用 -DUSE_PROFILED_ACCURACY 编译时使用 profile_accuracy.py 实测生成的精度表
+#ifdef USE_PROFILED_ACCURACY
+#include "accuracy_table.h"
+float accuracy[4][4][4] = ACCURACY_TABLE_3D;
+#else
 float accuracy[4][4][4] = {
     {
         {0.33f, 0.50f, 0.54f, 0.54f}, 
@@ -69,6 +75,7 @@ float accuracy[4][4][4] = {
         {0.34f, 0.76f, 0.84f, 0.87f}
     }
 };
+#endif
 
 float worst_accuracy[4] = {0.40f, 0.60f, 0.70f, 0.75f}; // 用于假设对于不同大小的任务的最差准确率要求已经给出
 
@@ -81,6 +88,18 @@ float proc_time_size[4][4] = {
     {0.06, 0.09, 0.12, 1.8}
 }; // 假设在不同大小的不同阶段的执行时间（kx+b中的b），第一维代表执行大小，第二维是阶段数
 
+// 用 cost_model.txt 中的实测参数覆盖上面的编译期常量（k 取完整网络，b 按阶段）
+static void apply_cost_model(void) {
+    double k[4][4], b[4][4];
+    if (load_cost_model(k, b) == 0) return;
+    for (int i = 0; i < 4; i++) {
+        if (k[i][3] >= 0) trans_time_size[i] = (float)k[i][3];
+        for (int j = 0; j < 4; j++) {
+            if (b[i][j] >= 0) proc_time_size[i][j] = (float)b[i][j];
+        }
+    }
+}
+
 
 // 函数声明
 int compareByDeadline(const void* a, const void* b);
@@ -328,6 +347,8 @@ void GPU_process(Batch *batch, FILE *out)
     int actual_size = get_actual_size(batch->size);
     fprintf(out, "  {\n");
     fprintf(out, "    \"size\": %d,\n", actual_size);
+    // 执行到第几个出口（batch->stage 为 0-3，输出为 1-4），Python 端按此截断网络
+    fprintf(out, "    \"stage\": %d,\n", batch->stage + 1);
     fprintf(out, "    \"images\": [\n");
     
     int first_image = 1;
@@ -674,7 +695,8 @@ void dynamicScheduling(Batches *batches, Task *tasks, FILE *out)
         
         // 将错失任务输出到 JSON 文件
         FILE *missed_file = NULL;
-        if (fopen_s(&missed_file, "missed_tasks.json", "w") == 0 && missed_file) {
+        missed_file = fopen("missed_tasks.json", "w");
+        if (missed_file) {
             fprintf(missed_file, "{\n");
             fprintf(missed_file, "  \"total_tasks\": %d,\n", num_tasks);
             fprintf(missed_file, "  \"completed_tasks\": %d,\n", num_tasks - unprocessed_count);
@@ -713,6 +735,7 @@ void dynamicScheduling(Batches *batches, Task *tasks, FILE *out)
 }
 // main函数
 int main(int argc, char *argv[]) {
+    apply_cost_model();
     // 从命令行参数或默认文件读取任务
     const char *task_file = "tasks.csv"; 
     if (argc > 1) {
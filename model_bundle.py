@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import torch
+
+from model_torch import EarlyExitResNet18
+from prediction_cache import file_sha256
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+NUM_CLASSES = 7
+BUNDLE_PATH = "model/models_bundle.pt"  # 打包输出，可以直接作为 SimpleInference 的 model_paths
+BUNDLE_FORMAT = 'early_exit_bundle'
+BUNDLE_VERSION = 1
+
+
+def write_bundle(model_paths, bundle_path=BUNDLE_PATH, num_classes=NUM_CLASSES):
+    """
+    把各尺寸 checkpoint 的 state_dict 打包成一个文件
+
+    同时记录每个源 checkpoint 的 sha256，预测库和优化模型缓存的键与逐个加载时保持一致。
+    """
+    bundle = {'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION, 'num_classes': num_classes,
+              'created_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'sizes': {}, 'hashes': {}}
+    for size, model_path in sorted(model_paths.items()):
+        if not os.path.exists(model_path):
+            print(f"[X] 模型文件不存在: {model_path}")
+            continue
+        checkpoint = torch.load(model_path, map_location='cpu')
+        bundle['sizes'][int(size)] = checkpoint['model_state_dict']
+        bundle['hashes'][int(size)] = file_sha256(model_path)
+        print(f"[OK] 已打包: {size}px <- {model_path}")
+    if not bundle['sizes']:
+        raise FileNotFoundError("没有可打包的模型")
+    os.makedirs(os.path.dirname(bundle_path) or '.', exist_ok=True)
+    tmp_path = bundle_path + '.tmp'
+    torch.save(bundle, tmp_path)
+    os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+
+def open_bundle(bundle_path):
+    """以内存映射方式打开打包文件，返回 (各尺寸 state_dict, 各尺寸哈希, 类别数)；权重在真正用到时才从磁盘读入"""
+    data = torch.load(bundle_path, map_location='cpu', mmap=True)
+    if not isinstance(data, dict) or data.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"不是模型打包文件: {bundle_path}")
+    if data.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"不支持的打包版本 {data.get('version')}: {bundle_path}")
+    sizes = {int(size): state for size, state in data['sizes'].items()}
+    hashes = {int(size): value for size, value in data.get('hashes', {}).items()}
+    return sizes, hashes, data.get('num_classes', NUM_CLASSES)
+
+
+def materialize(state_dict, num_classes, device):
+    """
+    用 state_dict 构建 eval 模式的 EarlyExitResNet18
+
+    在 meta 设备上建网络再 assign 权重，CPU 上参数直接引用内存映射的存储，不额外分配也不拷贝。
+    """
+    with torch.device('meta'):
+        model = EarlyExitResNet18(num_classes=num_classes)
+    model.load_state_dict(state_dict, assign=True)
+    return model.to(device).eval()
+
+
+def available_memory_bytes():
+    """读取 /proc/meminfo 的 MemAvailable，不可用时返回 None"""
+    try:
+        with open('/proc/meminfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class LazyModelRegistry(Mapping):
+    """
+    按尺寸懒加载模型的只读映射
+
+    `size in registry` 只检查模型是否可用，不会加载；`registry[size]` 在第一次访问时才构建模型。
+    常驻模型超过 max_resident 个，或可用内存低于 min_available_bytes 时，按最近最少使用淘汰
+    其它尺寸（正在访问的尺寸不会被淘汰），之后再访问会重新构建。
+    on_load(size, model) / on_evict(size) 在加载后、淘汰后调用，用于维护依赖模型的派生状态。
+    """
+
+    def __init__(self, loaders, max_resident=None, min_available_bytes=0, on_load=None, on_evict=None):
+        self._loaders = dict(loaders)
+        self._resident = OrderedDict()
+        self._lock = threading.RLock()
+        self.max_resident = max_resident
+        self.min_available_bytes = min_available_bytes
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self.loads = 0
+        self.evictions = 0
+
+    def __getitem__(self, size):
+        with self._lock:
+            model = self._resident.get(size)
+            if model is not None:
+                self._resident.move_to_end(size)
+                return model
+            if size not in self._loaders:
+                raise KeyError(size)
+            self._make_room()
+            start = time.perf_counter()
+            model = self._loaders[size]()
+            self._resident[size] = model
+            self.loads += 1
+            print(f"[OK] 按需加载模型: {size}px ({(time.perf_counter() - start) * 1000:.1f}ms)")
+            if self.on_load is not None:
+                self.on_load(size, model)
+            return model
+
+    def __contains__(self, size):
+        return size in self._loaders
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def resident_sizes(self):
+        with self._lock:
+            return list(self._resident)
+
+    def evict(self, size):
+        with self._lock:
+            if self._resident.pop(size, None) is None:
+                return False
+            self.evictions += 1
+            print(f"[!] 释放模型: {size}px")
+            if self.on_evict is not None:
+                self.on_evict(size)
+            return True
+
+    def _under_pressure(self):
+        if self.min_available_bytes <= 0:
+            return False
+        available = available_memory_bytes()
+        return available is not None and available < self.min_available_bytes
+
+    def _make_room(self):
+        while self._resident and self.max_resident and len(self._resident) >= self.max_resident:
+            self.evict(next(iter(self._resident)))
+        while self._resident and self._under_pressure():
+            self.evict(next(iter(self._resident)))
+
+    def stats(self):
+        with self._lock:
+            return {'available': sorted(self._loaders), 'resident': list(self._resident),
+                    'loads': self.loads, 'evictions': self.evictions}
+
+
+def main():
+    start = time.time()
+    path = write_bundle(MODEL_PATHS, BUNDLE_PATH)
+    print(f"\n[OK] 模型打包文件已保存: {path} ({os.path.getsize(path) / 1024 / 1024:.1f}MB, "
+          f"耗时 {time.time() - start:.2f}秒)")
+
+
+if __name__ == '__main__':
+    main()
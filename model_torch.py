@@ -100,4 +100,89 @@ class EarlyExitResNet18(nn.Module):
         x = self.stage4(x)
         outputs.append(self.exit4(x))
 
-        return outputs
\ No newline at end of file
+        return outputs
+
+    def forward_dynamic(self, x, thresholds):
+        """
+        动态提前退出：逐阶段计算出口，softmax 置信度达到该阶段阈值的样本直接退出，
+        只有剩余样本（批次压缩后）继续进入下一阶段。
+
+        thresholds: exit1~exit3 的阈值序列，某一项为 None 表示该出口不参与判断
+        返回 (logits, exit_stages, confidences)，均按输入顺序排列，exit_stages 取值 1-4
+        """
+        n = x.shape[0]
+        remaining = torch.arange(n, device=x.device)
+        exit_stages = torch.full((n,), 4, dtype=torch.long, device=x.device)
+        confidences = torch.zeros(n, device=x.device)
+        logits = None
+
+        x = self.conv1(x)
+        x = self.bn1(x)
+        x = self.relu(x)
+        x = self.maxpool(x)
+
+        stages = [(self.stage1, self.exit1), (self.stage2, self.exit2),
+                  (self.stage3, self.exit3), (self.stage4, self.exit4)]
+        for idx, (stage, exit_head) in enumerate(stages):
+            x = stage(x)
+            is_last = idx == len(stages) - 1
+            threshold = None if is_last else thresholds[idx]
+            if not is_last and threshold is None:
+                continue
+            out = exit_head(x)
+            if logits is None:
+                logits = out.new_zeros((n, out.shape[1]))
+            # bf16/fp16 autocast 下 out 为低精度，置信度按 fp32 计算，与 confidences 的类型一致
+            conf, _ = torch.max(torch.softmax(out.float(), dim=1), dim=1)
+            done = torch.ones_like(conf, dtype=torch.bool) if is_last else conf >= threshold
+            if done.any():
+                done_idx = remaining[done]
+                logits[done_idx] = out[done]
+                confidences[done_idx] = conf[done]
+                exit_stages[done_idx] = idx + 1
+                keep = ~done
+                remaining = remaining[keep]
+                x = x[keep]
+            if remaining.numel() == 0:
+                break
+
+        return logits, exit_stages, confidences
+
+
+def count_stage_macs(model, input_size):
+    """
+    统计单张 input_size 图片依次经过各阶段（含对应出口头）的累计乘加次数，
+    返回长度为4的列表：第 i 项为在第 i+1 个出口退出时的总计算量
+    """
+    per_module = {}
+    hooks = []
+
+    def make_hook(name):
+        def hook(module, inputs, output):
+            if isinstance(module, nn.Conv2d):
+                kernel_macs = module.in_channels // module.groups * module.kernel_size[0] * module.kernel_size[1]
+                per_module[name] = output.numel() * kernel_macs
+            else:
+                per_module[name] = module.in_features * module.out_features
+        return hook
+
+    for name, module in model.named_modules():
+        if isinstance(module, (nn.Conv2d, nn.Linear)):
+            hooks.append(module.register_forward_hook(make_hook(name)))
+    try:
+        param = next(model.parameters())
+        with torch.no_grad():
+            model.forward_train(torch.zeros(1, 3, input_size, input_size, device=param.device, dtype=param.dtype))
+    finally:
+        for h in hooks:
+            h.remove()
+
+    def macs_with_prefix(prefix):
+        return sum(v for k, v in per_module.items() if k.startswith(prefix))
+
+    backbone = macs_with_prefix('conv1')
+    cumulative = []
+    for i in range(1, 5):
+        backbone += macs_with_prefix(f'stage{i}.')
+        cumulative.append(backbone + macs_with_prefix(f'exit{i}.'))
+    return cumulative
@@ -0,0 +1,95 @@
+import os
+import copy
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+ENGINE_CACHE_DIR = "model_cache"  # 编译后模型的磁盘缓存目录
+EQUIVALENCE_ATOL = 1e-3
+EQUIVALENCE_RTOL = 1e-3
+
+
+def fold_batchnorm(model):
+    """把 EarlyExitResNet18 中所有 Conv+BN 折叠成单个卷积，返回新的 eval 模型（原模型不变）"""
+    folded = copy.deepcopy(model).eval()
+    folded.conv1 = fuse_conv_bn_eval(folded.conv1, folded.bn1)
+    folded.bn1 = nn.Identity()
+    for stage in (folded.stage1, folded.stage2, folded.stage3, folded.stage4):
+        for block in stage:
+            block.conv1 = fuse_conv_bn_eval(block.conv1, block.bn1)
+            block.bn1 = nn.Identity()
+            block.conv2 = fuse_conv_bn_eval(block.conv2, block.bn2)
+            block.bn2 = nn.Identity()
+            if block.downsample is not None:
+                block.downsample = nn.Sequential(fuse_conv_bn_eval(block.downsample[0], block.downsample[1]))
+    return folded
+
+
+class _StageVariant(nn.Module):
+    # 把 target_stage 固定下来，trace 时提前退出的分支就成了常量
+    def __init__(self, model, stage):
+        super().__init__()
+        self.model = model
+        self.stage = None if stage == 4 else stage
+
+    def forward(self, x):
+        return self.model(x, target_stage=self.stage)
+
+
+def build_engine(model, size, stage, device):
+    folded = fold_batchnorm(model).to(device).to(memory_format=torch.channels_last)
+    example = torch.randn(2, 3, size, size, device=device).contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        traced = torch.jit.trace(_StageVariant(folded, stage).eval(), example)
+        return torch.jit.freeze(traced)
+
+
+def check_equivalence(model, engine, size, stage, device, batch_size=2):
+    """用随机输入比较优化模型与 eager 模型的输出，返回 (是否一致, 最大绝对误差)"""
+    x = torch.randn(batch_size, 3, size, size, device=device)
+    with torch.inference_mode():
+        expected = model(x, target_stage=None if stage == 4 else stage)
+        actual = engine(x.contiguous(memory_format=torch.channels_last))
+    max_diff = (expected - actual).abs().max().item()
+    ok = torch.allclose(expected, actual, atol=EQUIVALENCE_ATOL, rtol=EQUIVALENCE_RTOL)
+    return ok, max_diff
+
+
+class EngineCache:
+    """
+    优化后模型的磁盘缓存
+
+    文件名包含 checkpoint 哈希、torch 版本、设备类型、尺寸和阶段，任何一项变化都会重新编译。
+    """
+
+    def __init__(self, cache_dir=ENGINE_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, checkpoint_hash, size, stage, device):
+        torch_version = torch.__version__.replace('+', '_')
+        name = f"{checkpoint_hash[:16]}_torch{torch_version}_{device.type}_{size}_s{stage}.pt"
+        return os.path.join(self.cache_dir, name)
+
+    def load_or_build(self, model, checkpoint_hash, size, stage, device):
+        path = self.path(checkpoint_hash, size, stage, device)
+        engine = None
+        source = 'cache'
+        if os.path.exists(path):
+            try:
+                engine = torch.jit.load(path, map_location=device)
+            except Exception as e:
+                print(f"[!] 读取优化模型缓存失败，将重新编译: {path} ({e})")
+        if engine is None:
+            engine = build_engine(model, size, stage, device)
+            source = 'build'
+        engine.eval()
+
+        ok, max_diff = check_equivalence(model, engine, size, stage, device)
+        if not ok:
+            print(f"[X] {size}px 阶段{stage} 优化模型与原模型不一致 (最大误差 {max_diff:.2e})，使用原模型")
+            return None
+        if source == 'build':
+            os.makedirs(self.cache_dir, exist_ok=True)
+            torch.jit.save(engine, path)
+        return engine
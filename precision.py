@@ -0,0 +1,95 @@
+import os
+import time
+from contextlib import nullcontext
+
+import torch
+
+from timing_stats import median
+
+PRECISION_DTYPES = {'bf16': torch.bfloat16, 'fp16': torch.float16}
+# /proc/cpuinfo 中表示原生支持该精度的指令集标志
+CPU_FLAGS = {'bf16': ('avx512_bf16', 'amx_bf16'), 'fp16': ('avx512_fp16', 'amx_fp16')}
+BENCHMARK_BATCH = 16
+BENCHMARK_RUNS = 10
+MIN_TOP1_AGREEMENT = 0.98  # 与 fp32 的 top-1 一致率低于该值时不采用低精度
+
+
+def _cpu_flags():
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def probe_precisions(device):
+    """返回当前硬件原生支持的低精度列表（'bf16'/'fp16'）"""
+    if device.type == 'cuda':
+        supported = ['fp16']
+        if torch.cuda.is_bf16_supported():
+            supported.insert(0, 'bf16')
+        return supported
+    flags = _cpu_flags()
+    return [name for name, wanted in CPU_FLAGS.items() if any(flag in flags for flag in wanted)]
+
+
+def autocast_context(device, precision):
+    if precision is None:
+        return nullcontext()
+    return torch.autocast(device_type=device.type, dtype=PRECISION_DTYPES[precision])
+
+
+def _median_latency_ms(run, runs=BENCHMARK_RUNS):
+    for _ in range(3):
+        run()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        times.append((time.perf_counter() - start) * 1000)
+    return median(times)
+
+
+def select_precision(inference, size, candidates, probe_tensor):
+    """
+    对 size 模型分别在 fp32 与各候选低精度下测速，返回 (选中的精度或None, 报告)
+    低精度只有在更快且与 fp32 的 top-1 一致率不低于 MIN_TOP1_AGREEMENT 时才会被采用
+    """
+    model = inference.models[size]
+    with torch.inference_mode():
+        fp32_preds = torch.argmax(inference._forward(probe_tensor, size), dim=1)
+        fp32_ms = _median_latency_ms(lambda: inference._forward(probe_tensor, size))
+    report = {'fp32_ms': round(fp32_ms, 3)}
+    best, best_ms = None, fp32_ms
+    for precision in candidates:
+        try:
+            with torch.inference_mode(), autocast_context(inference.device, precision):
+                preds = torch.argmax(model(probe_tensor), dim=1)
+                ms = _median_latency_ms(lambda: model(probe_tensor))
+        except Exception as e:
+            report[precision] = {'error': str(e)}
+            continue
+        agreement = (preds == fp32_preds).float().mean().item()
+        report[precision] = {'ms': round(ms, 3), 'top1_agreement': round(agreement, 4)}
+        if ms < best_ms and agreement >= MIN_TOP1_AGREEMENT:
+            best, best_ms = precision, ms
+    report['selected'] = best or 'fp32'
+    return best, report
+
+
+def probe_batch(inference, size, batch_size=BENCHMARK_BATCH):
+    """优先用当前图片文件夹里的真实图片，没有时退回随机输入"""
+    folder = inference.image_folder
+    ids = []
+    if folder and os.path.isdir(folder):
+        ids = sorted(f[:-4] for f in os.listdir(folder) if f.endswith('.jpg'))[:batch_size]
+    if ids:
+        tensor, _, _ = inference.load_images_batch(ids, size)
+        if tensor is not None:
+            return tensor
+    return torch.randn(batch_size, 3, size, size, device=inference.device)
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只保留进程内的锁
+    fcntl = None
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """跨进程的排他锁（flock），没有 fcntl 的平台上不加锁"""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PredictionStore:
+    """
+    持久化的预测结果库，供所有 batch_process_* 脚本共用
+
+    键为 (图片内容哈希, 模型checkpoint哈希, 目标尺寸[, 出口阶段][, 推理精度])，值为 predicted_class/predicted_class_id。
+    同一张图片无论出现在哪个 cropped_N 或哪个算法的结果里，只要内容、模型和精度不变就只推理一次。
+    """
+
+    VERSION = 1
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self._entries = {}
+        self._dirty = {}
+        self._image_hashes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._entries.update(self._read_entries())
+
+    def _read_entries(self):
+        if not os.path.exists(self.store_path):
+            return {}
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[!] 预测库读取失败，将重新建立: {self.store_path} ({e})")
+            return {}
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            return {}
+        return data.get('entries', {})
+
+    @staticmethod
+    def make_key(image_hash, model_hash, size, stage=None, precision=None):
+        # 完整网络（stage 为 None 或 4）、fp32（precision 为 None 或 'fp32'）沿用原来的键
+        key = f"{image_hash}:{model_hash}:{size}"
+        if stage not in (None, 4):
+            key += f":s{stage}"
+        if precision not in (None, 'fp32'):
+            key += f":{precision}"
+        return key
+
+    def image_hash(self, image_path):
+        # 同一进程内按 (路径, mtime) 记住哈希，避免重复读文件
+        st = os.stat(image_path)
+        memo_key = (os.path.abspath(image_path), st.st_mtime_ns, st.st_size)
+        digest = self._image_hashes.get(memo_key)
+        if digest is None:
+            digest = file_sha256(image_path)
+            self._image_hashes[memo_key] = digest
+        return digest
+
+    def get(self, image_path, model_hash, size, stage=None, precision=None):
+        key = self.make_key(self.image_hash(image_path), model_hash, size, stage, precision)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, image_path, model_hash, size, predicted_class_id, predicted_class, stage=None, precision=None):
+        key = self.make_key(self.image_hash(image_path), model_hash, size, stage, precision)
+        entry = {'predicted_class_id': predicted_class_id, 'predicted_class': predicted_class}
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty[key] = entry
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.store_path))
+            os.makedirs(directory, exist_ok=True)
+            # 其他进程可能同时在写：持有文件锁期间读取磁盘上的最新内容、合并、原子替换
+            with _file_lock(f"{self.store_path}.lock"):
+                merged = self._read_entries()
+                merged.update(self._dirty)
+                tmp_path = f"{self.store_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': self.VERSION, 'entries': merged}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.store_path)
+            self._entries.update(merged)
+            self._dirty = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from PIL import Image
+from torchvision import transforms
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+# 推理、打包分片、解码进程共用同一套预处理，保证各条路径得到的张量一致
+@lru_cache(maxsize=None)
+def build_transform(target_size):
+    return transforms.Compose([
+        transforms.Resize((target_size, target_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
+    ])
+
+
+def load_image_tensor(image_path, target_size):
+    with Image.open(image_path) as img:
+        return build_transform(target_size)(img.convert('RGB'))
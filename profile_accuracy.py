@@ -0,0 +1,117 @@
+import json
+import time
+
+import torch
+
+from simple_inference import SimpleInference
+from labeled_images import collect_labeled_images, iter_labeled_batches, VALID_SIZES
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+LABELED_ROOT = "images_cropped"  # 带标签的图片目录（文件名 size_id_category 中含原始大小）
+BATCH_SIZE = 64
+OUTPUT_JSON = "accuracy_table.json"
+OUTPUT_HEADER = "accuracy_table.h"  # main.c / resizing.c 用 -DUSE_PROFILED_ACCURACY 编译时引用
+
+
+def profile_accuracy(inference, samples, batch_size=BATCH_SIZE):
+    """
+    对每个压缩后尺寸只做一遍 forward_train（四个出口一次算完），再按原始尺寸分组统计，
+    返回 table[原始][压缩后][阶段] 与 counts[原始]（原始尺寸、压缩尺寸均为 0-3 的索引）
+    """
+    orig_index = torch.tensor([VALID_SIZES.index(orig) for _, _, orig in samples], dtype=torch.long)
+    counts = [int((orig_index == o).sum()) for o in range(4)]
+    table = [[[None] * 4 for _ in range(4)] for _ in range(4)]
+    for c, size in enumerate(VALID_SIZES):
+        model = inference.models.get(size)
+        if model is None:
+            print(f"[!] 缺少 {size}px 模型，跳过该列")
+            continue
+        correct = []
+        with torch.inference_mode():
+            for images, labels in iter_labeled_batches(samples, size, batch_size, inference.device):
+                outputs = model.forward_train(images)
+                preds = torch.stack([torch.argmax(out, dim=1) for out in outputs], dim=1)
+                correct.append((preds == labels.unsqueeze(1)).cpu())
+        correct = torch.cat(correct).float()
+        for o in range(4):
+            if counts[o] == 0:
+                continue
+            acc = correct[orig_index == o].mean(dim=0).tolist()
+            table[o][c] = [round(a, 4) for a in acc]
+        print(f"  [OK] {size}px 模型完成")
+    return table, counts
+
+
+def _c_value(value):
+    return f"{0.0 if value is None else value:.2f}f"
+
+
+def write_header(table, path):
+    rows_3d = []
+    for o in range(4):
+        inner = []
+        for c in range(4):
+            stages = table[o][c] or [None] * 4
+            inner.append("{" + ", ".join(_c_value(v) for v in stages) + "}")
+        rows_3d.append("    {" + ", ".join(inner) + "}")
+    rows_2d = []
+    for o in range(4):
+        rows_2d.append("    {" + ", ".join(_c_value((table[o][c] or [None] * 4)[3]) for c in range(4)) + "}")
+
+    lines = [
+        "// 由 profile_accuracy.py 生成，请勿手工修改",
+        f"// 生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        "#ifndef ACCURACY_TABLE_H",
+        "#define ACCURACY_TABLE_H",
+        "",
+        "// accuracy[原始大小][压缩后大小][执行阶段]（main.c）",
+        "#define ACCURACY_TABLE_3D { \\",
+        ", \\\n".join(rows_3d) + " \\",
+        "}",
+        "",
+        "// accuracy[原始大小][压缩后大小]，完整网络（resizing.c）",
+        "#define ACCURACY_TABLE_2D { \\",
+        ", \\\n".join(rows_2d) + " \\",
+        "}",
+        "",
+        "#endif",
+        ""
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def main():
+    inference = SimpleInference(MODEL_PATHS, LABELED_ROOT)
+    samples = [s for s in collect_labeled_images(LABELED_ROOT, inference.class_mapping) if s[2] is not None]
+    if not samples:
+        print(f"[X] 未在 {LABELED_ROOT} 中找到带原始尺寸的标注图片")
+        return
+    print(f"[OK] 标注图片: {len(samples)} 张")
+
+    start = time.time()
+    table, counts = profile_accuracy(inference, samples)
+    for o, count in enumerate(counts):
+        if count == 0:
+            print(f"[!] 没有原始大小为 {VALID_SIZES[o]}px 的图片，该行在头文件中填 0")
+
+    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+        json.dump({
+            'labeled_root': LABELED_ROOT,
+            'sizes': list(VALID_SIZES),
+            'image_counts': {str(VALID_SIZES[o]): counts[o] for o in range(4)},
+            'accuracy': table,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }, f, ensure_ascii=False, indent=2)
+    write_header(table, OUTPUT_HEADER)
+    print(f"\n[OK] 精度表已保存: {OUTPUT_JSON}, {OUTPUT_HEADER} (耗时 {time.time() - start:.2f}秒)")
+
+
+if __name__ == '__main__':
+    main()
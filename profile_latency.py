@@ -0,0 +1,208 @@
+import json
+import math
+import os
+import platform
+import time
+
+import torch
+
+from simple_inference import SimpleInference
+from latency_model import DEFAULT_PROFILE
+from timing_stats import mean as _mean, stdev as _stdev, median as _median
+from cost_model import TIME_UNIT_MS  # C 调度器的时间单位对应的毫秒数，用于导出头文件
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+IMAGE_FOLDER = "images_cropped/cropped_1"  # 取样图片所在文件夹（图片不够时循环使用）
+SIZES = [64, 128, 256, 512]
+STAGES = [1, 2, 3, 4]
+BATCH_SIZES = [1, 2, 4, 8, 16, 32]
+WARMUP_RUNS = 3
+MIN_REPEATS = 5  # 每个测量点至少重复次数
+MAX_REPEATS = 50  # 每个测量点最多重复次数
+REL_TOLERANCE = 0.05  # 均值95%置信区间半宽 / 均值 低于该值即认为稳定
+OUTPUT_JSON = DEFAULT_PROFILE
+OUTPUT_HEADER = "latency_profile.h"
+
+# t 分布 97.5% 分位数（自由度 1-30），更大自由度用正态近似
+_T_975 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+          2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+          2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def t_critical_95(df):
+    if df <= 0:
+        return float('inf')
+    return _T_975[df - 1] if df <= len(_T_975) else 1.96
+
+
+def mean_ci95(samples):
+    mean = _mean(samples)
+    if len(samples) < 2:
+        return mean, float('inf')
+    half = t_critical_95(len(samples) - 1) * _stdev(samples) / math.sqrt(len(samples))
+    return mean, half
+
+
+def fit_linear(xs, ys):
+    """最小二乘拟合 y = k*x + b，返回斜率/截距及其95%置信区间半宽和 R²"""
+    n = len(xs)
+    mean_x = _mean(xs)
+    mean_y = _mean(ys)
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    if n < 3 or sxx == 0:
+        return {'k': 0.0, 'b': mean_y, 'k_ci95': float('inf'), 'b_ci95': float('inf'), 'r2': 0.0}
+    k = sxy / sxx
+    b = mean_y - k * mean_x
+    residuals = [y - (k * x + b) for x, y in zip(xs, ys)]
+    sse = sum(r * r for r in residuals)
+    sst = sum((y - mean_y) ** 2 for y in ys)
+    s2 = sse / (n - 2)
+    t = t_critical_95(n - 2)
+    k_se = math.sqrt(s2 / sxx)
+    b_se = math.sqrt(s2 * (1.0 / n + mean_x ** 2 / sxx))
+    return {
+        'k': k,
+        'b': b,
+        'k_ci95': t * k_se,
+        'b_ci95': t * b_se,
+        'r2': 1.0 - sse / sst if sst > 0 else 1.0
+    }
+
+
+def measure_batch_ms(inference, image_ids, size, stage):
+    """与 process_json_file 的计时口径一致：批量加载+预处理+推理"""
+    inference._sync()
+    start = time.perf_counter()
+    input_tensor, _, _ = inference.load_images_batch(image_ids, size, use_cache=inference.timed_cache == 'warm')
+    inference.predict_batch(input_tensor, size, stage)
+    inference._sync()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_until_stable(inference, image_ids, size, stage):
+    for _ in range(WARMUP_RUNS):
+        measure_batch_ms(inference, image_ids, size, stage)
+    samples = []
+    while len(samples) < MAX_REPEATS:
+        samples.append(measure_batch_ms(inference, image_ids, size, stage))
+        if len(samples) >= MIN_REPEATS:
+            mean, half = mean_ci95(samples)
+            if mean > 0 and half / mean < REL_TOLERANCE:
+                break
+    return samples
+
+
+def sample_image_ids(image_folder, count):
+    ids = sorted(f[:-4] for f in os.listdir(image_folder) if f.endswith('.jpg'))
+    if not ids:
+        return []
+    return [ids[i % len(ids)] for i in range(count)]
+
+
+def profile(inference, image_folder):
+    inference.image_folder = image_folder
+    id_pool = sample_image_ids(image_folder, max(BATCH_SIZES))
+    if not id_pool:
+        raise FileNotFoundError(f"文件夹中没有图片: {image_folder}")
+    table = {}
+    for size in SIZES:
+        if size not in inference.models:
+            print(f"[!] 缺少 {size}px 模型，跳过")
+            continue
+        table[str(size)] = {}
+        for stage in STAGES:
+            xs, ys, points = [], [], []
+            for batch_size in BATCH_SIZES:
+                samples = measure_until_stable(inference, id_pool[:batch_size], size, stage)
+                xs.extend([batch_size] * len(samples))
+                ys.extend(samples)
+                mean, half = mean_ci95(samples)
+                points.append({
+                    'batch_size': batch_size,
+                    'mean_ms': round(mean, 4),
+                    'median_ms': round(_median(samples), 4),
+                    'ci95_ms': round(half, 4),
+                    'repeats': len(samples)
+                })
+            fit = fit_linear(xs, ys)
+            table[str(size)][str(stage)] = {
+                'k_ms': round(fit['k'], 4),
+                'b_ms': round(fit['b'], 4),
+                'k_ci95_ms': round(fit['k_ci95'], 4),
+                'b_ci95_ms': round(fit['b_ci95'], 4),
+                'r2': round(fit['r2'], 4),
+                'points': points
+            }
+            print(f"  {size}px 阶段{stage}: k={fit['k']:.3f}±{fit['k_ci95']:.3f}ms, "
+                  f"b={fit['b']:.3f}±{fit['b_ci95']:.3f}ms, R²={fit['r2']:.3f}")
+    return table
+
+
+def write_header(table, path, time_unit_ms=TIME_UNIT_MS):
+    def fmt(value_ms):
+        return f"{value_ms / time_unit_ms:.6f}f"
+
+    def entry(size, stage):
+        return table.get(str(size), {}).get(str(stage))
+
+    k_full = [fmt(entry(size, 4)['k_ms']) if entry(size, 4) else "0.0f" for size in SIZES]
+    rows = []
+    for size in SIZES:
+        rows.append("    {" + ", ".join(fmt(entry(size, stage)['b_ms']) if entry(size, stage) else "0.0f"
+                                        for stage in STAGES) + "}")
+    b_full = [fmt(entry(size, 4)['b_ms']) if entry(size, 4) else "0.0f" for size in SIZES]
+    lines = [
+        "// 由 profile_latency.py 生成，请勿手工修改",
+        f"// 主机: {platform.node()}, torch {torch.__version__}, 线程数 {torch.get_num_threads()}",
+        f"// 时间单位: 1 = {time_unit_ms:g}ms",
+        "#ifndef LATENCY_PROFILE_H",
+        "#define LATENCY_PROFILE_H",
+        "",
+        "// trans_time_size[4]：完整网络每张图片的增量时间（kx+b 中的 k）",
+        "#define TRANS_TIME_SIZE {" + ", ".join(k_full) + "}",
+        "",
+        "// proc_time_size[4][4]：各尺寸各阶段的固定开销（kx+b 中的 b）",
+        "#define PROC_TIME_SIZE { \\",
+        ", \\\n".join(rows) + " \\",
+        "}",
+        "",
+        "// proc_time_size_1d[4]：完整网络的固定开销（fifo.c / fifo_batch.c / cf-batch.c / resizing.c）",
+        "#define PROC_TIME_SIZE_1D {" + ", ".join(b_full) + "}",
+        "",
+        "#endif",
+        ""
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def main():
+    inference = SimpleInference(MODEL_PATHS, IMAGE_FOLDER)
+    start = time.time()
+    table = profile(inference, IMAGE_FOLDER)
+    profile_data = {
+        'host': platform.node(),
+        'processor': platform.processor(),
+        'torch_version': torch.__version__,
+        'num_threads': torch.get_num_threads(),
+        'device': str(inference.device),
+        'image_folder': IMAGE_FOLDER,
+        'time_unit': 'ms',
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'models': table
+    }
+    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+        json.dump(profile_data, f, ensure_ascii=False, indent=2)
+    write_header(table, OUTPUT_HEADER)
+    print(f"\n[OK] 延迟模型已保存: {OUTPUT_JSON}, {OUTPUT_HEADER} (耗时 {time.time() - start:.2f}秒)")
+
+
+if __name__ == '__main__':
+    main()
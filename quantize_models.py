@@ -0,0 +1,157 @@
+import os
+import json
+import time
+from typing import Optional
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from simple_inference import SimpleInference
+from optimized_engine import _StageVariant
+from labeled_images import collect_labeled_images, iter_labeled_batches
+from timing_stats import median
+
+# 配置
+MODEL_PATHS = {
+    64: 'model/model_64.pth',
+    128: 'model/model_128.pth',
+    256: 'model/model_256.pth',
+    512: 'model/model_512.pth'
+}
+CALIBRATION_ROOT = "better_images"  # 校准图片目录
+CALIBRATION_IMAGES = 256  # 校准使用的图片数量（均匀抽样）
+EVAL_ROOT = "images_cropped"  # 评估精度用的带标签图片目录
+BATCH_SIZE = 32
+LATENCY_RUNS = 20  # 延迟测量重复次数（取中位数）
+OUTPUT_SUFFIX = "_int8.pt"  # 输出文件: model_64.pth -> model_64_int8.pt，可直接写进 model_paths
+REPORT_PATH = "quantization_report.json"
+
+
+class QuantizedEarlyExit(nn.Module):
+    """把四个出口各自量化后的模型打包成一个，接口与 EarlyExitResNet18.forward 相同"""
+
+    def __init__(self, stage1, stage2, stage3, stage4):
+        super().__init__()
+        self.stage1 = stage1
+        self.stage2 = stage2
+        self.stage3 = stage3
+        self.stage4 = stage4
+
+    def forward(self, x, target_stage: Optional[int] = None):
+        if target_stage == 1:
+            return self.stage1(x)
+        if target_stage == 2:
+            return self.stage2(x)
+        if target_stage == 3:
+            return self.stage3(x)
+        return self.stage4(x)
+
+
+def select_backend():
+    engines = torch.backends.quantized.supported_engines
+    for backend in ('x86', 'fbgemm', 'qnnpack'):
+        if backend in engines:
+            torch.backends.quantized.engine = backend
+            return backend
+    raise RuntimeError(f"当前 torch 不支持 int8 量化后端: {engines}")
+
+
+def quantize_stage(model, stage, size, calibration_samples, backend):
+    variant = _StageVariant(model, stage).eval()
+    example = (torch.randn(1, 3, size, size),)
+    prepared = prepare_fx(variant, get_default_qconfig_mapping(backend), example)
+    with torch.inference_mode():
+        for images, _ in iter_labeled_batches(calibration_samples, size, BATCH_SIZE):
+            prepared(images)
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(quantized, example))
+
+
+def quantize_model(model, size, calibration_samples, backend):
+    model = model.cpu().eval()
+    stages = [quantize_stage(model, stage, size, calibration_samples, backend) for stage in (1, 2, 3, 4)]
+    return torch.jit.script(QuantizedEarlyExit(*stages))
+
+
+def stage_accuracy(model, samples, size):
+    correct = [0, 0, 0, 0]
+    with torch.inference_mode():
+        for images, labels in iter_labeled_batches(samples, size, BATCH_SIZE):
+            for i, stage in enumerate((1, 2, 3, None)):
+                preds = torch.argmax(model(images, target_stage=stage), dim=1)
+                correct[i] += int((preds == labels).sum())
+    return [round(c / len(samples), 4) for c in correct]
+
+
+def stage_latency_ms(model, size):
+    x = torch.randn(BATCH_SIZE, 3, size, size)
+    latencies = []
+    with torch.inference_mode():
+        for stage in (1, 2, 3, None):
+            for _ in range(3):
+                model(x, target_stage=stage)
+            runs = []
+            for _ in range(LATENCY_RUNS):
+                start = time.perf_counter()
+                model(x, target_stage=stage)
+                runs.append((time.perf_counter() - start) * 1000)
+            latencies.append(round(median(runs), 3))
+    return latencies
+
+
+def int8_path_for(model_path):
+    root, _ = os.path.splitext(model_path)
+    return root + OUTPUT_SUFFIX
+
+
+def main():
+    backend = select_backend()
+    print(f"[OK] 量化后端: {backend}")
+    inference = SimpleInference(MODEL_PATHS, EVAL_ROOT)
+
+    calibration = collect_labeled_images(CALIBRATION_ROOT, inference.class_mapping)
+    step = max(1, len(calibration) // CALIBRATION_IMAGES)
+    calibration = calibration[::step][:CALIBRATION_IMAGES]
+    evaluation = collect_labeled_images(EVAL_ROOT, inference.class_mapping)
+    if not calibration or not evaluation:
+        print("[X] 校准或评估图片为空，请检查 CALIBRATION_ROOT / EVAL_ROOT")
+        return
+    print(f"校准图片: {len(calibration)} 张，评估图片: {len(evaluation)} 张")
+
+    report = {'backend': backend, 'torch_version': torch.__version__, 'batch_size': BATCH_SIZE,
+              'created_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'sizes': {}}
+    for size, model in sorted(inference.models.items()):
+        model = model.cpu().eval()
+        print(f"\n量化 {size}px 模型...")
+        quantized = quantize_model(model, size, calibration, backend)
+        out_path = int8_path_for(MODEL_PATHS[size])
+        torch.jit.save(quantized, out_path)
+
+        acc_fp32 = stage_accuracy(model, evaluation, size)
+        acc_int8 = stage_accuracy(quantized, evaluation, size)
+        lat_fp32 = stage_latency_ms(model, size)
+        lat_int8 = stage_latency_ms(quantized, size)
+        entry = {
+            'int8_path': out_path,
+            'accuracy_fp32': acc_fp32,
+            'accuracy_int8': acc_int8,
+            'accuracy_loss': [round(a - b, 4) for a, b in zip(acc_fp32, acc_int8)],
+            'latency_fp32_ms': lat_fp32,
+            'latency_int8_ms': lat_int8,
+            'speedup': [round(a / b, 3) if b > 0 else None for a, b in zip(lat_fp32, lat_int8)]
+        }
+        report['sizes'][str(size)] = entry
+        print(f"  [OK] 已保存: {out_path}")
+        print(f"  精度损失(阶段1-4): {entry['accuracy_loss']}")
+        print(f"  加速比(阶段1-4):   {entry['speedup']}")
+
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] 量化报告已保存: {REPORT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
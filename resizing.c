@@ -3,6 +3,7 @@
 #include <stdbool.h>
 #include <string.h>
 #include <ctype.h>
+#include "cost_model.h"
 
 typedef struct {
     int size;            // 图像大小（索引：0=64, 1=128, 2=256, 3=512）
@@ -43,15 +44,31 @@ float weight[2] = {0.5, 1}; // 定义权重(非关键和关键)
 int size_values[4] = {64, 128, 256, 512}; // 实际尺寸值
 
 // 全局变量定义
+// 用 -DUSE_PROFILED_ACCURACY 编译时使用 profile_accuracy.py 实测生成的精度表
+#ifdef USE_PROFILED_ACCURACY
+#include "accuracy_table.h"
+float accuracy[4][4] = ACCURACY_TABLE_2D;
+#else
 float accuracy[4][4] = {
    {0.54, 0.71, 0.77, 0.78},
    {0.67, 0.75, 0.82, 0.85},
    {0.65, 0.72, 0.84, 0.86},
    {0.69, 0.77, 0.86, 0.87}
 }; // 第一维是原始大小，第二维是调整到哪个大小后的精度
+#endif
 float proc_time_size[4] = {2.25, 3.5, 3.5, 1.8}; // 固定推理开销 D[s]
 float trans_time_size[4] = {0.75, 1, 1.7, 5.3};  // 增量时间 B[s]
 
+// 用 cost_model.txt 中完整网络（阶段4）的实测参数覆盖上面的编译期常量
+static void apply_cost_model(void) {
+    double k[4][4], b[4][4];
+    if (load_cost_model(k, b) == 0) return;
+    for (int i = 0; i < 4; i++) {
+        if (k[i][3] >= 0) trans_time_size[i] = (float)k[i][3];
+        if (b[i][3] >= 0) proc_time_size[i] = (float)b[i][3];
+    }
+}
+
 // 函数声明
 Task* read_tasks_from_file(const char *filename, int *task_count);
 
@@ -344,6 +361,7 @@ Task* read_tasks_from_file(const char *filename, int *task_count) {
 }
 
 int main(int argc, char *argv[]) {
+    apply_cost_model();
     // 从命令行参数或默认文件读取任务
     const char *task_file = "tasks.csv"; 
     
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+
+from prediction_cache import file_sha256
+
+MANIFEST_NAME = "time_manifest.json"  # 放在每个结果树（如 result_list_ddl20）的根目录下
+
+
+def _digest(parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+class ResultManifest:
+    """
+    记录每个 *_time.json 是由哪些输入生成的，重跑时只重新计算输入发生变化的条目
+
+    每个条目保存四个指纹：调度结果文件、图片文件夹、模型 checkpoint、计时配置。
+    文件哈希按 (大小, mtime_ns) 缓存在清单里，未修改的文件不会重新读取。
+    """
+
+    VERSION = 1
+    PARTS = ('result', 'images', 'models', 'config')
+
+    def __init__(self, base_folder, name=MANIFEST_NAME):
+        self.base_folder = Path(base_folder)
+        self.path = self.base_folder / name
+        self.entries = {}  # 相对 base_folder 的 *_time.json 路径 -> {result, images, models, config, updated_at}
+        self.file_hashes = {}  # 文件路径 -> [size, mtime_ns, sha256]
+        self._folder_hashes = {}
+        if self.path.exists():
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[!] 清单无法读取，视为空清单: {self.path} ({e})")
+            return
+        if data.get('version') != self.VERSION:
+            print(f"[!] 清单版本不匹配，视为空清单: {self.path}")
+            return
+        self.entries = data.get('entries', {})
+        self.file_hashes = data.get('file_hashes', {})
+
+    def save(self):
+        data = {
+            'version': self.VERSION,
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'entries': dict(sorted(self.entries.items())),
+            'file_hashes': self.file_hashes
+        }
+        tmp_path = str(self.path) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def file_hash(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cached = self.file_hashes.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        sha = file_sha256(path)
+        self.file_hashes[path] = [st.st_size, st.st_mtime_ns, sha]
+        return sha
+
+    def folder_hash(self, folder):
+        """文件夹内所有文件（按相对路径排序）的内容哈希；文件夹不存在时为 'missing'"""
+        folder = os.path.abspath(folder)
+        if folder not in self._folder_hashes:
+            if not os.path.isdir(folder):
+                self._folder_hashes[folder] = 'missing'
+            else:
+                files = sorted(p for p in Path(folder).rglob('*') if p.is_file())
+                self._folder_hashes[folder] = _digest(
+                    f"{p.relative_to(folder).as_posix()}:{self.file_hash(p)}" for p in files)
+        return self._folder_hashes[folder]
+
+    def models_hash(self, model_paths):
+        """model_paths 为 {size: path} 或打包文件路径"""
+        if isinstance(model_paths, (str, os.PathLike)):
+            return self.file_hash(model_paths)
+        return _digest(f"{size}:{self.file_hash(path)}" for size, path in sorted(model_paths.items()))
+
+    @staticmethod
+    def config_hash(config):
+        return _digest([json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)])
+
+    def key(self, output_path):
+        return Path(output_path).resolve().relative_to(self.base_folder.resolve()).as_posix()
+
+    def fingerprint(self, result_path, image_folder, models, config):
+        """models、config 为已算好的哈希（同一次运行内不变，由调用方只算一次）"""
+        return {'result': self.file_hash(result_path), 'images': self.folder_hash(image_folder),
+                'models': models, 'config': config}
+
+    def changes(self, output_path, fingerprint):
+        """返回需要重新计算的原因列表，空列表表示条目是最新的"""
+        entry = self.entries.get(self.key(output_path))
+        if entry is None:
+            return ['new']
+        reasons = [part for part in self.PARTS if entry.get(part) != fingerprint[part]]
+        if not os.path.exists(output_path):
+            reasons.append('output_missing')
+        return reasons
+
+    def record(self, output_path, fingerprint):
+        self.entries[self.key(output_path)] = dict(fingerprint, updated_at=time.strftime('%Y-%m-%d %H:%M:%S'))
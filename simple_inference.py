@@ -1,13 +1,82 @@
 import torch
-from torchvision import transforms
 from PIL import Image
 import os
 import json
 import time
-from model_torch import EarlyExitResNet18
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from model_torch import EarlyExitResNet18, count_stage_macs
+from tensor_cache import TensorCache
+from prediction_cache import PredictionStore, file_sha256
+from preprocess import build_transform, load_image_tensor
+from decode_pool import DecodePool
+from tensor_shards import ShardStore
+from latency_model import LatencyCache, DEFAULT_PROFILE
+from optimized_engine import EngineCache, ENGINE_CACHE_DIR
+from precision import PRECISION_DTYPES, probe_precisions, autocast_context, select_precision, probe_batch
+from model_bundle import LazyModelRegistry, open_bundle, materialize
+from concurrent_rounds import RoundExecutor, split_rounds
+from cost_model import TIME_UNIT_MS, deadline_to_ms
+
+# 类别映射：根据训练时的文件夹顺序
+CLASS_MAPPING = {
+    0: "bench",
+    1: "bicycle", 
+    2: "car",
+    3: "motorcycle",
+    4: "person",
+    5: "traffic light",
+    6: "train"
+}
+
+
+def is_torchscript_archive(path):
+    # TorchScript 归档里有 constants.pkl，torch.save 保存的 checkpoint 没有
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as zf:
+        return any(name.endswith('/constants.pkl') or name == 'constants.pkl' for name in zf.namelist())
+
+
+def normalize_stage(stage):
+    # 第4阶段就是完整网络，统一用 None 表示
+    return None if stage in (None, 4) else stage
+
 
 class SimpleInference:
-    def __init__(self, model_paths, image_folder, num_classes=7):
+    # cache_bytes: 预处理张量缓存的字节预算，0 表示不缓存
+    # timed_cache: 'cold' 时正式计时的轮次绕过缓存（计时包含解码），'warm' 时计时也走缓存
+    # prediction_store: 持久化预测库的路径（或 PredictionStore 实例），None 表示不使用
+    # measure_timing: False 时直接从预测库填充结果，只对未命中的图片运行模型，不做计时
+    # shard_root: tensor_shards 打包的分片目录，存在时直接从内存映射分片取张量，None 表示总是解码 JPEG
+    # decode_workers: 并行解码的进程数，0 表示在主线程逐张解码；prefetch_depth: 每个进程最多预取的图片数
+    # pipeline: True 时下一批的加载/预处理与当前批的推理重叠执行（每个尺寸只预热一次，正式只跑一遍）
+    # exit_thresholds: 动态提前退出的 exit1~exit3 置信度阈值；可以是所有尺寸共用的列表、
+    #                  {size: 列表} 字典或 calibrate_exits.py 输出的 JSON 路径，None 表示不启用
+    # latency_mode: 'measure'（每批预热+计时）、'memo'（同形状只测一次）或 'profile'（按延迟模型预测）
+    # latency_profile: profile_latency.py 生成的 latency_profile.json 路径
+    # optimized: True 时为每个尺寸、每个出口生成 BN 折叠 + channels_last + TorchScript 冻结的模型，
+    #            编译结果缓存在 engine_cache_dir 中
+    # precision: 'fp32'、'auto'（探测硬件支持的低精度）、'bf16' 或 'fp16'；非 fp32 时启动阶段对每个尺寸
+    #            测速，只有低精度更快且 top-1 与 fp32 足够一致时才启用 autocast，否则该尺寸保持 fp32
+    # model_paths 也可以是 model_bundle.py 生成的打包文件路径，此时总是懒加载
+    # lazy_models: True 时各尺寸模型在第一次有批次用到时才加载（权重内存映射），优化/低精度选择也推迟到那时
+    # max_resident_models / min_available_memory: 懒加载时最多常驻的模型数 / 可用内存（字节）低于该值时
+    #            释放最久未用的尺寸，None/0 表示不限制
+    # concurrent_rounds: True 时同一轮里不同尺寸的批次在互不相交的核上并行执行（每个尺寸一个绑核的 worker 进程，
+    #            按实测工作量自动调整分核），batch_info 额外给出 round makespan；concurrent_cores 为可用核列表，None 表示全部
+    # enforce_deadline: True 时执行前按延迟模型预测每批耗时，预计超过截止期就换更小的尺寸、只保留关键图片或跳过该批，
+    #            每个决定都记录在 batch_info 的 enforcement 中，被放弃的图片计为错过截止期；
+    #            需要延迟模型，latency_profile 为 None 时使用 latency_model.DEFAULT_PROFILE
+    # cascade_threshold: 分辨率级联的置信度阈值（所有尺寸共用的数值或 {size: 阈值}），None 表示不启用；
+    #            启用后完整网络的批次先在最小尺寸上分类，置信度低于阈值的图片成批升到更大的尺寸，最多到计划尺寸；
+    #            字典中没有给出阈值的中间尺寸不参与级联
+    def __init__(self, model_paths, image_folder, num_classes=7, cache_bytes=0, timed_cache='cold',
+                 prediction_store=None, measure_timing=True, shard_root=None,
+                 decode_workers=0, prefetch_depth=2, pipeline=False, exit_thresholds=None,
+                 latency_mode='measure', latency_profile=None, optimized=False, engine_cache_dir=ENGINE_CACHE_DIR,
+                 precision='fp32', lazy_models=False, max_resident_models=None, min_available_memory=0,
+                 concurrent_rounds=False, concurrent_cores=None, enforce_deadline=False, cascade_threshold=None):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         try:
             torch.backends.cudnn.benchmark = True
@@ -16,71 +85,381 @@ class SimpleInference:
         self.num_classes = num_classes
         self.image_folder = image_folder
         self.models = {}
+        self._eager_sizes = set()  # 模型为 EarlyExitResNet18（而非 TorchScript）的尺寸，懒加载时不加载也能判断
         self.warmed_sizes = set()
+        if timed_cache not in ('cold', 'warm'):
+            raise ValueError(f"timed_cache 只能是 'cold' 或 'warm'，收到: {timed_cache}")
+        self.timed_cache = timed_cache
+        self.tensor_cache = TensorCache(cache_bytes) if cache_bytes > 0 else None
+        if isinstance(prediction_store, str):
+            prediction_store = PredictionStore(prediction_store)
+        self.prediction_store = prediction_store
+        self.measure_timing = measure_timing
+        self.model_hashes = {}
+        self.shard_store = ShardStore(shard_root) if shard_root else None
+        self.decode_pool = DecodePool(decode_workers, prefetch_depth) if decode_workers > 0 else None
+        self.pipeline = pipeline
+        self.exit_thresholds = self._parse_exit_thresholds(exit_thresholds)
+        if latency_mode not in ('measure', 'memo', 'profile'):
+            raise ValueError(f"latency_mode 只能是 'measure'、'memo' 或 'profile'，收到: {latency_mode}")
+        self.latency_mode = latency_mode
+        if enforce_deadline and latency_profile is None:
+            latency_profile = DEFAULT_PROFILE
+        self.latency_cache = LatencyCache(latency_profile)
+        if enforce_deadline and not self.latency_cache.profile:
+            # 没有延迟模型时首批之前没有任何预测，执行约束形同虚设
+            raise ValueError(f"enforce_deadline 需要延迟模型，请先运行 profile_latency.py 生成: {latency_profile}")
+        self.engines = {}
+        if precision not in ('fp32', 'auto') and precision not in PRECISION_DTYPES:
+            raise ValueError(f"precision 只能是 'fp32'、'auto'、'bf16' 或 'fp16'，收到: {precision}")
+        self.precision_by_size = {}
+        self.precision_report = {}
+        self._needs_hash = self.prediction_store is not None or optimized
+        self._engine_cache = EngineCache(engine_cache_dir) if optimized else None
+        self._precision_candidates = []
+        if precision != 'fp32':
+            self._precision_candidates = probe_precisions(self.device) if precision == 'auto' else [precision]
+            print(f"低精度候选: {self._precision_candidates or '无（硬件不支持）'}")
         
-        # 类别映射：根据训练时的文件夹顺序
-        self.class_mapping = {
-            0: "bench",
-            1: "bicycle", 
-            2: "car",
-            3: "motorcycle",
-            4: "person",
-            5: "traffic light",
-            6: "train"
-        }
+        self.class_mapping = dict(CLASS_MAPPING)
+
+        self.enforce_deadline = enforce_deadline
+        self.cascade_threshold = cascade_threshold
+        self._image_macs = {}
+        self._macs_reference = None
+        self.round_executor = None
+        if concurrent_rounds:
+            # worker 进程用同样的配置各自构建推理实例（不带预测库、解码池和流水线）
+            worker_kwargs = {'model_paths': model_paths, 'image_folder': image_folder, 'num_classes': num_classes,
+                             'cache_bytes': cache_bytes, 'timed_cache': timed_cache, 'shard_root': shard_root,
+                             'exit_thresholds': exit_thresholds, 'optimized': optimized,
+                             'engine_cache_dir': engine_cache_dir, 'precision': precision,
+                             'cascade_threshold': cascade_threshold}
+            self.round_executor = RoundExecutor(worker_kwargs, cores=concurrent_cores)
         
-        # 加载所有模型
-        for size, model_path in model_paths.items():
-            if os.path.exists(model_path):
-                try:
-                    model = EarlyExitResNet18(num_classes=num_classes)
-                    checkpoint = torch.load(model_path, map_location=self.device)
-                    model.load_state_dict(checkpoint['model_state_dict'])
-                    model = model.to(self.device)
-                    model.eval()
-                    
-                    self.models[size] = model
-                    print(f"[OK] 成功加载模型: {size}px")
-                except Exception as e:
-                    print(f"[X] 加载模型 {size}px 失败: {e}")
-            else:
-                print(f"[X] 模型文件不存在: {model_path}")
+        if isinstance(model_paths, str) or lazy_models:
+            self.models = self._lazy_registry(model_paths, num_classes, max_resident_models, min_available_memory)
+        else:
+            self._load_all_models(model_paths, num_classes)
 
     def get_transform(self, target_size):
-        return transforms.Compose([
-            transforms.Resize((target_size, target_size)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-
-    def load_images_batch(self, image_ids, size):
-        transform = self.get_transform(size)
+        return build_transform(target_size)
+
+    def load_images_batch(self, image_ids, size, use_cache=True):
+        cache = self.tensor_cache if use_cache else None
+        shard, shard_rows = None, {}
+        if self.shard_store is not None:
+            found = self.shard_store.lookup(self.image_folder, size)
+            if found is not None:
+                shard, shard_rows = found
+        # 整批都在分片里：一次 index_select 直接从内存映射中取行
+        if shard is not None and image_ids and all(image_id in shard_rows for image_id in image_ids):
+            rows = torch.tensor([shard_rows[image_id] for image_id in image_ids], dtype=torch.long)
+            return shard.index_select(0, rows).to(self.device), list(image_ids), []
         images = []
         valid_ids = []
         missing_ids = []
+        pending = []  # 需要解码的图片：(在 images 中的位置, 路径, 缓存键)
         for image_id in image_ids:
+            if image_id in shard_rows:
+                images.append(shard[shard_rows[image_id]])
+                valid_ids.append(image_id)
+                continue
             image_path = os.path.join(self.image_folder, f"{image_id}.jpg")
             if not os.path.exists(image_path):
                 missing_ids.append(image_id)
                 continue
-            img = Image.open(image_path).convert('RGB')
-            img = transform(img)
+            img = None
+            key = None
+            if cache is not None:
+                key = TensorCache.make_key(image_path, size)
+                img = cache.get(key)
+            if img is None:
+                pending.append((len(images), image_path, key))
             images.append(img)
             valid_ids.append(image_id)
+        if pending:
+            paths = [image_path for _, image_path, _ in pending]
+            if self.decode_pool is not None and len(pending) > 1:
+                decoded = self.decode_pool.imap(paths, size)
+            else:
+                decoded = (load_image_tensor(image_path, size) for image_path in paths)
+            for (pos, _, key), img in zip(pending, decoded):
+                images[pos] = img
+                if cache is not None:
+                    cache.put(key, img)
         if not images:
             return None, valid_ids, missing_ids
         return torch.stack(images).to(self.device), valid_ids, missing_ids
 
-    # TODO：这个函数的功能是什么
-    def predict_batch(self, input_tensor, size):
+    @staticmethod
+    def _parse_exit_thresholds(exit_thresholds):
+        if exit_thresholds is None:
+            return None
+        if isinstance(exit_thresholds, str):
+            with open(exit_thresholds, 'r', encoding='utf-8') as f:
+                calibration = json.load(f)
+            return {int(size): entry['thresholds'] for size, entry in calibration['sizes'].items()}
+        if isinstance(exit_thresholds, dict):
+            return {int(size): list(values) for size, values in exit_thresholds.items()}
+        return {None: list(exit_thresholds)}
+
+    def get_exit_thresholds(self, size):
+        if self.exit_thresholds is None:
+            return None
+        return self.exit_thresholds.get(size, self.exit_thresholds.get(None))
+
+    # 批次没有指定 stage 且该尺寸配置了阈值时走动态提前退出
+    # （TorchScript 模型没有 forward_dynamic，只能按固定出口运行；按文件类型判断，懒加载时不会因此加载模型）
+    def uses_dynamic_exit(self, size, stage):
+        return (normalize_stage(stage) is None and self.get_exit_thresholds(size) is not None
+                and size in self._eager_sizes)
+
+    # 动态提前退出推理，额外返回每张图片的退出阶段和置信度
+    def predict_batch_dynamic(self, input_tensor, size):
+        with torch.inference_mode(), autocast_context(self.device, self.precision_by_size.get(size)):
+            logits, exit_stages, confidences = self.models[size].forward_dynamic(
+                input_tensor, self.get_exit_thresholds(size))
+            predictions = torch.argmax(logits, dim=1)
+        pred_ids = predictions.detach().cpu().tolist()
+        pred_names = [self.class_mapping.get(pid, f"Unknown_Class_{pid}") for pid in pred_ids]
+        extras = [{'exit_stage': stage_id, 'confidence': round(conf, 4)}
+                  for stage_id, conf in zip(exit_stages.cpu().tolist(), confidences.cpu().tolist())]
+        return pred_ids, pred_names, extras
+
+    def uses_cascade(self, size, stage):
+        return (self.cascade_threshold is not None and normalize_stage(stage) is None
+                and len(self._cascade_levels(size)) > 1)
+
+    def _cascade_threshold_for(self, size):
+        if isinstance(self.cascade_threshold, dict):
+            return self.cascade_threshold.get(size)
+        return self.cascade_threshold
+
+    # 级联经过的尺寸：比 size 小且有阈值的尺寸，最后是 size 本身（最后一级不需要阈值）
+    # {size: 阈值} 中没有给出的中间尺寸直接跳过，不会在那一级把所有图片定下来
+    def _cascade_levels(self, size):
+        return sorted(s for s in self.models
+                      if s == size or (s < size and self._cascade_threshold_for(s) is not None))
+
+    # 单张图片在 size 上跑完整网络的乘加次数，用于统计级联省下的计算量
+    # 各尺寸（包括 int8 量化模型）都是同一个 EarlyExitResNet18 结构，统一在 meta 设备上的参考网络上统计，
+    # 各级口径一致，也不需要加载真实模型
+    def image_macs(self, size):
+        if size not in self._image_macs:
+            if self._macs_reference is None:
+                with torch.device('meta'):
+                    self._macs_reference = EarlyExitResNet18(num_classes=self.num_classes).eval()
+            self._image_macs[size] = count_stage_macs(self._macs_reference, size)[3]
+        return self._image_macs[size]
+
+    # 分辨率级联：从最小尺寸开始分类，置信度低于该尺寸阈值的图片成批升到下一个尺寸，到计划尺寸 size 为止
+    # 附加信息：最终尺寸、升级次数（0 表示在最小尺寸就确定）、置信度，以及相对直接跑 size 的计算量比例
+    def predict_cascade(self, valid_ids, size, use_cache=True):
+        levels = self._cascade_levels(size)
+        decided = {}
+        pending = list(valid_ids)
+        for depth, level in enumerate(levels):
+            input_tensor, loaded_ids, _ = self.load_images_batch(pending, level, use_cache=use_cache)
+            if input_tensor is None:
+                break
+            with torch.inference_mode():
+                probabilities = torch.softmax(self._forward(input_tensor, level).float(), dim=1)
+                confidences, predictions = torch.max(probabilities, dim=1)
+            threshold = self._cascade_threshold_for(level)
+            final = level == levels[-1]
+            pending = []
+            for image_id, pid, conf in zip(loaded_ids, predictions.cpu().tolist(), confidences.cpu().tolist()):
+                if final or conf >= threshold:
+                    decided[image_id] = (pid, conf, level, depth)
+                else:
+                    pending.append(image_id)
+            if not pending:
+                break
+
+        baseline = self.image_macs(size)
+        level_cost = [0]
+        for level in levels:
+            level_cost.append(level_cost[-1] + self.image_macs(level))
+        pred_ids, pred_names, extras = [], [], []
+        for image_id in valid_ids:
+            pid, conf, level, depth = decided[image_id]
+            pred_ids.append(pid)
+            pred_names.append(self.class_mapping.get(pid, f"Unknown_Class_{pid}"))
+            extras.append({'cascade_size': level, 'escalation_depth': depth, 'confidence': round(conf, 4),
+                           'compute_ratio': round(level_cost[depth + 1] / baseline, 4)})
+        return pred_ids, pred_names, extras
+
+    # 加载+推理；级联模式下各尺寸的图片在 predict_cascade 里按需加载
+    def _load_and_predict(self, valid_ids, size, stage=None, use_cache=True):
+        if self.uses_cascade(size, stage):
+            return self.predict_cascade(valid_ids, size, use_cache=use_cache)
+        input_tensor, _, _ = self.load_images_batch(valid_ids, size, use_cache=use_cache)
+        with torch.inference_mode():
+            return self._predict(input_tensor, size, stage)
+
+    # 统一入口：返回 (pred_ids, pred_names, 每张图片的附加信息或 None)
+    def _predict(self, input_tensor, size, stage=None):
+        if self.uses_dynamic_exit(size, stage):
+            return self.predict_batch_dynamic(input_tensor, size)
+        pred_ids, pred_names = self.predict_batch(input_tensor, size, stage)
+        return pred_ids, pred_names, None
+
+    # 普通 checkpoint 加载为 EarlyExitResNet18；TorchScript 归档（如 quantize_models.py 生成的 int8 模型）直接 jit.load
+    def _load_model(self, model_path, num_classes, mmap=False):
+        if is_torchscript_archive(model_path):
+            if self.device.type != 'cpu':
+                print(f"[!] {model_path} 是 TorchScript 模型，int8 量化模型只能在 CPU 上运行")
+            model = torch.jit.load(model_path, map_location=self.device)
+        elif mmap:
+            checkpoint = torch.load(model_path, map_location='cpu', mmap=True)
+            model = materialize(checkpoint['model_state_dict'], num_classes, self.device)
+        else:
+            model = EarlyExitResNet18(num_classes=num_classes)
+            checkpoint = torch.load(model_path, map_location=self.device)
+            model.load_state_dict(checkpoint['model_state_dict'])
+            model = model.to(self.device)
+        model.eval()
+        return model
+
+    def _load_all_models(self, model_paths, num_classes):
+        # 加载所有模型
+        for size, model_path in model_paths.items():
+            if os.path.exists(model_path):
+                try:
+                    model = self._load_model(model_path, num_classes)
+                    self.models[size] = model
+                    if isinstance(model, EarlyExitResNet18):
+                        self._eager_sizes.add(size)
+                    if self._needs_hash:
+                        self.model_hashes[size] = file_sha256(model_path)
+                    print(f"[OK] 成功加载模型: {size}px")
+                except Exception as e:
+                    print(f"[X] 加载模型 {size}px 失败: {e}")
+            else:
+                print(f"[X] 模型文件不存在: {model_path}")
+
+        for size, model in self.models.items():
+            self._prepare_model(size, model)
+
+    def _lazy_registry(self, model_paths, num_classes, max_resident, min_available_bytes):
+        if isinstance(model_paths, str):
+            state_dicts, hashes, num_classes = open_bundle(model_paths)
+            self.model_hashes.update(hashes)
+            loaders = {size: (lambda state=state: materialize(state, num_classes, self.device))
+                       for size, state in state_dicts.items()}
+            self._eager_sizes.update(loaders)
+            print(f"[OK] 已映射模型打包文件: {model_paths} ({sorted(loaders)}px)")
+        else:
+            loaders = {}
+            for size, model_path in model_paths.items():
+                if not os.path.exists(model_path):
+                    print(f"[X] 模型文件不存在: {model_path}")
+                    continue
+                loaders[size] = lambda path=model_path: self._load_model(path, num_classes, mmap=True)
+                if not is_torchscript_archive(model_path):
+                    self._eager_sizes.add(size)
+                # 预测库模式下不加载模型也要用到哈希（predict_from_store），这里先算好
+                if self._needs_hash:
+                    self.model_hashes[size] = file_sha256(model_path)
+            self._model_paths = dict(model_paths)
+        return LazyModelRegistry(loaders, max_resident=max_resident, min_available_bytes=min_available_bytes,
+                                 on_load=self._prepare_model, on_evict=self._release_model)
+
+    # 模型加载后（启动时或懒加载第一次用到时）：计算哈希、生成优化模型、选择精度
+    def _prepare_model(self, size, model):
+        if self._needs_hash and size not in self.model_hashes:
+            self.model_hashes[size] = file_sha256(self._model_paths[size])
+        if self._engine_cache is not None:
+            self._build_engines(size, model)
+        if self._precision_candidates:
+            self._select_precision(size, model)
+
+    def _release_model(self, size):
+        for key in [key for key in self.engines if key[0] == size]:
+            del self.engines[key]
+        self.precision_by_size.pop(size, None)
+        self.warmed_sizes.discard(size)
+
+    def _build_engines(self, size, model):
+        if not isinstance(model, EarlyExitResNet18):
+            return
+        for stage in (1, 2, 3, 4):
+            try:
+                engine = self._engine_cache.load_or_build(model, self.model_hashes[size], size, stage, self.device)
+            except Exception as e:
+                print(f"[X] {size}px 阶段{stage} 优化失败，使用原模型: {e}")
+                continue
+            if engine is not None:
+                self.engines[(size, stage)] = engine
+        print(f"[OK] {size}px 优化模型就绪: {sum(1 for key in self.engines if key[0] == size)}/4 个出口")
+
+    def _select_precision(self, size, model):
+        if not isinstance(model, EarlyExitResNet18):
+            return
+        selected, report = select_precision(self, size, self._precision_candidates, probe_batch(self, size))
+        self.precision_report[size] = report
+        if selected is not None:
+            self.precision_by_size[size] = selected
+        print(f"  {size}px 使用 {report['selected']}: {report}")
+
+    # 运行 size 模型到第 stage 个出口（1-4），None 或 4 表示完整网络
+    def _forward(self, input_tensor, size, stage=None):
+        precision = self.precision_by_size.get(size)
+        if precision is not None:
+            # 低精度走 eager 模型 + autocast（TorchScript 冻结模型不受 autocast 影响）
+            with autocast_context(self.device, precision):
+                return self.models[size](input_tensor, target_stage=normalize_stage(stage))
+        engine = self.engines.get((size, normalize_stage(stage) or 4))
+        if engine is not None:
+            return engine(input_tensor.contiguous(memory_format=torch.channels_last))
+        return self.models[size](input_tensor, target_stage=normalize_stage(stage))
+
+    # 批量推理：模型输出得分->softmax概率->取最大概率的类别ID与名称
+    def predict_batch(self, input_tensor, size, stage=None):
         with torch.inference_mode():
-            outputs = self.models[size](input_tensor)
+            outputs = self._forward(input_tensor, size, stage)
             probabilities = torch.softmax(outputs, dim=1)
             _, predictions = torch.max(probabilities, dim=1)
         pred_ids = predictions.detach().cpu().tolist()
         pred_names = [self.class_mapping.get(pid, f"Unknown_Class_{pid}") for pid in pred_ids]
         return pred_ids, pred_names
 
+    # 预测库键中的推理精度：低精度按尺寸在模型加载时选定，有低精度候选时先确保该尺寸已加载
+    def _store_precision(self, size):
+        if self._precision_candidates and size in self.models:
+            self.models[size]
+        return self.precision_by_size.get(size, 'fp32')
+
+    # 先查预测库，只对未命中的图片真正运行模型，并把新结果写回库中
+    def predict_from_store(self, valid_ids, size, stage=None):
+        model_hash = self.model_hashes[size]
+        precision = self._store_precision(size)
+        image_paths = {img_id: os.path.join(self.image_folder, f"{img_id}.jpg") for img_id in valid_ids}
+        cached = {}
+        miss_ids = []
+        for img_id in valid_ids:
+            entry = self.prediction_store.get(image_paths[img_id], model_hash, size, stage, precision)
+            if entry is None:
+                miss_ids.append(img_id)
+            else:
+                cached[img_id] = (entry['predicted_class_id'], entry['predicted_class'])
+        if miss_ids:
+            input_tensor, loaded_ids, _ = self.load_images_batch(miss_ids, size)
+            if input_tensor is not None:
+                miss_pred_ids, miss_pred_names = self.predict_batch(input_tensor, size, stage)
+                for img_id, pid, pname in zip(loaded_ids, miss_pred_ids, miss_pred_names):
+                    cached[img_id] = (pid, pname)
+                    self.prediction_store.put(image_paths[img_id], model_hash, size, pid, pname, stage, precision)
+        pred_ids = [cached[img_id][0] for img_id in valid_ids]
+        pred_names = [cached[img_id][1] for img_id in valid_ids]
+        return pred_ids, pred_names, len(valid_ids) - len(miss_ids)
+
+    def cache_stats(self):
+        if self.tensor_cache is None:
+            return None
+        return self.tensor_cache.stats()
+
     # 输入向量->模型输出得分->转化为概率->旋转最大概率的物品类别与大小进行输出
     def predict_single_image(self, image_id, size):
         if size not in self.models:
@@ -136,34 +515,33 @@ class SimpleInference:
                 'error': str(e)
             }
 
-    # 从一个 JSON 文件中读取一批图像的处理任务
-    def process_json_file(self, json_file_path):
+    # 读取调度结果文件，返回 (批次列表, deadline毫秒)；文件有问题时返回 None
+    def _load_plan(self, json_file_path):
         try:
             with open(json_file_path, 'r', encoding='utf-8') as f:
                 batches = json.load(f)
         except FileNotFoundError:
             print(f"[X] 文件不存在: {json_file_path}")
-            return []
+            return None
         except json.JSONDecodeError as e:
             print(f"[X] JSON解析错误: {e}")
-            return []
+            return None
         
         # 解析deadline（由C端在数组末尾追加的对象 {"deadline": <float>}）
         deadline_ms = None
         if isinstance(batches, list) and len(batches) > 0 and isinstance(batches[-1], dict) and 'deadline' in batches[-1]:
             try:
-                deadline_value = float(batches[-1]['deadline'])
-                # C端以秒为单位，这里统一转换为毫秒
-                deadline_ms = deadline_value * 1000.0
+                # C端与代价表同一时间单位（见 cost_model.TIME_UNIT_MS），这里统一转换为毫秒
+                deadline_ms = deadline_to_ms(batches[-1]['deadline'])
             except (TypeError, ValueError):
                 deadline_ms = None
             # 从批次数组中移除deadline占位对象
             batches = batches[:-1]
-        
-        results = []
-        cumulative_time = 0.0  # 累计时间，初始为0（毫秒）
-        missed_deadline_images = []  # 记录错过截止期的图片ID
-        
+        return batches, deadline_ms
+
+    # 规范化批次并区分有效/缺失图片，缺失图片的错误结果先准备好
+    def _prepare_batches(self, batches):
+        prepared = []
         for batch_idx, batch in enumerate(batches):
             size = batch.get('size')
             image_items = batch.get('images', [])
@@ -180,17 +558,19 @@ class SimpleInference:
             if not size or not image_ids:
                 print(f"批次 {batch_idx + 1} 缺少必要信息，跳过")
                 continue
-            
-            print(f"\n处理批次 {batch_idx + 1}: 大小={size}px, 图片数量={len(image_ids)}")
-            
-            # 先为缺失的图片写入错误结果
-            missing_ids = []
+
+            # 可选的提前退出阶段（1-4），缺省时跑完整网络
+            stage = batch.get('stage')
+            if stage is not None and stage not in (1, 2, 3, 4):
+                print(f"[!] 批次 {batch_idx + 1} 的 stage={stage} 无效，使用完整网络")
+                stage = None
+
+            missing_results = []
             valid_ids = []
             for image_id in image_ids:
                 image_path = os.path.join(self.image_folder, f"{image_id}.jpg")
                 if not os.path.exists(image_path):
-                    missing_ids.append(image_id)
-                    results.append({
+                    missing_results.append({
                         'image_id': image_id,
                         'size': size,
                         'predicted_class': None,
@@ -198,64 +578,306 @@ class SimpleInference:
                         'error': f'图片文件不存在: {image_path}',
                         'crucial': 1 if id_to_crucial.get(image_id, 0) else 0
                     })
-                    print(f"  [X] {image_id}: 图片文件不存在")
                 else:
                     valid_ids.append(image_id)
+
+            prepared.append({
+                'batch_index': batch_idx + 1,
+                'size': size,
+                'stage': stage,
+                'image_ids': image_ids,
+                'id_to_crucial': id_to_crucial,
+                'valid_ids': valid_ids,
+                'missing_results': missing_results
+            })
+        return prepared
+
+    def _sync(self):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
+    # 完整批次预热
+    def _warmup(self, valid_ids, size, stage=None, runs=7):
+        for _ in range(runs):
+            self._sync()
+            if self.uses_cascade(size, stage):
+                self.predict_cascade(valid_ids, size)
+                self._sync()
+                continue
+            warm_tensor, _, _ = self.load_images_batch(valid_ids, size)
+            if warm_tensor is not None:
+                with torch.inference_mode():
+                    _ = self._forward(warm_tensor, size, stage)
+                self._sync()
+        self.warmed_sizes.add(size)
+
+    # 预热 warmup_runs 次后正式计时 stabilize_runs 次，包含批量加载+预处理+推理，报告最后一次的耗时
+    def _measure(self, valid_ids, size, stage, warmup_runs=7, stabilize_runs=3):
+        if warmup_runs > 0:
+            self._warmup(valid_ids, size, stage, runs=warmup_runs)
+        timed_use_cache = self.timed_cache == 'warm'
+        measured_times_ms = []
+        pred_ids = []
+        pred_names = []
+        extras = None
+        for run_idx in range(stabilize_runs):
+            self._sync()
+            batch_start_time = time.perf_counter()
+
+            pred_ids, pred_names, extras = self._load_and_predict(valid_ids, size, stage, use_cache=timed_use_cache)
+
+            self._sync()
+            batch_end_time = time.perf_counter()
+            measured_times_ms.append((batch_end_time - batch_start_time) * 1000)
+
+        batch_processing_time = measured_times_ms[-1]
+        return batch_processing_time, pred_ids, pred_names, extras
+
+    def _latency_stage(self, size, stage):
+        if self.uses_cascade(size, stage):
+            return 'cascade'
+        return 'dynamic' if self.uses_dynamic_exit(size, stage) else normalize_stage(stage)
+
+    # 逐批执行，latency_mode 决定耗时来源：
+    #   'measure': 每批都预热7次+计时3次
+    #   'memo':    同一形状 (尺寸, 批次长度, 阶段, 线程配置) 只实测一次，之后复用
+    #   'profile': 优先用延迟模型文件的 k*x+b，模型里没有的形状再按 'memo' 处理
+    def _run_batch(self, valid_ids, size, stage=None):
+        if not valid_ids:
+            return {'time_ms': 0.0, 'pred_ids': [], 'pred_names': [], 'extras': None, 'info': {}}
+        if (self.prediction_store is not None and not self.measure_timing
+                and not self.uses_dynamic_exit(size, stage) and not self.uses_cascade(size, stage)):
+            # 不计时：直接从预测库取结果
+            pred_ids, pred_names, store_hits = self.predict_from_store(valid_ids, size, stage)
+            print(f"  预测库命中 {store_hits}/{len(valid_ids)}")
+            return {'time_ms': 0.0, 'pred_ids': pred_ids, 'pred_names': pred_names, 'extras': None,
+                    'info': {'timed': False}}
+
+        if self.latency_mode == 'measure':
+            time_ms, pred_ids, pred_names, extras = self._measure(valid_ids, size, stage)
+            # 只记录不复用，供 enforce_deadline 预测之后的批次
+            self.latency_cache.put(size, len(valid_ids), self._latency_stage(size, stage), time_ms)
+            return {'time_ms': time_ms, 'pred_ids': pred_ids, 'pred_names': pred_names,
+                    'extras': extras, 'info': {}}
+
+        latency_stage = self._latency_stage(size, stage)
+        source = 'memo'
+        time_ms = self.latency_cache.get(size, len(valid_ids), latency_stage)
+        if time_ms is None and self.latency_mode == 'profile':
+            time_ms = self.latency_cache.predict_from_profile(size, len(valid_ids), latency_stage)
+            source = 'profile'
+        if time_ms is not None:
+            # 命中：只跑一遍推理拿预测结果，不再计时
+            pred_ids, pred_names, extras = self._load_and_predict(valid_ids, size, stage)
+            return {'time_ms': time_ms, 'pred_ids': pred_ids, 'pred_names': pred_names,
+                    'extras': extras, 'info': {'latency_source': source}}
+
+        # 未命中：每个尺寸只完整预热一次，之后的新形状只做一次预热
+        warmup_runs = 7 if size not in self.warmed_sizes else 1
+        time_ms, pred_ids, pred_names, extras = self._measure(valid_ids, size, stage, warmup_runs=warmup_runs)
+        self.latency_cache.put(size, len(valid_ids), latency_stage, time_ms)
+        return {'time_ms': time_ms, 'pred_ids': pred_ids, 'pred_names': pred_names,
+                'extras': extras, 'info': {'latency_source': 'measured'}}
+
+    def _timed_load(self, valid_ids, size):
+        start = time.perf_counter()
+        input_tensor, _, _ = self.load_images_batch(valid_ids, size, use_cache=self.timed_cache == 'warm')
+        self._sync()
+        return input_tensor, (time.perf_counter() - start) * 1000
+
+    # 流水线执行：推理第 k 批的同时在后台线程加载/预处理第 k+1 批
+    # 每批耗时 = 等待加载的时间 + 推理时间，被推理掩盖掉的加载时间记为 overlap_hidden_ms
+    def _run_pipelined(self, prepared):
+        runnable = [item for item in prepared if item['valid_ids']]
+        for item in runnable:
+            if item['size'] not in self.warmed_sizes:
+                self._warmup(item['valid_ids'], item['size'], item['stage'])
+
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=1) as loader:
+            future = None
+            if runnable:
+                future = loader.submit(self._timed_load, runnable[0]['valid_ids'], runnable[0]['size'])
+            for k, item in enumerate(runnable):
+                wait_start = time.perf_counter()
+                input_tensor, load_ms = future.result()
+                wait_ms = (time.perf_counter() - wait_start) * 1000
+                if k + 1 < len(runnable):
+                    nxt = runnable[k + 1]
+                    future = loader.submit(self._timed_load, nxt['valid_ids'], nxt['size'])
+
+                infer_start = time.perf_counter()
+                pred_ids, pred_names, extras = self._predict(input_tensor, item['size'], item['stage'])
+                self._sync()
+                infer_ms = (time.perf_counter() - infer_start) * 1000
+
+                outcomes[item['batch_index']] = {
+                    'time_ms': wait_ms + infer_ms,
+                    'pred_ids': pred_ids,
+                    'pred_names': pred_names,
+                    'extras': extras,
+                    'info': {
+                        'load_time_ms': round(load_ms, 2),
+                        'inference_time_ms': round(infer_ms, 2),
+                        'overlap_hidden_ms': round(max(0.0, load_ms - wait_ms), 2)
+                    }
+                }
+        return outcomes
+
+    # 按延迟模型决定这一批怎么执行，依次尝试：原样执行 -> 换更小尺寸 -> 只保留关键图片 -> 关键图片+更小尺寸 -> 跳过
+    # 预测先用本进程的实测值，没有时用延迟模型文件的 k*x+b；两者都没有的候选（包括原批次）不采用，
+    # 因此跳过时记录 skip_reason：'over_budget'（所有候选都预计超时）或 'no_prediction'（有候选缺少预测）
+    def _plan_enforcement(self, valid_ids, size, stage, id_to_crucial, remaining_ms):
+        crucial_ids = [image_id for image_id in valid_ids if id_to_crucial.get(image_id)]
+        smaller_sizes = sorted((s for s in self.models if s < size), reverse=True)
+        candidates = [('run', size, valid_ids)]
+        candidates += [('downsize', s, valid_ids) for s in smaller_sizes]
+        if crucial_ids and len(crucial_ids) < len(valid_ids):
+            candidates.append(('trim', size, crucial_ids))
+            candidates += [('trim_downsize', s, crucial_ids) for s in smaller_sizes]
+
+        decision = {'planned_size': size, 'remaining_ms': round(remaining_ms, 2)}
+        unpredicted = []  # 因为没有延迟预测而没能采用的候选
+        for action, run_size, run_ids in candidates:
+            # 只是试探各个候选，不计入延迟缓存的命中统计
+            predicted = self.latency_cache.predict(run_size, len(run_ids), self._latency_stage(run_size, stage),
+                                                   count=False)
+            if predicted is None:
+                unpredicted.append(f"{action}@{run_size}px")
+            elif predicted <= remaining_ms:
+                kept = set(run_ids)
+                decision.update(action=action, executed_size=run_size, predicted_ms=round(predicted, 2))
+                return decision, run_ids, [image_id for image_id in valid_ids if image_id not in kept]
+        decision.update(action='skip', executed_size=None, predicted_ms=None)
+        if unpredicted:
+            # 有候选可能放得下但没有预测值，跳过是保守的退路而不是确定放不下
+            decision.update(skip_reason='no_prediction', unpredicted=unpredicted)
+        else:
+            decision['skip_reason'] = 'over_budget'
+        return decision, [], list(valid_ids)
+
+    # 按轮并行执行：同一轮的各尺寸批次同时开始，各自在分到的核上运行
+    # 每批的 batch_processing_time_ms 仍是该批自身的耗时，完成时间和截止期按各轮 makespan 的累计计算
+    def _run_concurrent(self, prepared):
+        outcomes = {}
+        cumulative_makespan = 0.0
+        runnable = [item for item in prepared if item['valid_ids']]
+        for round_index, items in enumerate(split_rounds(runnable), start=1):
+            executed = self.round_executor.run_round(items, self.image_folder)
+            if executed is None:
+                # 核数不够分或 worker 进程意外退出：退回到主进程串行执行
+                round_outcomes = {item['batch_index']: self._run_batch(item['valid_ids'], item['size'], item['stage'])
+                                  for item in items}
+                serial_ms = round(sum(outcome['time_ms'] for outcome in round_outcomes.values()), 2)
+                round_info = {'round_makespan_ms': serial_ms, 'round_serial_ms': serial_ms}
+            else:
+                round_outcomes, round_info = executed
+            cumulative_makespan += round_info['round_makespan_ms']
+            print(f"  轮次 {round_index}: {[item['size'] for item in items]}px, "
+                  f"makespan={round_info['round_makespan_ms']:.2f}ms, 串行合计={round_info['round_serial_ms']:.2f}ms")
+            for batch_index, outcome in round_outcomes.items():
+                outcome['info'].update(round_info, round_index=round_index,
+                                       cumulative_makespan_ms=round(cumulative_makespan, 2))
+                outcomes[batch_index] = outcome
+        return outcomes
+
+    # 从一个 JSON 文件中读取一批图像的处理任务
+    def process_json_file(self, json_file_path):
+        plan = self._load_plan(json_file_path)
+        if plan is None:
+            return []
+        batches, deadline_ms = plan
+        prepared = self._prepare_batches(batches)
+        
+        results = []
+        cumulative_time = 0.0  # 累计时间，初始为0（毫秒）
+        serial_time = 0.0  # 各批耗时之和；分核并行时与累计时间（按 makespan）不同
+        missed_deadline_images = []  # 记录错过截止期的图片ID
+        enforcement_counts = {}  # enforce_deadline 模式下各种决定的次数
+
+        precomputed = None
+        if self.enforce_deadline and deadline_ms is not None:
+            # 每批的执行方式取决于前面各批的实际耗时，只能逐批执行
+            if self.round_executor is not None or self.pipeline:
+                print("[!] enforce_deadline 模式下逐批执行，忽略 pipeline/concurrent_rounds")
+        elif self.prediction_store is None or self.measure_timing:
+            if self.round_executor is not None:
+                precomputed = self._run_concurrent(prepared)
+            elif self.pipeline and self.cascade_threshold is None:
+                # 级联时各尺寸的图片在推理过程中按需加载，无法提前预取，逐批执行
+                precomputed = self._run_pipelined(prepared)
+        
+        for item in prepared:
+            batch_index = item['batch_index']
+            size = item['size']
+            image_ids = item['image_ids']
+            valid_ids = item['valid_ids']
+            id_to_crucial = item['id_to_crucial']
+            stage = item['stage']
             
-            batch_count = 0
-            if len(valid_ids) > 0:
-                # 完整批次预热
-                for _ in range(7):
-                    if torch.cuda.is_available():
-                        torch.cuda.synchronize()
-                    warm_tensor, _, _ = self.load_images_batch(valid_ids, size)
-                    if warm_tensor is not None:
-                        with torch.inference_mode():
-                            _ = self.models[size](warm_tensor)
-                        if torch.cuda.is_available():
-                            torch.cuda.synchronize()
-
-                # 正式计时：包含批量加载+预处理+推理（忽略第1次）
-                stabilize_runs = 3
-                measured_times_ms = []
-                pred_ids = []
-                pred_names = []
-                for run_idx in range(stabilize_runs):
-                    if torch.cuda.is_available():
-                        torch.cuda.synchronize()
-                    batch_start_time = time.perf_counter()
-
-                    input_tensor, _, _ = self.load_images_batch(valid_ids, size)
-                    with torch.inference_mode():
-                        pred_ids, pred_names = self.predict_batch(input_tensor, size)
-
-                    if torch.cuda.is_available():
-                        torch.cuda.synchronize()
-                    batch_end_time = time.perf_counter()
-                    measured_times_ms.append((batch_end_time - batch_start_time) * 1000)
-
-                batch_count = len(valid_ids)
-                if len(measured_times_ms) > 1:
-                    batch_processing_time = min(measured_times_ms[1:])
-                else:
-                    batch_processing_time = measured_times_ms[0]
+            stage_desc = f", 出口=阶段{stage}" if normalize_stage(stage) else ""
+            print(f"\n处理批次 {batch_index}: 大小={size}px, 图片数量={len(image_ids)}{stage_desc}")
+            
+            # 先为缺失的图片写入错误结果
+            for missing in item['missing_results']:
+                results.append(missing)
+                print(f"  [X] {missing['image_id']}: 图片文件不存在")
 
-                # 将结果写入
-                for img_id, pid, pname in zip(valid_ids, pred_ids, pred_names):
-                    results.append({
-                        'image_id': img_id,
-                        'size': size,
-                        'predicted_class': pname,
-                        'predicted_class_id': pid,
-                        'crucial': 1 if id_to_crucial.get(img_id, 0) else 0
-                    })
-                    print(f"  [OK] {img_id}: {pname}")
+            enforcement = None
+            dropped_ids = []
+            if precomputed is not None:
+                outcome = precomputed.get(batch_index) or self._run_batch([], size)
+            else:
+                if self.enforce_deadline and deadline_ms is not None and valid_ids:
+                    enforcement, valid_ids, dropped_ids = self._plan_enforcement(
+                        valid_ids, size, stage, id_to_crucial, deadline_ms - cumulative_time)
+                    if enforcement['action'] != 'run':
+                        print(f"  [!] 预计超出截止期: {enforcement['action']} "
+                              f"(剩余 {enforcement['remaining_ms']:.2f}ms, 放弃 {len(dropped_ids)} 张)")
+                    if enforcement.get('skip_reason') == 'no_prediction':
+                        print(f"  [!] 以下候选没有延迟预测，未能采用: {', '.join(enforcement['unpredicted'])}")
+                    size = enforcement['executed_size'] or size
+                outcome = self._run_batch(valid_ids, size, stage)
+            batch_processing_time = outcome['time_ms']
+
+            # 被放弃的图片没有预测结果，计为错过截止期
+            for img_id in dropped_ids:
+                results.append({
+                    'image_id': img_id,
+                    'size': item['size'],
+                    'predicted_class': None,
+                    'predicted_class_id': None,
+                    'skipped': True,
+                    'error': '预计超出截止期，未执行',
+                    'crucial': 1 if id_to_crucial.get(img_id, 0) else 0
+                })
+            missed_deadline_images.extend(dropped_ids)
+
+            # 将结果写入（动态退出的结果与退出阶段有关，不写入预测库）
+            store = self.prediction_store if outcome['extras'] is None else None
+            precision = self._store_precision(size) if store is not None and valid_ids else None
+            extras = outcome['extras'] or [None] * len(valid_ids)
+            for img_id, pid, pname, extra in zip(valid_ids, outcome['pred_ids'], outcome['pred_names'], extras):
+                if store is not None and outcome['info'].get('timed', True):
+                    store.put(os.path.join(self.image_folder, f"{img_id}.jpg"), self.model_hashes[size], size, pid, pname,
+                              stage, precision)
+                result = {
+                    'image_id': img_id,
+                    'size': size,
+                    'predicted_class': pname,
+                    'predicted_class_id': pid,
+                    'crucial': 1 if id_to_crucial.get(img_id, 0) else 0
+                }
+                if extra is not None:
+                    result.update(extra)
+                results.append(result)
+                print(f"  [OK] {img_id}: {pname}")
+            serial_time += batch_processing_time
+            if 'cumulative_makespan_ms' in outcome['info']:
+                # 分核并行：同一轮的批次同时开始，本批的完成时间取到本轮结束为止的 makespan 累计
+                cumulative_time = outcome['info']['cumulative_makespan_ms']
             else:
-                # 如果没有有效图片，设置时间为0
-                batch_start_time = time.perf_counter()
-                batch_end_time = batch_start_time
-            batch_processing_time = (batch_end_time - batch_start_time) * 1000  # 转换为毫秒
-            cumulative_time += batch_processing_time
+                cumulative_time += batch_processing_time
             
             # 判断是否错过deadline（以批次结束时间为所有图片完成时间）
             if deadline_ms is not None and cumulative_time > deadline_ms and len(valid_ids) > 0:
@@ -264,31 +886,77 @@ class SimpleInference:
             # 添加批次时间信息到结果中
             batch_time_info = {
                 'batch_info': {
-                    'batch_index': batch_idx + 1,
+                    'batch_index': batch_index,
                     'size': size,
                     'image_count': len(image_ids),
+                    'executed_images': len(valid_ids),
+                    'exit_stage': normalize_stage(stage) or 4,
                     'batch_processing_time_ms': round(batch_processing_time, 2),
                     'cumulative_time_ms': round(cumulative_time, 2)
                 }
             }
+            if outcome['extras'] and 'escalation_depth' in outcome['extras'][0]:
+                # 分辨率级联：各最终尺寸的图片数、平均升级次数、相对直接跑计划尺寸省下的计算量
+                depths = [extra['escalation_depth'] for extra in outcome['extras']]
+                final_sizes = {}
+                for extra in outcome['extras']:
+                    final_sizes[str(extra['cascade_size'])] = final_sizes.get(str(extra['cascade_size']), 0) + 1
+                ratios = [extra['compute_ratio'] for extra in outcome['extras']]
+                batch_time_info['batch_info']['cascade'] = True
+                batch_time_info['batch_info']['mean_escalation_depth'] = round(sum(depths) / len(depths), 2)
+                batch_time_info['batch_info']['final_size_counts'] = final_sizes
+                batch_time_info['batch_info']['compute_saved_ratio'] = round(1 - sum(ratios) / len(ratios), 4)
+            elif outcome['extras']:
+                # 动态退出：exit_stage 记录本批用到的最深出口，另给出平均退出阶段
+                exit_stages = [extra['exit_stage'] for extra in outcome['extras']]
+                batch_time_info['batch_info']['exit_stage'] = max(exit_stages)
+                batch_time_info['batch_info']['dynamic_exit'] = True
+                batch_time_info['batch_info']['mean_exit_stage'] = round(sum(exit_stages) / len(exit_stages), 2)
+            batch_time_info['batch_info'].update(outcome['info'])
+            if 'cumulative_makespan_ms' in outcome['info']:
+                batch_time_info['batch_info']['cumulative_serial_ms'] = round(serial_time, 2)
+            if enforcement is not None:
+                batch_time_info['batch_info']['enforcement'] = enforcement
+                enforcement_counts[enforcement['action']] = enforcement_counts.get(enforcement['action'], 0) + 1
             results.append(batch_time_info)
             
-            print(f"  批次 {batch_idx + 1} 完成: 处理时间={batch_processing_time:.2f}ms, 累计时间={cumulative_time:.2f}ms")
+            print(f"  批次 {batch_index} 完成: 处理时间={batch_processing_time:.2f}ms, 累计时间={cumulative_time:.2f}ms")
         
         if deadline_ms is not None:
-            deadline_seconds = deadline_ms / 1000.0
             results.append({
-                'deadline': round(deadline_seconds, 2),
+                'deadline': round(deadline_ms / TIME_UNIT_MS, 2),  # 与调度结果中的值相同（调度器时间单位）
+                'deadline_ms': round(deadline_ms, 2),
                 'missed_deadline_images': missed_deadline_images
             })
+            if self.enforce_deadline:
+                results[-1]['enforcement'] = enforcement_counts
         else:
             results.append({
                 'deadline': None,
                 'missed_deadline_images': missed_deadline_images
             })
+
+        if self.prediction_store is not None:
+            self.prediction_store.save()
+
+        if self.round_executor is not None and precomputed:
+            print(f"并行执行: 总 makespan={cumulative_time:.2f}ms, 串行累计={serial_time:.2f}ms")
+
+        if self.tensor_cache is not None:
+            stats = self.tensor_cache.stats()
+            print(f"张量缓存: 命中={stats['hits']}, 未命中={stats['misses']}, 淘汰={stats['evictions']}, "
+                  f"占用={stats['bytes'] / 1024 / 1024:.1f}MB")
         
         return results
 
+    def close(self):
+        if self.round_executor is not None:
+            self.round_executor.close()
+            self.round_executor = None
+        if self.decode_pool is not None:
+            self.decode_pool.close()
+            self.decode_pool = None
+
     def save_results(self, results, output_file_path):
         try:
             with open(output_file_path, 'w', encoding='utf-8') as f:
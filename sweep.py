@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import hashlib
+import time
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from experiment import SCHEDULER_SPECS, ensure_executables, run_scheduler, generate_summary, cost_model_path
+from prediction_cache import file_sha256
+
+# 配置：扫描矩阵 = DDL × 调度程序 × 任务编号
+DDLS = [10, 15, 20, 25, 30, 35, 40, 45, 50]
+SCHEDULER_NAMES = ['main', 'fifo', 'fifo_batch', 'cf_batch', 'resizing']  # 见 experiment.SCHEDULER_SPECS
+TASK_INDICES = range(1, 201)
+TASK_ROOT = "tasks"  # tasks/task_files_ddlXX/tasks_N.csv
+RESULT_ROOT = "result_with_fifo_edf"  # result_with_fifo_edf/result_list_ddlXX/result_N/<算法>_result.json
+STATE_NAME = "sweep_state.json"  # 放在 RESULT_ROOT 下，记录已完成的格子，用于断点续跑
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+SAVE_EVERY = 50  # 每完成多少个格子保存一次状态
+
+
+def task_file_for(ddl, task_index, task_root=TASK_ROOT):
+    return os.path.join(task_root, f"task_files_ddl{ddl}", f"tasks_{task_index}.csv")
+
+
+def result_folder_for(ddl, task_index, result_root=RESULT_ROOT):
+    return os.path.join(result_root, f"result_list_ddl{ddl}", f"result_{task_index}")
+
+
+def local_includes(source, seen=None):
+    """source 及其（递归）引用的本地头文件（#include "..."）；不存在的文件（如尚未生成的 accuracy_table.h）也包含在内"""
+    seen = set() if seen is None else seen
+    if source in seen:
+        return seen
+    seen.add(source)
+    if not os.path.exists(source):
+        return seen
+    with open(source, 'r', encoding='utf-8', errors='replace') as f:
+        for header in re.findall(r'^\s*#\s*include\s+"([^"]+)"', f.read(), re.MULTILINE):
+            local_includes(os.path.join(os.path.dirname(source), header), seen)
+    return seen
+
+
+def source_hash(source):
+    """调度器源文件连同 cost_model.h、accuracy_table.h 等本地头文件的哈希，任何一个变化都要重跑"""
+    h = hashlib.sha256()
+    for path in sorted(local_includes(source)):
+        digest = file_sha256(path) if os.path.exists(path) else 'missing'
+        h.update(f"{path}:{digest}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def cell_key(ddl, name, task_index):
+    return f"ddl{ddl}/{name}/{task_index}"
+
+
+def build_matrix(ddls, scheduler_names, task_indices, task_root=TASK_ROOT):
+    """返回所有任务文件存在的格子 [(ddl, 算法名, 任务编号)]，缺失的任务文件只报告一次"""
+    cells = []
+    for ddl in ddls:
+        missing = 0
+        for task_index in task_indices:
+            if not os.path.exists(task_file_for(ddl, task_index, task_root)):
+                missing += 1
+                continue
+            cells.extend((ddl, name, task_index) for name in scheduler_names)
+        if missing:
+            print(f"[!] ddl{ddl}: {missing} 个任务文件不存在，已跳过")
+    return cells
+
+
+class SweepState:
+    """
+    断点续跑的状态：每个完成的格子记录任务文件、调度器源文件（含本地头文件）和代价表的哈希
+
+    三者都未变化且结果文件还在时跳过该格子；任何一个变化都会重跑。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cells = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.cells = json.load(f).get('cells', {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[!] 状态文件无法读取，从头开始: {path} ({e})")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'cells': self.cells},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, key, fingerprint, result_path):
+        return self.cells.get(key, {}).get('fingerprint') == fingerprint and os.path.exists(result_path)
+
+    def record(self, key, fingerprint):
+        self.cells[key] = {'fingerprint': fingerprint, 'finished_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def run_cell(ddl, name, task_index, task_root=TASK_ROOT, result_root=RESULT_ROOT):
+    """
+    在进程池中运行一个格子：一个调度程序处理一个任务文件，输出直接写入 result_N
+
+    临时工作目录建在结果树内，移动结果文件是同一文件系统上的重命名，中断时不会留下写了一半的结果。
+    """
+    scheduler = SCHEDULER_SPECS[name]
+    lines = []
+    log = lambda message="": lines.append(str(message))
+    result_folder = result_folder_for(ddl, task_index, result_root)
+    os.makedirs(result_folder, exist_ok=True)
+    # 上一次运行留下的丢失任务文件在本次没有丢失时不会被覆盖，先删掉
+    if scheduler['missed_name']:
+        stale = os.path.join(result_folder, scheduler['missed_name'])
+        if os.path.exists(stale):
+            os.remove(stale)
+    scratch_dir = tempfile.mkdtemp(prefix=f".sweep_{name}_{task_index}_", dir=os.path.dirname(result_folder))
+    try:
+        ok = run_scheduler(f"ddl{ddl} #{task_index}", scheduler, task_file_for(ddl, task_index, task_root),
+                           result_folder, scratch_dir, log)
+    except Exception as e:
+        log(f"[X] 运行出错: {e}")
+        ok = False
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    return (ddl, name, task_index), ok, "\n".join(lines)
+
+
+def run_sweep(ddls=DDLS, scheduler_names=SCHEDULER_NAMES, task_indices=TASK_INDICES, task_root=TASK_ROOT,
+              result_root=RESULT_ROOT, max_workers=MAX_WORKERS, resume=True, verbose=False):
+    """
+    运行整个扫描矩阵并为涉及到的每个 DDL 生成 experiment_summary.json
+
+    Args:
+        resume: True 时跳过状态文件中已完成且输入未变化的格子
+        verbose: 是否打印每个格子的完整输出（默认只打印进度和失败的格子）
+
+    Returns:
+        {'total': n, 'skipped': n, 'succeeded': n, 'failed': n}
+    """
+    unknown = [name for name in scheduler_names if name not in SCHEDULER_SPECS]
+    if unknown:
+        raise ValueError(f"未知的调度程序: {unknown}，可选: {list(SCHEDULER_SPECS)}")
+    schedulers = [SCHEDULER_SPECS[name] for name in scheduler_names]
+    if not ensure_executables(schedulers):
+        print("[X] 编译失败，退出")
+        return None
+
+    # 调度器输出只取决于任务文件、调度器源码（含头文件）和代价表
+    source_hashes = {name: source_hash(SCHEDULER_SPECS[name]['source']) for name in scheduler_names}
+    # 代价表按调度器的规则定位（experiment.cost_model_path），变化时所有格子重跑
+    cost_path = cost_model_path()
+    cost_hash = file_sha256(cost_path) if os.path.exists(cost_path) else 'none'
+
+    cells = build_matrix(ddls, scheduler_names, task_indices, task_root)
+    state = SweepState(os.path.join(result_root, STATE_NAME))
+    pending, fingerprints = [], {}
+    for ddl, name, task_index in cells:
+        key = cell_key(ddl, name, task_index)
+        fingerprint = f"{file_sha256(task_file_for(ddl, task_index, task_root))}:{source_hashes[name]}:{cost_hash}"
+        fingerprints[key] = fingerprint
+        result_path = os.path.join(result_folder_for(ddl, task_index, result_root),
+                                   SCHEDULER_SPECS[name]['result_name'])
+        if resume and state.is_done(key, fingerprint, result_path):
+            continue
+        pending.append((ddl, name, task_index))
+
+    counts = {'total': len(cells), 'skipped': len(cells) - len(pending), 'succeeded': 0, 'failed': 0}
+    print(f"扫描矩阵: {len(ddls)} 个DDL × {len(scheduler_names)} 个调度程序, 共 {len(cells)} 个格子，"
+          f"已完成 {counts['skipped']} 个，待运行 {len(pending)} 个 (最多 {max_workers} 个进程)")
+
+    start_time = time.time()
+    done = 0
+    with ProcessPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(run_cell, ddl, name, task_index, task_root, result_root)
+                   for ddl, name, task_index in pending]
+        for future in as_completed(futures):
+            try:
+                (ddl, name, task_index), ok, output = future.result()
+            except Exception as e:
+                print(f"[X] 格子进程出错: {e}")
+                counts['failed'] += 1
+                continue
+            done += 1
+            key = cell_key(ddl, name, task_index)
+            if ok:
+                counts['succeeded'] += 1
+                state.record(key, fingerprints[key])
+            else:
+                counts['failed'] += 1
+            if verbose or not ok:
+                print(output)
+            print(f"[{done}/{len(pending)}] {'[OK]' if ok else '[X]'} {key}")
+            if done % SAVE_EVERY == 0:
+                state.save()
+    state.save()
+
+    # 汇总报告沿用 experiment.generate_summary 的格式，每个 DDL 一份，包含本次扫描的全部调度程序
+    num_experiments = max(task_indices) if len(task_indices) else 0
+    for ddl in ddls:
+        result_dir = os.path.join(result_root, f"result_list_ddl{ddl}")
+        if os.path.isdir(result_dir) and num_experiments:
+            generate_summary(result_dir, num_experiments, schedulers)
+
+    print(f"\n{'='*60}")
+    print(f"扫描完成 (耗时: {time.time() - start_time:.2f}秒)")
+    print(f"格子总数: {counts['total']}")
+    print(f"跳过(已完成): {counts['skipped']}")
+    print(f"成功: {counts['succeeded']}")
+    print(f"失败: {counts['failed']}")
+    print(f"{'='*60}\n")
+    return counts
+
+
+def main():
+    run_sweep(DDLS, SCHEDULER_NAMES, TASK_INDICES, max_workers=MAX_WORKERS, resume=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class TensorCache:
+    """
+    预处理后图片张量的进程内 LRU 缓存（按字节预算淘汰）
+
+    键为 (图片绝对路径, 目标尺寸, 文件mtime)，图片被修改后旧条目自然失效。
+    缓存中只存放 CPU 张量，调用方负责 stack 之后再搬到 device。
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(image_path, size):
+        return (os.path.abspath(image_path), size, os.stat(image_path).st_mtime_ns)
+
+    @staticmethod
+    def tensor_bytes(tensor):
+        return tensor.element_size() * tensor.nelement()
+
+    def get(self, key):
+        with self._lock:
+            tensor = self._entries.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tensor
+
+    def put(self, key, tensor):
+        nbytes = self.tensor_bytes(tensor)
+        # 单个张量超过预算时直接不缓存
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= self.tensor_bytes(old)
+            self._entries[key] = tensor
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= self.tensor_bytes(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
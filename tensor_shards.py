@@ -0,0 +1,179 @@
+import os
+import json
+import time
+from pathlib import Path
+
+import torch
+
+from preprocess import load_image_tensor
+
+# 配置
+IMAGE_ROOT = "images_cropped"  # 原始图片根目录（下含 cropped_N）
+SHARD_ROOT = "images_shards"  # 分片输出目录
+SHARD_SIZES = [64, 128, 256, 512]  # 需要预先生成的目标尺寸
+PACK_MODE = "folder"  # 'folder': 每个 cropped_N 一组分片；'dataset': 整个数据集一组分片
+DATASET_SHARD_NAME = "_all"  # 整库模式下分片所在的子目录名
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+
+def shard_file_name(size):
+    return f"shard_{size}.f32"
+
+
+def _list_images(image_folder):
+    return sorted(p for p in Path(image_folder).iterdir() if p.suffix == '.jpg')
+
+
+def _write_shard(out_dir, size, image_paths):
+    """把一组图片预处理后按行写入一个 float32 原始文件（[N, 3, size, size]）"""
+    shard_path = os.path.join(out_dir, shard_file_name(size))
+    row_numel = 3 * size * size
+    numel = row_numel * len(image_paths)
+    # 先把文件扩到目标长度，再以共享方式映射，写入的数据直接落盘
+    with open(shard_path, 'wb') as f:
+        f.truncate(numel * 4)
+    shard = torch.from_file(shard_path, shared=True, size=numel, dtype=torch.float32)
+    shard = shard.view(len(image_paths), 3, size, size)
+    for row, image_path in enumerate(image_paths):
+        shard[row].copy_(load_image_tensor(str(image_path), size))
+    del shard
+    return {'file': shard_file_name(size), 'shape': [len(image_paths), 3, size, size]}
+
+
+def _pack(out_dir, entries, sizes):
+    """entries: [(分片内的图片ID, 图片路径)]"""
+    os.makedirs(out_dir, exist_ok=True)
+    index = {
+        'version': INDEX_VERSION,
+        'ids': [image_id for image_id, _ in entries],
+        'mtimes': {image_id: os.stat(path).st_mtime_ns for image_id, path in entries},
+        'sizes': {}
+    }
+    image_paths = [path for _, path in entries]
+    for size in sizes:
+        index['sizes'][str(size)] = _write_shard(out_dir, size, image_paths)
+    # 索引最后写，保证读到索引时分片已经完整
+    with open(os.path.join(out_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return len(entries)
+
+
+def pack_folder(image_folder, shard_root=SHARD_ROOT, sizes=SHARD_SIZES):
+    entries = [(p.stem, p) for p in _list_images(image_folder)]
+    out_dir = os.path.join(shard_root, Path(image_folder).name)
+    return _pack(out_dir, entries, sizes)
+
+
+def pack_dataset(image_root=IMAGE_ROOT, shard_root=SHARD_ROOT, sizes=SHARD_SIZES):
+    # 整库模式下ID带上文件夹前缀，如 cropped_12/64_3_car
+    entries = []
+    for folder in sorted(p for p in Path(image_root).iterdir() if p.is_dir()):
+        entries.extend((f"{folder.name}/{p.stem}", p) for p in _list_images(folder))
+    out_dir = os.path.join(shard_root, DATASET_SHARD_NAME)
+    return _pack(out_dir, entries, sizes)
+
+
+class _Shard:
+    def __init__(self, shard_dir, index):
+        self.shard_dir = shard_dir
+        self.ids = index['ids']
+        self.mtimes = index['mtimes']
+        self.sizes = index['sizes']
+        self.rows = {image_id: row for row, image_id in enumerate(self.ids)}
+        self._arrays = {}
+
+    def array(self, size):
+        arr = self._arrays.get(size)
+        if arr is None:
+            meta = self.sizes.get(str(size))
+            if meta is None:
+                return None
+            shape = meta['shape']
+            numel = shape[0] * shape[1] * shape[2] * shape[3]
+            # shared=False 为私有只读映射，按需分页，不会把整个文件读进内存
+            arr = torch.from_file(os.path.join(self.shard_dir, meta['file']), shared=False,
+                                  size=numel, dtype=torch.float32).view(*shape)
+            self._arrays[size] = arr
+        return arr
+
+
+class ShardStore:
+    """
+    读取 tensor_shards 打包出的内存映射分片
+
+    lookup 返回 (分片数组, {图片ID: 行号})；分片里没有或已过期（mtime 变化）的图片不在映射中，
+    调用方应回退到正常解码。
+    """
+
+    def __init__(self, shard_root=SHARD_ROOT):
+        self.shard_root = shard_root
+        self._shards = {}
+        self._row_maps = {}
+
+    def _open(self, name):
+        if name not in self._shards:
+            shard_dir = os.path.join(self.shard_root, name)
+            index_path = os.path.join(shard_dir, INDEX_FILE)
+            shard = None
+            if os.path.exists(index_path):
+                try:
+                    with open(index_path, 'r', encoding='utf-8') as f:
+                        index = json.load(f)
+                    if index.get('version') == INDEX_VERSION:
+                        shard = _Shard(shard_dir, index)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"[!] 分片索引读取失败: {index_path} ({e})")
+            self._shards[name] = shard
+        return self._shards[name]
+
+    def _build_row_map(self, image_folder, shard, prefix):
+        # 每个文件夹只在第一次使用时校验一次 mtime
+        row_map = {}
+        for path in _list_images(image_folder):
+            key = f"{prefix}{path.stem}"
+            row = shard.rows.get(key)
+            if row is not None and shard.mtimes.get(key) == os.stat(path).st_mtime_ns:
+                row_map[path.stem] = row
+        return row_map
+
+    def lookup(self, image_folder, size):
+        folder_name = Path(image_folder).name
+        cache_key = (os.path.abspath(image_folder), size)
+        if cache_key in self._row_maps:
+            return self._row_maps[cache_key]
+        found = None
+        if os.path.isdir(image_folder):
+            for name, prefix in ((folder_name, ''), (DATASET_SHARD_NAME, f"{folder_name}/")):
+                shard = self._open(name)
+                if shard is None:
+                    continue
+                arr = shard.array(size)
+                if arr is None:
+                    continue
+                row_map = self._build_row_map(image_folder, shard, prefix)
+                if row_map:
+                    found = (arr, row_map)
+                    break
+        self._row_maps[cache_key] = found
+        return found
+
+
+def main():
+    start = time.time()
+    if PACK_MODE == 'dataset':
+        count = pack_dataset(IMAGE_ROOT, SHARD_ROOT, SHARD_SIZES)
+        print(f"[OK] 已打包整个数据集: {count} 张图片 -> {os.path.join(SHARD_ROOT, DATASET_SHARD_NAME)}")
+    else:
+        folders = sorted(p for p in Path(IMAGE_ROOT).iterdir() if p.is_dir())
+        total = 0
+        for idx, folder in enumerate(folders, 1):
+            count = pack_folder(str(folder), SHARD_ROOT, SHARD_SIZES)
+            total += count
+            print(f"[{idx}/{len(folders)}] {folder.name}: {count} 张图片")
+        print(f"[OK] 已打包 {len(folders)} 个文件夹，共 {total} 张图片 -> {SHARD_ROOT}")
+    print(f"耗时: {time.time() - start:.2f}秒")
+
+
+if __name__ == '__main__':
+    main()
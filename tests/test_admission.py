@@ -0,0 +1,53 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from latency_model import LatencyCache
+from inference_server import DynamicBatcher, _Request
+
+
+@pytest.fixture
+def batcher_for():
+    batchers = []
+
+    def make(latency_cache):
+        batcher = DynamicBatcher(SimpleNamespace(latency_cache=latency_cache))
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+
+def _request(size=128, count=8, deadline_ms=10.0, stage=None):
+    return _Request("folder", [f"img_{i}" for i in range(count)], size, stage, deadline_ms=deadline_ms)
+
+
+def test_unpredicted_request_does_not_fit(batcher_for):
+    batcher = batcher_for(LatencyCache())
+    assert not batcher._fits(_request(), None)
+
+
+def test_profile_is_used_for_admission(batcher_for, tmp_path):
+    profile_path = tmp_path / "latency_profile.json"
+    profile_path.write_text(json.dumps({'models': {'128': {'4': {'k_ms': 2.0, 'b_ms': 1.0}}}}))
+    batcher = batcher_for(LatencyCache(str(profile_path)))
+    assert not batcher._fits(_request(deadline_ms=10.0), None)  # 预计 17ms
+    assert batcher._fits(_request(deadline_ms=1000.0), None)
+
+
+def test_measured_shapes_bound_unmeasured_ones(batcher_for):
+    latency_cache = LatencyCache()
+    latency_cache.put(128, 8, 4, 5.0)
+    batcher = batcher_for(latency_cache)
+    # 更小的批次、更早的出口都不会比实测的 8 张完整网络更慢
+    assert batcher._predict_ms(128, 4, 2) == pytest.approx(5.0)
+    # 更大的批次按比例放大：16 张的上界为 10ms
+    assert batcher._predict_ms(128, 16, None) == pytest.approx(10.0)
+    assert batcher._predict_ms(256, 8, None) is None
+    # 试探查询不计入命中统计
+    assert latency_cache.stats()['hits'] == 0 and latency_cache.stats()['misses'] == 0
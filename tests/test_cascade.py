@@ -0,0 +1,38 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from simple_inference import SimpleInference
+
+
+def _cascade_inference(cascade_threshold):
+    inference = object.__new__(SimpleInference)
+    inference.models = {64: None, 128: None, 256: None, 512: None}
+    inference.num_classes = 7
+    inference.cascade_threshold = cascade_threshold
+    inference._image_macs = {}
+    inference._macs_reference = None
+    return inference
+
+
+def test_levels_without_threshold_are_skipped():
+    inference = _cascade_inference({64: 0.9, 256: 0.8})
+    # 128 没有阈值：跳过而不是在 128 上把所有图片定下来
+    assert inference._cascade_levels(512) == [64, 256, 512]
+    assert inference._cascade_levels(128) == [64, 128]
+    assert inference.uses_cascade(512, None)
+
+
+def test_no_cascade_without_lower_thresholds():
+    inference = _cascade_inference({512: 0.9})
+    assert inference._cascade_levels(512) == [512]
+    assert not inference.uses_cascade(512, None)
+
+
+def test_image_macs_use_one_measure_for_all_levels():
+    inference = _cascade_inference(0.9)
+    macs = [inference.image_macs(size) for size in (64, 128, 256, 512)]
+    # 同一结构下计算量随像素数增长（卷积部分与像素数成正比，出口头的全连接层不变）
+    assert macs == sorted(macs)
+    assert macs[1] / macs[0] == pytest.approx(4.0, rel=0.05)
+    assert inference.models == {64: None, 128: None, 256: None, 512: None}
@@ -0,0 +1,44 @@
+import os
+import time
+import multiprocessing
+
+import pytest
+
+from concurrent_rounds import RoundExecutor, WorkerLost
+
+
+def _killed_worker():
+    """启动一个不回复任何命令的进程再杀掉，模拟崩溃的 worker"""
+    context = multiprocessing.get_context('fork')
+    parent_conn, child_conn = context.Pipe()
+    process = context.Process(target=time.sleep, args=(60,), daemon=True)
+    process.start()
+    child_conn.close()
+    process.kill()
+    process.join()
+    return process, parent_conn
+
+
+def _items():
+    return [{'batch_index': 0, 'size': 64, 'stage': None, 'valid_ids': ['a', 'b']},
+            {'batch_index': 1, 'size': 128, 'stage': None, 'valid_ids': ['c']}]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="需要 fork")
+def test_gather_raises_worker_lost_for_killed_worker():
+    worker = _killed_worker()
+    with pytest.raises(WorkerLost):
+        RoundExecutor._gather([worker])
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="需要 fork")
+def test_killed_worker_marks_executor_dead_and_falls_back():
+    executor = RoundExecutor({}, cores=[0, 1])
+    executor._workers = {64: _killed_worker(), 128: _killed_worker()}
+    # run_round 返回 None 时 SimpleInference._run_concurrent 串行执行这一轮
+    assert executor.run_round(_items(), "images") is None
+    assert executor.dead
+    assert executor._workers == {}
+    # 之后的轮次不再尝试启动 worker
+    assert executor.run_round(_items(), "images") is None
+    executor.close()
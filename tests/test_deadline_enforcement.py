@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from latency_model import LatencyCache
+from simple_inference import SimpleInference
+
+# 延迟模型（毫秒）：64px 每张 0.5 + 0.5，128px 每张 2 + 1
+PROFILE = {'models': {'64': {'4': {'k_ms': 0.5, 'b_ms': 0.5}},
+                      '128': {'4': {'k_ms': 2.0, 'b_ms': 1.0}}}}
+IMAGE_IDS = [f"img_{i}" for i in range(8)]
+CRUCIAL = {"img_0": 1, "img_1": 1}
+
+
+def _inference(tmp_path, profile=PROFILE):
+    """不加载模型的最小实例，只用于调用 _load_plan / _plan_enforcement"""
+    profile_path = tmp_path / "latency_profile.json"
+    profile_path.write_text(json.dumps(profile))
+    inference = object.__new__(SimpleInference)
+    inference.models = {64: None, 128: None}
+    inference.exit_thresholds = None
+    inference.cascade_threshold = None
+    inference.latency_cache = LatencyCache(str(profile_path))
+    return inference
+
+
+def _plan_deadline_ms(inference, tmp_path, deadline):
+    plan_path = tmp_path / "plan.json"
+    images = [{"id": image_id, "crucial": CRUCIAL.get(image_id, 0)} for image_id in IMAGE_IDS]
+    plan_path.write_text(json.dumps([{"size": 128, "images": images}, {"deadline": deadline}]))
+    _, deadline_ms = inference._load_plan(str(plan_path))
+    return deadline_ms
+
+
+def test_enforcement_downsizes_when_planned_size_misses_deadline(tmp_path):
+    inference = _inference(tmp_path)
+    # ddl10：128px 预计 17ms 放不下，64px 预计 4.5ms 放得下
+    deadline_ms = _plan_deadline_ms(inference, tmp_path, 10)
+    decision, run_ids, dropped = inference._plan_enforcement(IMAGE_IDS, 128, None, CRUCIAL, deadline_ms)
+    assert decision['action'] == 'downsize'
+    assert decision['executed_size'] == 64
+    assert decision['predicted_ms'] == pytest.approx(4.5)
+    assert run_ids == IMAGE_IDS and dropped == []
+
+
+def test_enforcement_drops_non_crucial_images(tmp_path):
+    inference = _inference(tmp_path)
+    deadline_ms = _plan_deadline_ms(inference, tmp_path, 3)
+    decision, run_ids, dropped = inference._plan_enforcement(IMAGE_IDS, 128, None, CRUCIAL, deadline_ms)
+    assert decision['action'] == 'trim_downsize'
+    assert run_ids == ["img_0", "img_1"]
+    assert sorted(dropped) == IMAGE_IDS[2:]
+
+
+def test_enforcement_does_not_run_unpredicted_batch(tmp_path):
+    # 延迟模型里没有 128px，原批次不能不经检查就执行
+    inference = _inference(tmp_path, {'models': {'64': PROFILE['models']['64']}})
+    deadline_ms = _plan_deadline_ms(inference, tmp_path, 1)
+    decision, run_ids, dropped = inference._plan_enforcement(IMAGE_IDS, 128, None, CRUCIAL, deadline_ms)
+    assert decision['action'] == 'skip'
+    assert decision['skip_reason'] == 'no_prediction'
+    assert "run@128px" in decision['unpredicted']
+    assert run_ids == [] and dropped == IMAGE_IDS
+
+
+def test_enforce_deadline_requires_latency_profile(tmp_path):
+    with pytest.raises(ValueError):
+        SimpleInference({}, str(tmp_path), enforce_deadline=True,
+                        latency_profile=str(tmp_path / "missing_profile.json"))
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+
+from batch_process_all_results import batch_process_folder, timing_config
+from result_manifest import MANIFEST_NAME
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    result_dir = tmp_path / "result_1"
+    result_dir.mkdir()
+    (result_dir / "main_result.json").write_text(json.dumps([{"deadline": 10.0}]))
+    model_path = tmp_path / "model_64.pth"
+    model_path.write_bytes(b"checkpoint")
+
+    summary = batch_process_folder(str(tmp_path), {64: str(model_path)}, algorithms=['main'], dry_run=True)
+    assert summary['pending'] == [str(result_dir / "main_time.json")]
+    assert not (tmp_path / MANIFEST_NAME).exists()
+    assert sorted(p.name for p in result_dir.iterdir()) == ["main_result.json"]
+
+
+def test_worker_counts_only_fingerprint_timed_runs():
+    timed = timing_config({'measure_timing': True}, 1)
+    assert 'num_workers' in timed and 'threads_per_worker' in timed
+    untimed = timing_config({'measure_timing': False, 'prediction_store': 'store.json'}, 4)
+    assert 'num_workers' not in untimed and 'threads_per_worker' not in untimed
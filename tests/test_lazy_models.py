@@ -0,0 +1,32 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from simple_inference import SimpleInference
+
+
+def _lazy_inference(tmp_path, exit_thresholds):
+    """只建立懒加载注册表、不加载任何模型的最小实例"""
+    model_paths = {}
+    for size in (64, 128):
+        path = tmp_path / f"model_{size}.pth"
+        path.write_bytes(b"checkpoint")  # 不是 TorchScript 归档
+        model_paths[size] = str(path)
+    inference = object.__new__(SimpleInference)
+    inference.device = torch.device('cpu')
+    inference.model_hashes = {}
+    inference._needs_hash = False
+    inference._eager_sizes = set()
+    inference.exit_thresholds = SimpleInference._parse_exit_thresholds(exit_thresholds)
+    inference.models = inference._lazy_registry(model_paths, 7, None, 0)
+    return inference
+
+
+def test_uses_dynamic_exit_does_not_load_models(tmp_path):
+    inference = _lazy_inference(tmp_path, {64: [0.9, 0.9, 0.9]})
+    assert inference.uses_dynamic_exit(64, None)
+    assert not inference.uses_dynamic_exit(64, 2)
+    assert not inference.uses_dynamic_exit(128, None)  # 没有配置阈值
+    assert not inference.uses_dynamic_exit(256, None)  # 没有该尺寸的模型
+    assert inference.models.loads == 0
+    assert inference.models.resident_sizes() == []
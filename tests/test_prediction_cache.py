@@ -0,0 +1,21 @@
+from prediction_cache import PredictionStore
+
+
+def test_keys_separate_precisions(tmp_path):
+    image_path = tmp_path / "img.jpg"
+    image_path.write_bytes(b"jpeg")
+    store = PredictionStore(str(tmp_path / "store.json"))
+    store.put(str(image_path), "model", 128, 1, "bicycle")
+    store.put(str(image_path), "model", 128, 2, "car", precision='bf16')
+
+    assert store.get(str(image_path), "model", 128)['predicted_class_id'] == 1
+    assert store.get(str(image_path), "model", 128, precision='fp32')['predicted_class_id'] == 1
+    assert store.get(str(image_path), "model", 128, precision='bf16')['predicted_class_id'] == 2
+    assert store.get(str(image_path), "model", 128, precision='fp16') is None
+
+
+def test_fp32_full_network_key_is_unchanged():
+    # 旧的预测库文件仍然可以命中
+    assert PredictionStore.make_key("img", "model", 64) == "img:model:64"
+    assert PredictionStore.make_key("img", "model", 64, 4, 'fp32') == "img:model:64"
+    assert PredictionStore.make_key("img", "model", 64, 2, 'fp16') == "img:model:64:s2:fp16"
@@ -0,0 +1,48 @@
+import json
+
+from experiment import SCHEDULER_SPECS, SCHEDULERS, cost_model_path, generate_summary
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_cost_model_path_follows_environment(monkeypatch, tmp_path):
+    monkeypatch.delenv('COST_MODEL_FILE', raising=False)
+    assert cost_model_path() == "cost_model.txt"
+    monkeypatch.setenv('COST_MODEL_FILE', "")
+    assert cost_model_path() == "cost_model.txt"  # 与 cost_model.h 一样，空值视为未设置
+    monkeypatch.setenv('COST_MODEL_FILE', str(tmp_path / "custom.txt"))
+    assert cost_model_path() == str(tmp_path / "custom.txt")
+
+
+def test_summary_covers_every_scheduler(tmp_path):
+    folder = tmp_path / "result_1"
+    folder.mkdir()
+    batch = [{"size": 64, "images": [{"id": "a"}, {"id": "b"}]}, {"deadline": 10.0}]
+    _write(folder / "main_result.json", batch)
+    _write(folder / "main_missed_tasks.json", {"missed_tasks": 3, "missed_crucial": 1})
+    _write(folder / "fifo_batch_result.json", batch)
+    _write(folder / "resizing_result.json", [-1])
+    (folder / "fifo_result.json").write_text("")  # 写了一半的结果不影响其它调度程序的统计
+
+    generate_summary(str(tmp_path), 1, list(SCHEDULER_SPECS.values()))
+    with open(tmp_path / "experiment_summary.json", encoding='utf-8') as f:
+        exp = json.load(f)["experiments"][0]
+
+    assert exp["main_task_count"] == 2
+    assert exp["main_missed_count"] == 3 and exp["main_missed_crucial"] == 1
+    assert exp["fifo_batch_status"] == "OK"
+    assert exp["resizing_status"] == "无法调度" and not exp["resizing_missed_exists"]
+    assert exp["fifo_result_exists"] and "fifo_status" not in exp
+    assert not exp["cf_batch_result_exists"]
+
+
+def test_default_summary_keeps_experiment_schedulers(tmp_path):
+    (tmp_path / "result_1").mkdir()
+    generate_summary(str(tmp_path), 1)
+    with open(tmp_path / "experiment_summary.json", encoding='utf-8') as f:
+        exp = json.load(f)["experiments"][0]
+    assert set(exp) == {"experiment_id", "task_file"} | {
+        f"{name}_{kind}_exists" for name in ('fifo_batch', 'cf_batch', 'fifo') for kind in ('result', 'missed')}
+    assert len(SCHEDULERS) == 3
@@ -0,0 +1,62 @@
+import os
+import json
+import glob
+
+import pytest
+
+from cost_model import CostModel, TIME_UNIT_MS, deadline_to_ms
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAN_GLOB = os.path.join(ROOT, "result_with_fifo_edf", "result_list_ddl*", "result_*", "fifo_batch_result.json")
+
+
+def _load_plans():
+    plans = []
+    for path in sorted(glob.glob(PLAN_GLOB)):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue  # 部分调度结果为空文件
+        if plan and isinstance(plan[-1], dict) and 'deadline' in plan[-1]:
+            plans.append((path, plan))
+    return plans
+
+
+def _plan_cost_ms(batches):
+    """fifo_batch.c 的批次时间 trans_time*n + proc_time（完整网络），按代价表先验换算为毫秒"""
+    total = 0.0
+    for batch in batches:
+        k, b = CostModel.prior(batch['size'], 4)
+        total += k * len(batch['images']) + b
+    return total
+
+
+def test_plan_deadline_is_in_cost_table_unit():
+    plans = _load_plans()
+    if not plans:
+        pytest.skip("没有可用的 fifo_batch 调度结果")
+    ratios = []
+    for path, plan in plans:
+        deadline_ms = deadline_to_ms(plan[-1]['deadline'])
+        cost_ms = _plan_cost_ms(plan[:-1])
+        # 调度器只接纳累计时间不超过 deadline 的批次
+        assert cost_ms <= deadline_ms + 1e-3, path
+        ratios.append(cost_ms / deadline_ms)
+    # 单位一致时调度结果会用掉相当一部分预算；deadline 被当成秒（×1000）时比值只有千分之几
+    assert max(ratios) > 0.5
+
+
+def test_deadline_to_ms_uses_time_unit():
+    assert deadline_to_ms(10.0) == pytest.approx(10.0 * TIME_UNIT_MS)
+    assert deadline_to_ms("25") == pytest.approx(25.0 * TIME_UNIT_MS)
+
+
+def test_load_plan_converts_deadline_with_time_unit(tmp_path):
+    pytest.importorskip("torch")
+    from simple_inference import SimpleInference
+    plan_path = tmp_path / "plan.json"
+    plan_path.write_text(json.dumps([{"size": 64, "images": [{"id": "a", "crucial": 1}]}, {"deadline": 10.0}]))
+    batches, deadline_ms = SimpleInference._load_plan(object.__new__(SimpleInference), str(plan_path))
+    assert batches == [{"size": 64, "images": [{"id": "a", "crucial": 1}]}]
+    assert deadline_ms == pytest.approx(10.0 * TIME_UNIT_MS)
@@ -0,0 +1,14 @@
+import pytest
+
+from timing_stats import mean, stdev, median
+
+
+def test_median_averages_middle_pair_for_even_counts():
+    assert median([4.0, 1.0, 3.0, 2.0]) == pytest.approx(2.5)
+    assert median([3.0, 1.0, 2.0]) == pytest.approx(2.0)
+    assert median([5.0]) == pytest.approx(5.0)
+
+
+def test_mean_and_sample_stdev():
+    assert mean([1.0, 2.0, 3.0, 4.0]) == pytest.approx(2.5)
+    assert stdev([2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]) == pytest.approx(2.138, abs=1e-3)
@@ -0,0 +1,20 @@
+import math
+
+# 仓库根目录有自己的 statistics.py，会遮蔽标准库同名模块，计时统计统一用这里的实现
+
+
+def mean(values):
+    return math.fsum(values) / len(values)
+
+
+def stdev(values):
+    """样本标准差（n-1）"""
+    avg = mean(values)
+    return math.sqrt(math.fsum((v - avg) ** 2 for v in values) / (len(values) - 1))
+
+
+def median(values):
+    """中位数，偶数个样本时取中间两个的平均"""
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2